@@ -1,9 +1,86 @@
 # --- Imports --- #
 
-import sys
+import argparse
+import batch
 import compiler
+import incremental
+import parallel
+from cache import BuildCache
+from diagnostics import MAX_ERRORS, CompileError
+from instrument import Recorder
+from listing import LISTING_MODES
+from pprint import pprint
+from vm import VMError, runFile
 
 if __name__ == "__main__":
-	
-	c = compiler.Compiler(*sys.argv)
-	c.__main__()
\ No newline at end of file
+
+	parser = argparse.ArgumentParser(description="Commission compiler")
+	parser.add_argument("files", nargs="+", help="title [source listing object], or with --batch: files, directories or globs")
+	parser.add_argument("-b", "--batch", action="store_true", help="compile every .cmn file given in parallel")
+	parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes for --batch and --parallel (default: one per core)")
+	parser.add_argument("--parallel", action="store_true", help="parse one large source in chunks across worker processes, merging them in order")
+	parser.add_argument("-O", dest="optimize", type=int, choices=(0, 1, 2), default=0, help="optimization level: 1 propagates constants, pools literals, leaves out unused constants and drops redundant moves and jumps; 2 also allocates registers and drops dead stores and unreachable code (default: 0)")
+	parser.add_argument("--listing", choices=LISTING_MODES, default="always", help="when to write the .ccmn listing (default: always)")
+	parser.add_argument("--max-errors", type=int, default=MAX_ERRORS, metavar="N", help="stop after N errors, 0 for no limit (default: %(default)s)")
+	parser.add_argument("--cache", metavar="DIR", help="reuse outputs of unchanged sources from this build cache")
+	parser.add_argument("--cache-size", metavar="MB", type=int, default=256, help="build cache size limit (default: 256)")
+	parser.add_argument("--stream", action="store_true", help="write the .asm in chunks while compiling instead of once at the end")
+	parser.add_argument("--stats", action="store_true", help="report wall and CPU time per phase and the compile's counters")
+	parser.add_argument("--trace", metavar="FILE", help="write the phase and statement spans to FILE as Chrome trace-event JSON")
+	parser.add_argument("--watch", action="store_true", help="recompile the source incrementally whenever it changes, until interrupted")
+	parser.add_argument("--run", action="store_true", help="run the program in the bytecode VM instead of writing the .asm and .ccmn")
+	parser.add_argument("--deterministic", action="store_true", help="stamp the .ccmn header with SOURCE_DATE_EPOCH (default 0) instead of now")
+	args = parser.parse_args()
+
+	if not args.batch and len(args.files) > 4:
+		parser.error("expected title [source listing object]")
+	if args.batch and (args.stats or args.trace):
+		parser.error("--stats and --trace time a single compile, not --batch")
+	if args.watch and (args.batch or args.stats or args.trace or args.cache or args.stream):
+		parser.error("--watch rebuilds a single source and does not combine with --batch, --stats, --trace, --cache or --stream")
+	if args.parallel and (args.batch or args.watch or args.cache or args.stream or args.run):
+		parser.error("--parallel splits a single source and does not combine with --batch, --watch, --cache, --stream or --run")
+	if args.run and (args.batch or args.watch or args.cache or args.stream or len(args.files) > 2):
+		parser.error("--run takes title [source] and does not combine with --batch, --watch, --cache or --stream")
+
+	cache = BuildCache(args.cache, args.cache_size << 20) if args.cache else None
+	timestamp = compiler.deterministicTime() if args.deterministic else None
+
+	recorder = Recorder(trace=bool(args.trace)) if args.stats or args.trace else None
+
+	if args.batch:
+		exit(1 if batch.main(args.files, args.jobs, cache, timestamp, args.optimize, args.listing, args.max_errors) else 0)
+
+	if args.watch:
+		try:
+			incremental.watch(*args.files, optimize=args.optimize, listing=args.listing, maxErrors=args.max_errors, timestamp=timestamp)
+		except KeyboardInterrupt:
+			exit(0)
+
+	try:
+		if args.run:
+			runFile(*args.files, recorder=recorder, maxErrors=args.max_errors)
+			exit(0)
+
+		if args.parallel:
+			result = parallel.compileFile(*args.files, jobs=args.jobs, timestamp=timestamp, optimize=args.optimize, recorder=recorder, listing=args.listing, maxErrors=args.max_errors)
+		else:
+			result = compiler.compileFile(*args.files, cache=cache, timestamp=timestamp, stream=args.stream, optimize=args.optimize, recorder=recorder, listing=args.listing, maxErrors=args.max_errors)
+		pprint(dict(result.symbolTable))
+		for name, count in result.stats.items():
+			print(f"{name}: {count}")
+	except CompileError as err:
+		print(err)
+		print(err.summary)
+		exit(1)
+	except VMError as err:
+		print(err)
+		exit(1)
+	except OSError:
+		print("CompilerError: Unable to open/create important files")
+		exit(1)
+	finally:
+		if args.stats:
+			print(recorder.report(), end="")
+		if args.trace:
+			recorder.writeTrace(args.trace)
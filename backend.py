@@ -0,0 +1,566 @@
+# --- Imports --- #
+
+import ir
+import re
+from emitter import Emitter, Line
+from interface import INIT_FORMAT, exportLabel, isExported
+from ir import IR
+from lexer import Literal, span
+from regalloc import LinearScan, definedNames, liveIntervals
+from symtab import Mode, SymbolTable
+
+# --- Variables --- #
+
+DATA_ITEM = re.compile(r"'[^']*'|\"[^\"]*\"|[^,]+") #One operand of a dd
+UNIT_BYTES : int = 4 #dd pads every item to a dword
+STRING_CHUNK : int = 64 #UTF-8 bytes per dd line of a large string, a multiple of UNIT_BYTES so the bytes do not change
+LIST_ITEMS : int = 16 #Items per dd line of a large list
+ITEM : str = r"(?:'[^']*'|\"[^\"]*\"|[^,'\"])+"
+DATA_ITEMS = re.compile(f"{ITEM}(?:,{ITEM}){{0,{LIST_ITEMS - 1}}}") #One line's worth of operands
+PLAIN_ITEMS = re.compile(f"[^,]+(?:,[^,]+){{0,{LIST_ITEMS - 1}}}") #The same, faster, when there are no quotes
+INSTRUCTIONS = {ir.NEG : "neg", ir.NOT : "not", ir.ADD : "add", ir.SUB : "sub", ir.MUL : "imul", ir.AND : "and", ir.OR : "or"} #Bools are 0 and -1, so not, and, or work bitwise
+SETS = {ir.EQ : "sete", ir.NE : "setne", ir.LT : "setl", ir.LE : "setle", ir.GT : "setg", ir.GE : "setge"}
+
+# --- Backend Class --- #
+
+class Backend(object):
+
+	def __init__(self, code : IR, symbolTable : SymbolTable, emitter : Emitter, title : str = "", optimize : int = 0, imported : dict = None):
+		"""Constructor for Backend(), which lowers a unit's IR to NASM
+
+		imported maps the names a separately compiled unit imports to their global labels. It is
+		None for a whole program, which gets _start; a unit gets an init routine instead and
+		exports every symbol it declares.
+		"""
+
+		self.__ir : IR = code
+		self.__symbolTable : SymbolTable = symbolTable
+		self.__emitter : Emitter = emitter
+		self.__title : str = title
+		self.__imported : dict = imported
+		self.__externs : list = []
+
+		#Registers
+		self.__contentsOfAReg = ""
+		self.__definedStorage = False
+		self.__allocating : bool = optimize >= 2
+		self.__registers : dict = {} #Symbol -> the register it lives in, see regalloc
+		self.__spilled : list = []
+		self.__loaded : set = set() #Register symbols whose value has been loaded or defined
+		self.__dirty : dict = {} #Register symbols defined in their register -> that register
+		self.__memory : dict = {"loadsRemoved" : 0, "storesRemoved" : 0, "loadsAdded" : 0, "storesAdded" : 0}
+
+		#Constants
+		self.__propagate : bool = optimize >= 1
+		self.__addressed : set = set() #Symbols whose storage the emitted code refers to
+		self.__propagated : int = 0
+		self.__unallocated : int = 0
+
+		#Literal pool
+		self.__pooling : bool = optimize >= 1
+		self.__pool : dict = {} #Constant -> the constant whose label holds its payload
+		self.__sharing : dict = {} #Pooled label's constant -> every addressed constant using it
+		self.__pooled : int = 0
+		self.__savedBytes : int = 0
+		self.__dataBytes : int = 0
+
+		#Labels
+		self.__labelCount : int = -1
+
+	@property
+	def externs(self) -> list:
+		"""Global labels of other units the unit's code refers to"""
+		return self.__externs
+
+	@property
+	def stats(self) -> dict:
+		"""Counters of the lowering"""
+
+		stats : dict = {}
+		if self.__propagate:
+			stats["constants.propagated"] = self.__propagated
+			stats["constants.unallocated"] = self.__unallocated
+		if self.__pooling:
+			stats["literals.pooled"] = self.__pooled
+			stats["literals.bytesSaved"] = self.__savedBytes
+			stats["data.bytes"] = self.__dataBytes
+		if self.__allocating:
+			memory = self.__memory
+			stats["registers.allocated"] = len(self.__registers)
+			stats["registers.spilled"] = len(self.__spilled)
+			stats["memory.loadsRemoved"] = memory["loadsRemoved"] - memory["loadsAdded"]
+			stats["memory.storesRemoved"] = memory["storesRemoved"] - memory["storesAdded"]
+		return stats
+
+	def lower(self):
+		"""Emits the whole unit: prologue, one lowering per instruction, then epilogue and storage"""
+
+		names = self.__ir.names
+
+		if self.__pooling:
+			self.poolLiterals()
+		if self.__allocating:
+			self.allocateRegisters()
+
+		self.emitPrologue()
+		self.emitRegisterMap()
+		for op, dst, src1, src2 in self.__ir:
+			if op == ir.COPY:
+				self.emitAssignCode(names[src1], names[dst])
+			elif op == ir.READ:
+				self.emitReadCode(names[dst], names[src1])
+			elif op == ir.WRITE:
+				self.emitWriteCode(names[src1], names[src2])
+			elif op in ir.UNARY:
+				self.emitUnaryCode(op, names[src1], names[dst])
+			else:
+				self.emitBinaryCode(op, names[src1], names[src2], names[dst])
+		self.emitEpilogue()
+
+	def emit(self, label : str = "", instruction : str = "", operands : str = "", comment : str = "", section : str = ".text"):
+		"""Output assembly code into section"""
+		self.__emitter.emit(section, label, instruction, operands, comment)
+
+	def emitPrologue(self):
+		"""Prologue assembly code"""
+
+		if self.__imported is None:
+			self.emit("global", "_start", "", f"; {self.__title}\n")
+			self.emit("_start:")
+			return
+
+		title = self.__title
+		used = set(self.__ir.names)
+		self.__externs = [self.__imported[name] for name in self.__imported if name in used]
+
+		self.emit("global", INIT_FORMAT.format(title), "", f"; {title}")
+		for name, entry in self.__symbolTable.items():
+			if name not in self.__imported and isExported(name):
+				self.emit("global", exportLabel(title, name, entry))
+		for label in self.__externs:
+			self.emit("extern", label)
+		self.emit(f"{INIT_FORMAT.format(title)}:", comment="\n")
+
+	def allocateRegisters(self):
+		"""Gives the symbols of the IR registers for their whole lifetimes, see LinearScan
+
+		Writing anything but an int clobbers edx, which holds the string's address, and so does
+		dividing, before its operands are read. In a unit,
+		other units see every symbol's storage, so those it defines stay in their registers
+		until they are stored back at the end of its init.
+		"""
+
+		code = self.__ir
+		names = code.names
+		candidates = {name for name in set(names) if not self.isConstant(name)}
+		extended = definedNames(code) & candidates if self.__imported is not None else ()
+
+		clobbers : dict = {"edx" : [i for i, (op, dst, src1, src2) in enumerate(code) if op == ir.WRITE and self.__symbolTable[names[src1]].type != "INT"]}
+		early : dict = {"edx" : [i for i, (op, dst, src1, src2) in enumerate(code) if op == ir.DIV or op == ir.MOD]}
+
+		allocator = LinearScan()
+		self.__registers = allocator.allocate(liveIntervals(code, candidates, extended), clobbers, early)
+		self.__spilled = allocator.spilled
+
+	def emitRegisterMap(self):
+		"""Comments which symbols live in which registers"""
+
+		for name, register in self.__registers.items():
+			self.emit("", "", "", f"; {name} in {register}")
+
+	def registerOf(self, name : str, load : bool = True) -> str:
+		"""Register name lives in, '' for memory; the first use loads it unless load is False, for a definition"""
+
+		register : str = self.__registers.get(name, "")
+		if register and name not in self.__loaded:
+			self.__loaded.add(name)
+			if load:
+				self.emit("", "mov", f"{register},{self.addressOf(name)}", f"; load {name} in {register}")
+				self.__memory["loadsAdded"] += 1
+		return register
+
+	def define(self, name : str, register : str):
+		"""Notes that name's register now holds its value, and that memory no longer does"""
+
+		self.__dirty[name] = register
+		self.__memory["storesRemoved"] += 1
+		if self.__contentsOfAReg == name:
+			self.__contentsOfAReg = ""
+
+	def emitStorage(self):
+		"""Variable storage assembly code"""
+
+		for k,v in self.__symbolTable.section(Mode.CONST):
+			comment : str = f"; {', '.join(self.__sharing.get(k, (k,)))}"
+			self.emitExportLabels(k, v, self.__sharing.get(k, (k,)), ".data")
+			self.__dataBytes += payloadSize(v)
+			if isinstance(v.value, Literal): #Rendered in pieces straight from the source, when the .asm is written
+				self.__emitter.emitBlock(".data", lambda v=v, comment=comment: dataLines(v, comment))
+			else:
+				self.emit(v.internalName, "dd", dataOperands(v), comment, ".data")
+
+		for k,v in self.__symbolTable.section(Mode.VAR):
+			self.emitExportLabels(k, v, (k,), ".bss")
+			if v.type == "STR" or v.type == "CHAR":
+				self.emit(v.internalName, "resd", f"{v.value},0", f"; {k}", ".bss")
+			else:
+				self.emit(v.internalName, "resd", v.value, f"; {k}", ".bss")
+
+	def emitExportLabels(self, name : str, entry, names, section : str):
+		"""Labels the storage of name's entry, about to be emitted, with the global labels of names, in a unit"""
+
+		if self.__imported is not None:
+			for other in filter(isExported, names):
+				self.emit(f"{exportLabel(self.__title, other, entry if other == name else self.__symbolTable[other])}:", section=section)
+
+	def isConstant(self, name : str) -> bool:
+		"""Whether name is a frozen int or bool whose value can be used as an immediate"""
+
+		entry = self.__symbolTable[name]
+		return self.__propagate and entry.mode == "CONST" and (entry.type == "INT" or entry.type == "BOOL")
+
+	def addressOf(self, name : str) -> str:
+		"""Memory operand of name, noting that its storage is used"""
+
+		self.__addressed.add(name)
+		return f"[{self.__symbolTable[self.__pool.get(name, name)].internalName}]"
+
+	def poolLiterals(self):
+		"""Points constants with the same payload at the first one's label
+
+		Constants the IR writes to keep their own storage, since sharing is only safe for
+		read-only payloads.
+		"""
+
+		names = self.__ir.names
+		written : set = {names[dst] for op, dst, src1, src2 in self.__ir if dst != ir.NONE}
+		labels : dict = {}
+
+		for name, entry in self.__symbolTable.section(Mode.CONST):
+			if name not in written:
+				self.__pool[name] = labels.setdefault(poolKey(entry), name)
+
+	def allocateConstants(self):
+		"""Drops the storage of constants that no emitted instruction refers to, or that share a pooled label"""
+
+		constants = list(self.__symbolTable.section(Mode.CONST))
+		if self.__imported is not None: #Other units may refer to any of them
+			self.__addressed.update(name for name, entry in constants if isExported(name))
+
+		for name, entry in constants:
+			if name in self.__addressed:
+				self.__sharing.setdefault(self.__pool.get(name, name), []).append(name)
+
+		for name, entry in constants:
+			if self.__pool.get(name, name) != name:
+				self.__symbolTable.setAlloc(name, False)
+				if name in self.__addressed:
+					self.__pooled += 1
+					self.__savedBytes += payloadSize(entry)
+			elif name not in self.__sharing:
+				self.__symbolTable.setAlloc(name, False)
+				self.__unallocated += 1
+
+	def emitAssignCode(self, rhs : str, lhs : str):
+
+		source : str = self.registerOf(rhs)
+		target : str = self.registerOf(lhs, False)
+
+		if self.isConstant(rhs): #store the constant as an immediate, eax is untouched
+			self.__propagated += 1
+			if target:
+				self.emit("", "mov", f"{target},{self.__symbolTable[rhs].value}", f"; {rhs}")
+				self.define(lhs, target)
+				return
+			if self.__contentsOfAReg == lhs:
+				self.__contentsOfAReg = ""
+			self.emit("", "mov", f"dword {self.addressOf(lhs)},{self.__symbolTable[rhs].value}", f"; {rhs}")
+			return
+
+		if source or target:
+			if source and self.__contentsOfAReg != rhs:
+				self.__memory["loadsRemoved"] += 1
+			source = source or ("eax" if self.__contentsOfAReg == rhs else self.addressOf(rhs))
+			if target:
+				if target != source:
+					self.emit("", "mov", f"{target},{source}")
+				self.define(lhs, target)
+			else:
+				if self.__contentsOfAReg == lhs:
+					self.__contentsOfAReg = ""
+				self.emit("", "mov", f"{self.addressOf(lhs)},{source}")
+			return
+
+		if self.__contentsOfAReg != rhs:
+			self.emit("", "mov", f"eax,{self.addressOf(rhs)}")
+			self.__contentsOfAReg = rhs
+		self.emit("", "mov", f"{self.addressOf(lhs)},eax")
+
+	def emitReadCode(self, rhs : str, lhs : str):
+
+		name : str = rhs
+
+		self.emit("", "call", "ReadInt", "; read int; value placed in eax") #emit code to call the Irvine ReadInt function
+		register : str = self.registerOf(name, False)
+		if register:
+			self.emit("", "mov", f"{register},eax", f"; keep {name} in {register}")
+			self.define(name, register)
+		else:
+			self.emit("", "mov", f"{self.addressOf(name)},eax", f"; store eax at {name}") #emit code to store the contents of the A register at name
+		self.__contentsOfAReg = name # set the contentsOfAReg = name
+
+	def emitWriteCode(self, rhs : str, lhs : str):
+
+		name : str = rhs
+
+		if self.isConstant(name) and self.__symbolTable[name].type == "BOOL": #the branch is decided at compile time
+			self.__propagated += 1
+			self.emit("", "mov", f"edx,{'FALSLIT' if self.__symbolTable[name].value == '0' else 'TRUELIT'}", f"; load address of {name} literal in edx")
+			self.emit("", "call", "WriteString", "; write string to standard out")
+			self.emitBoolLiterals()
+		elif self.isConstant(name): #load the constant as an immediate
+			self.__propagated += 1
+			self.emit("", "mov", f"eax,{self.__symbolTable[name].value}", f"; load {name} in eax")
+			self.__contentsOfAReg = ""
+			self.emit("", "call", "WriteInt", "; write int in eax to standard out")
+		else:
+			register : str = self.registerOf(name)
+			if self.__contentsOfAReg != name:
+				if register:
+					self.emit("", "mov", f"eax,{register}", f"; copy {name} to eax")
+					self.__memory["loadsRemoved"] += 1
+				else:
+					self.emit("", "mov", f"eax,{self.addressOf(name)}", f"; load {name} in eax") #emit the code to load name in the A register
+				self.__contentsOfAReg = name
+			self.emitWriteValue(name)
+
+		self.emit("", "call", "Crlf", "; write \\r\\n to standard out") #emit code to call the Irvine Crlf function
+
+	def emitUnaryCode(self, op : int, rhs : str, lhs : str):
+
+		self.loadA(rhs)
+		self.emit("", INSTRUCTIONS[op], "eax")
+		self.storeA(lhs)
+
+	def emitBinaryCode(self, op : int, left : str, right : str, lhs : str):
+		"""lhs = left op right, computed in eax"""
+
+		self.loadA(left)
+
+		if op == ir.DIV or op == ir.MOD:
+			self.emitDivision(right)
+			self.storeA(lhs, "eax" if op == ir.DIV else "edx")
+			return
+
+		if op in SETS:
+			self.emit("", "cmp", f"eax,{self.operand(right)}")
+			self.emit("", SETS[op], "al")
+			self.emit("", "movzx", "eax,al")
+			self.emit("", "neg", "eax", "; true is -1")
+		else:
+			self.emit("", INSTRUCTIONS[op], f"eax,{self.operand(right)}")
+		self.storeA(lhs)
+
+	def emitDivision(self, divisor : str):
+		"""Divides eax by divisor, leaving the quotient in eax and the remainder in edx
+
+		idiv truncates; the result is moved to the floor, as // and % do, when the remainder
+		is not 0 and its sign differs from the divisor's.
+		"""
+
+		register : str = self.registerOf(divisor)
+		if register:
+			self.__memory["loadsRemoved"] += 1
+		divisor = register or f"dword {self.addressOf(divisor)}" #idiv takes no immediate
+
+		exact : str = self.getLabel()
+		floored : str = self.getLabel()
+
+		self.emit("", "cdq", "", "; sign-extend eax into edx")
+		self.emit("", "idiv", divisor)
+		self.emit("", "test", "edx,edx")
+		self.emit("", "je", exact, "; no remainder")
+		self.emit("", "xor", f"edx,{divisor}")
+		self.emit("", "jns", floored, "; remainder and divisor have the same sign")
+		self.emit("", "xor", f"edx,{divisor}")
+		self.emit("", "dec", "eax", "; round the quotient down")
+		self.emit("", "add", f"edx,{divisor}", "; and give the remainder the divisor's sign")
+		self.emit("", "jmp", exact)
+		self.emit(f"{floored}:")
+		self.emit("", "xor", f"edx,{divisor}")
+		self.emit(f"{exact}:")
+
+	def operand(self, name : str) -> str:
+		"""Source operand of name for an instruction on eax: its register, its value when constant, or its storage"""
+
+		register : str = self.registerOf(name)
+		if register:
+			self.__memory["loadsRemoved"] += 1
+			return register
+		if self.isConstant(name):
+			self.__propagated += 1
+			return self.__symbolTable[name].value
+		return self.addressOf(name)
+
+	def loadA(self, name : str):
+		"""Puts the value of name in eax"""
+
+		if self.__contentsOfAReg != name:
+			self.emit("", "mov", f"eax,{self.operand(name)}", f"; load {name} in eax")
+			self.__contentsOfAReg = name
+
+	def storeA(self, name : str, source : str = "eax"):
+		"""Stores the result in source, eax or edx, at name; eax then holds name when it is the source"""
+
+		register : str = self.registerOf(name, False)
+		if register:
+			if register != source:
+				self.emit("", "mov", f"{register},{source}", f"; keep {name} in {register}")
+			self.define(name, register)
+		else:
+			self.emit("", "mov", f"{self.addressOf(name)},{source}", f"; store {source} at {name}")
+
+		self.__contentsOfAReg = name if source == "eax" else ""
+
+	def emitWriteValue(self, name : str):
+		"""Writes the value of name, already in eax"""
+
+		if self.__symbolTable[name].type == "INT": #"INTEGER":
+			self.emit("", "call", "WriteInt", "; write int in eax to standard out")
+		else:
+			self.emit("", "cmp", "eax,0", "; compare to 0") #emit code to compare the A register to 0
+
+			label : str = self.getLabel() #acquire a new label Ln
+			self.emit("", "je", label, "; jump if equal to print FALSE") #emit code to jump if equal to the acquired label Ln
+			self.emit("", "mov", "edx,TRUELIT", "; load address of TRUE literal in edx") #emit code to load address of TRUE literal in the D register
+
+			label2 : str = self.getLabel() #acquire a new label Ln
+			self.emit("", "jmp", label2, f"; unconditionally jump to {label2}") #emit code to unconditionally jump to label L(n + 1)
+			self.emit(f"{label}:") #emit code to label the next line with the first acquired label Ln
+			self.emit("", "mov", "edx,FALSLIT", "; load address of FALSE literal in edx") #emit code to load address of FALSE literal in the D register
+			self.emit(f"{label2}:") #emit code to label the next line with the second acquired label L(n + 1)
+			self.emit("", "call", "WriteString", "; write string to standard out") #emit code to call the Irvine WriteString function
+			self.emitBoolLiterals()
+
+	def emitBoolLiterals(self):
+		"""Defines TRUELIT and FALSLIT in .data the first time they are needed"""
+
+		if not self.__definedStorage: #if static variable definedStorage is false
+			self.__definedStorage = True #set definedStorage to true
+			self.emit("TRUELIT", "db", "'TRUE',0", "; literal string TRUE", ".data") #emit code to create label TRUELIT in .data, instruction db, operands 'TRUE',0
+			self.emit("FALSLIT", "db", "'FALSE',0", "; literal string FALSE", ".data") #emit code to create label FALSELIT in .data, instruction db, operands 'FALSE',0
+
+	def emitEpilogue(self):
+		"""Output epilogue assembly code"""
+
+		if self.__imported is None:
+			self.emit("", "Exit", "{0}")
+		else:
+			for name, register in self.__dirty.items(): #Other units read it from memory
+				self.emit("", "mov", f"{self.addressOf(name)},{register}", f"; store {name} back")
+				self.__memory["storesAdded"] += 1
+			self.emit("", "ret", "", "; back to _start")
+		if self.__propagate:
+			self.allocateConstants()
+		self.emitStorage()
+		self.__emitter.close()
+
+	def getLabel(self):
+		"""Return a label name"""
+
+		self.__labelCount += 1
+		return f".L{self.__labelCount}"
+
+
+# --- Functions --- #
+
+def quoted(source : str, start : int, end : int) -> bool:
+	return source.find("'", start, end) >= 0 or source.find('"', start, end) >= 0
+
+def dataOperands(entry) -> str:
+	"""dd operands of a constant's payload"""
+
+	if entry.type == "STR" or entry.type == "CHAR":
+		return f"{entry.value},0"
+	return entry.value
+
+def poolKey(entry) -> tuple:
+	"""Key under which constants with the same payload meet in the literal pool"""
+
+	if entry.type == "STR" or entry.type == "CHAR":
+		return ("'", entry.value[1:-1]) #Either quote
+	return ("", entry.value)
+
+def textBytes(source : str, start : int, end : int) -> int:
+	"""UTF-8 bytes of source[start:end], which is what NASM puts in a dd"""
+
+	text = source[start:end]
+	return len(text) if text.isascii() else len(text.encode())
+
+def textChunks(source : str, start : int, end : int):
+	"""Yields the (start, stop) pieces of source[start:end] that dataLines() puts on a line
+
+	Each is STRING_CHUNK bytes of UTF-8 but the last, or a little more where a character
+	ends past STRING_CHUNK, up to the first place a character and a whole dword end together.
+	"""
+
+	i : int = start
+	while i < end:
+		stop = min(i + STRING_CHUNK, end)
+		if not source[i:stop].isascii():
+			size : int = 0
+			stop = i
+			while stop < end and (size < STRING_CHUNK or size % UNIT_BYTES):
+				size += len(source[stop].encode())
+				stop += 1
+		yield i, stop
+		i = stop
+
+def payloadSize(entry) -> int:
+	"""Bytes the dd of a constant's payload assembles to, counted in place"""
+
+	source, start, end = span(entry.value)
+
+	if entry.type == "STR" or entry.type == "CHAR":
+		return -(-textBytes(source, start + 1, end - 1) // UNIT_BYTES) * UNIT_BYTES + UNIT_BYTES
+
+	if end - start < LIST_ITEMS * UNIT_BYTES or quoted(source, start, end):
+		size : int = 0
+		for m in DATA_ITEM.finditer(source, start, end):
+			item = m.group().strip()
+			if item[:1] in ("'", '"'):
+				size += -(-textBytes(item, 1, len(item) - 1) // UNIT_BYTES) * UNIT_BYTES
+			elif item:
+				size += UNIT_BYTES
+		return size
+
+	first = source.find(',', start, end)
+	if first < 0:
+		return UNIT_BYTES
+
+	items : int = source.count(',', start, end) + 1
+	if not source[start:first].strip(): #Blank first or last item
+		items -= 1
+	if not source[source.rfind(',', start, end) + 1:end].strip():
+		items -= 1
+	return items * UNIT_BYTES
+
+def dataLines(entry, comment : str = ""):
+	"""Yields the dd Lines of a large constant, STRING_CHUNK bytes (see textChunks()) or LIST_ITEMS items to a line
+
+	The bytes are those of one dd of the whole payload, which is read from the source in place.
+	"""
+
+	source, start, end = span(entry.value)
+	label : str = entry.internalName
+
+	if entry.type == "STR" or entry.type == "CHAR":
+		quote = source[start]
+		last = end - 1
+		for i, stop in textChunks(source, start + 1, last):
+			yield Line(label, "dd", f"{quote}{source[i:stop]}{quote},0" if stop == last else f"{quote}{source[i:stop]}{quote}", comment)
+			label = comment = ""
+	else:
+		for m in (DATA_ITEMS if quoted(source, start, end) else PLAIN_ITEMS).finditer(source, start, end):
+			yield Line(label, "dd", m.group().replace("\n", " ").strip(), comment)
+			label = comment = ""
@@ -0,0 +1,86 @@
+# --- Imports --- #
+
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import compiler
+from diagnostics import MAX_ERRORS, CompileError, failureMessage
+
+# --- Variables --- #
+
+BatchResult = namedtuple("BatchResult", ["title", "ok", "seconds", "message"])
+
+
+# --- Functions --- #
+
+def findSources(patterns) -> list:
+	"""Expands files, directories (searched recursively) and globs into a sorted list of .cmn files"""
+
+	found : set = set()
+
+	for pattern in patterns:
+		if os.path.isdir(pattern):
+			found.update(glob.glob(os.path.join(pattern, "**", "*.cmn"), recursive=True))
+		elif glob.has_magic(pattern):
+			found.update(path for path in glob.glob(pattern, recursive=True) if path.endswith(".cmn"))
+		elif pattern.endswith(".cmn"):
+			found.add(pattern)
+		else:
+			found.add(f"{pattern}.cmn")
+
+	return sorted(found)
+
+def compileOne(path : str, cache = None, timestamp = None, optimize : int = 0, listing : str = "always", maxErrors : int = MAX_ERRORS) -> BatchResult:
+	"""Compiles one .cmn file, turning any failure into a BatchResult instead of raising"""
+
+	title : str = path[:-len(".cmn")]
+	start = time.perf_counter()
+
+	try:
+		compiler.compileFile(title, path, cache=cache, timestamp=timestamp, optimize=optimize, listing=listing, maxErrors=maxErrors)
+	except CompileError as err:
+		return BatchResult(title, False, time.perf_counter() - start, f"{err}\n{err.summary}")
+	except Exception as err:
+		return BatchResult(title, False, time.perf_counter() - start, failureMessage(err))
+
+	return BatchResult(title, True, time.perf_counter() - start, "")
+
+def compileBatch(paths : list, jobs : int = 0, cache = None, timestamp = None, optimize : int = 0, listing : str = "always", maxErrors : int = MAX_ERRORS) -> list:
+	"""Compiles paths across a process pool of jobs workers (one per core by default), in order"""
+
+	worker = partial(compileOne, cache=cache, timestamp=timestamp, optimize=optimize, listing=listing, maxErrors=maxErrors)
+	jobs = min(jobs or os.cpu_count() or 1, len(paths))
+
+	if jobs <= 1:
+		return [worker(path) for path in paths]
+
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		return list(pool.map(worker, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+
+def printSummary(results : list, seconds : float, jobs : int = 0) -> None:
+	"""Prints per-file timing followed by the batch totals"""
+
+	failed : int = 0
+
+	for result in results:
+		print("{:>10.3f} s  {:8}{}".format(result.seconds, "ok" if result.ok else "FAILED", result.title))
+		if not result.ok:
+			failed += 1
+			print("".join(f"{'':>14}{line}\n" for line in result.message.splitlines()), end="")
+
+	print("\n{} files, {} compiled, {} failed in {:.3f} s ({:.3f} s compiling, {} workers)".format(
+		len(results), len(results) - failed, failed, seconds, sum(result.seconds for result in results),
+		min(jobs or os.cpu_count() or 1, max(len(results), 1))))
+
+def main(patterns, jobs : int = 0, cache = None, timestamp = None, optimize : int = 0, listing : str = "always", maxErrors : int = MAX_ERRORS) -> int:
+	"""Batch entry point, returns the number of files that failed"""
+
+	paths = findSources(patterns)
+	start = time.perf_counter()
+	results = compileBatch(paths, jobs, cache, timestamp, optimize, listing, maxErrors)
+	printSummary(results, time.perf_counter() - start, jobs)
+
+	return sum(1 for result in results if not result.ok)
@@ -0,0 +1,293 @@
+# --- Imports --- #
+
+import argparse
+import datetime as dt
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import compiler
+from lexer import tokenize
+from source import SourceBuffer
+from ste import SymbolTableEntry
+from symtab import SymbolTable
+from vm import VM, Bytecode
+
+# --- Variables --- #
+
+PHASES = ("lex", "parse", "emit")
+MIX = {"frozen" : 2, "declare" : 4, "implicit" : 2, "assign" : 3, "write" : 3, "read" : 1, "comment" : 1, "arith" : 0} #Statement kind -> weight
+OPERATORS = ("+", "-", "*", "//", "%")
+TYPE_NAMES = ("int", "bool", "char", "str", "list")
+THRESHOLD : float = 0.10 #Allowed slowdown against the baseline
+
+
+# --- Generator Class --- #
+
+class Generator(object):
+
+	def __init__(self, mix : dict = None, literalLength : int = 64, seed : int = 0):
+		"""Constructor for Generator(), which writes random but valid Commission programs
+
+		mix weighs the statement kinds of MIX. Every type is declared, explicitly and implicitly,
+		string and list literals are literalLength long, and the same seed gives the same program.
+		"""
+
+		self.__mix : dict = dict(mix or MIX)
+		self.__literalLength : int = literalLength
+		self.__random = random.Random(seed)
+
+		self.__count : int = 0
+		self.__ints : list = [] #int variables, which can be read into
+		self.__numbers : list = [] #int names, which can be assigned to int variables
+		self.__writable : list = [] #int and bool names, which can be written
+
+	def name(self, prefix : str) -> str:
+		self.__count += 1
+		return f"{prefix}{self.__count}"
+
+	def literal(self, type : str) -> str:
+		"""Random literal of type"""
+
+		rand = self.__random
+
+		if type == "int":
+			return rand.choice(("", "+", "-")) + str(rand.randrange(1 << 16))
+		elif type == "bool":
+			return rand.choice(("True", "False", "not True", "not False"))
+		elif type == "char":
+			return f"'{rand.choice('abcdefghijklmnopqrstuvwxyz')}'"
+		elif type == "str":
+			return '"' + "".join(rand.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(self.__literalLength)) + '"'
+		else:
+			return "[" + ",".join(str(rand.randrange(100)) for _ in range(self.__literalLength)) + "]"
+
+	def declare(self, mode : str, explicit : bool) -> str:
+		type = self.__random.choice(TYPE_NAMES)
+		name = self.name("K" if mode == "CONST" else "v")
+
+		if type == "int":
+			self.__numbers.append(name)
+		if type == "int" or type == "bool":
+			self.__writable.append(name)
+		if mode == "VAR" and type == "int":
+			self.__ints.append(name)
+
+		return "{}{}{} = {}\n".format("frozen " if mode == "CONST" else "", f"{type} " if explicit else "", name, self.literal(type))
+
+	def statement(self, kind : str) -> str:
+		"""One line of kind, declaring what it needs first"""
+
+		rand = self.__random
+
+		if kind == "frozen":
+			return self.declare("CONST", rand.random() < 0.5)
+		elif kind == "declare":
+			return self.declare("VAR", True)
+		elif kind == "implicit":
+			return self.declare("VAR", False)
+		elif kind == "comment":
+			return f"# --- Generated {self.__count} --- #\n"
+		elif not self.__ints: #The rest use an int variable
+			return self.declare("VAR", True)
+		elif kind == "assign":
+			return f"{rand.choice(self.__ints)} = {rand.choice(self.__numbers)}\n"
+		elif kind == "arith": #Divides by literals only, so the program runs
+			operator = rand.choice(OPERATORS)
+			right = str(rand.randrange(1, 100)) if operator in ("//", "%") else rand.choice(self.__ints)
+			return f"{rand.choice(self.__ints)} = ({rand.choice(self.__ints)} - {rand.randrange(100)}) {operator} {right}\n"
+		elif kind == "write":
+			return f"io << {rand.choice(self.__writable)}\n"
+		else:
+			return f"io >> {rand.choice(self.__ints)}\n"
+
+	def program(self, statements : int) -> str:
+		"""Commission program of statements lines, after the io stream declaration"""
+
+		kinds = tuple(self.__mix)
+		weights = tuple(self.__mix.values())
+
+		lines : list = ["int io = 0\n"]
+		self.__numbers.append("io")
+		self.__writable.append("io")
+		lines.extend(self.statement(kind) for kind in self.__random.choices(kinds, weights, k=statements))
+
+		return "".join(lines)
+
+
+# --- Functions --- #
+
+def runPhases(text : str, optimize : int = 0, trace : bool = False) -> tuple:
+	"""Compiles text once, returning ({phase : seconds}, {phase : peak bytes}, counts)
+
+	Peaks are only measured with trace, since tracemalloc slows everything it watches.
+	"""
+
+	seconds : dict = {}
+	peaks : dict = {}
+
+	def phase(name, function, *args):
+		if trace:
+			tracemalloc.reset_peak()
+		start = time.perf_counter()
+		value = function(*args)
+		seconds[name] = time.perf_counter() - start
+		if trace:
+			peaks[name] = tracemalloc.get_traced_memory()[1]
+		return value
+
+	timestamp = dt.datetime.fromtimestamp(0, dt.timezone.utc)
+
+	tokens = phase("lex", list, tokenize(text))
+	c = compiler.Compiler(SourceBuffer(text, "bench"), "bench", timestamp, optimize=optimize, tokens=tokens)
+	phase("parse", c.parse)
+	asm = phase("emit", lambda: (c.lower(), c.asm)[1])
+
+	counts = {"chars" : len(text), "tokens" : len(tokens), "symbols" : len(c.symbolTable), "instructions" : len(c.ir), "asmBytes" : len(asm)}
+	return seconds, peaks, counts
+
+def benchmark(text : str, repeat : int = 5, optimize : int = 0) -> dict:
+	"""Best of repeat timings and the peak memory of each phase"""
+
+	best : dict = {}
+	for _ in range(repeat):
+		seconds, _, counts = runPhases(text, optimize)
+		for name, value in seconds.items():
+			best[name] = min(best.get(name, value), value)
+
+	tracemalloc.start()
+	try:
+		_, peaks, _ = runPhases(text, optimize, trace=True)
+	finally:
+		tracemalloc.stop()
+
+	return {"phases" : {name : {"seconds" : best[name], "peakBytes" : peaks[name]} for name in PHASES}, "counts" : counts}
+
+def benchmarkVM(text : str, repeat : int = 5) -> dict:
+	"""Best of repeat runs of text's bytecode in the VM, reading no input and keeping no output"""
+
+	c = compiler.Compiler(SourceBuffer(text, "bench"), "bench", dt.datetime.fromtimestamp(0, dt.timezone.utc))
+	c.parse()
+	bytecode = Bytecode(c.ir, c.symbolTable)
+
+	best : float = None
+	for _ in range(repeat):
+		machine = VM(io.StringIO(), io.StringIO())
+		start = time.perf_counter()
+		machine.run(bytecode)
+		seconds = time.perf_counter() - start
+		best = seconds if best is None else min(best, seconds)
+
+	return {"seconds" : best, "instructions" : machine.executed}
+
+def compare(results : dict, baseline : dict, threshold : float = THRESHOLD) -> list:
+	"""Phases, and the VM run when both have one, that are more than threshold slower than in baseline, as messages"""
+
+	regressions : list = []
+	times : list = [(name, baseline["phases"].get(name, {}).get("seconds"), results["phases"][name]["seconds"]) for name in PHASES]
+	if "vm" in results and "vm" in baseline:
+		times.append(("vm", baseline["vm"]["seconds"], results["vm"]["seconds"]))
+
+	for name, old, new in times:
+		if old and new > old * (1 + threshold):
+			regressions.append(f"{name}: {old:.4f} s -> {new:.4f} s (+{(new / old - 1) * 100:.1f}%)")
+
+	return regressions
+
+def fillSymbols(table, symbolCount : int) -> None:
+	"""Inserts symbolCount symbols into table, then walks .data and .bss the way emitStorage does"""
+
+	for i in range(symbolCount):
+		if i % 2:
+			table[f"v{i}"] = SymbolTableEntry(f"I{i}", "INT", "VAR", str(i), "YES", 1)
+		else:
+			table[f"A{i}"] = SymbolTableEntry(f"I{i}", "INT", "CONST", str(i), "YES", 1)
+
+	for mode in ("CONST", "VAR"):
+		if isinstance(table, dict):
+			sum(1 for v in table.values() if v.mode == mode and v.alloc == "YES")
+		else:
+			sum(1 for _ in table.section(mode))
+
+def measureSymbols(tableType, symbolCount : int) -> tuple:
+	"""Returns (bytes, seconds) for fillSymbols() on a new tableType, bytes being what the table holds"""
+
+	start = time.perf_counter()
+	fillSymbols(tableType(), symbolCount)
+	seconds = time.perf_counter() - start
+
+	tracemalloc.start()
+	table = tableType()
+	fillSymbols(table, symbolCount)
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	return size, seconds
+
+def printResults(results : dict) -> None:
+
+	counts = results["counts"]
+	print("{:>10} statements{:>12} chars{:>10} tokens{:>10} symbols{:>10} instructions{:>12} asm bytes".format(
+		results["statements"], counts["chars"], counts["tokens"], counts["symbols"], counts["instructions"], counts["asmBytes"]))
+
+	for name in PHASES:
+		phase = results["phases"][name]
+		print("{:>10}{:>10.4f} s{:>14.0f} chars/s{:>12.1f} MiB peak".format(name, phase["seconds"], counts["chars"] / phase["seconds"], phase["peakBytes"] / (1 << 20)))
+
+	if "vm" in results:
+		run = results["vm"]
+		print("{:>10}{:>10.4f} s{:>14.0f} instructions/s".format("vm", run["seconds"], run["instructions"] / run["seconds"]))
+
+def main(argv : list = None) -> int:
+	"""Runs the benchmark, returning 1 when it regressed against the baseline"""
+
+	parser = argparse.ArgumentParser(prog="bench.py", description="Times each phase of Compiler on generated programs.")
+	parser.add_argument("-n", "--statements", type=int, default=50000, help="lines in the generated program")
+	parser.add_argument("--literal-length", type=int, default=64, help="characters per string, elements per list")
+	parser.add_argument("--mix", type=json.loads, default=None, help=f"statement weights as JSON (default {json.dumps(MIX)})")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("-r", "--repeat", type=int, default=5, help="runs to take the best time of")
+	parser.add_argument("-O", dest="optimize", type=int, choices=(0, 1, 2), default=0)
+	parser.add_argument("--source", metavar="FILE", help="also write the generated program to FILE")
+	parser.add_argument("-o", "--output", metavar="FILE", help="write the results as JSON to FILE")
+	parser.add_argument("--baseline", metavar="FILE", help="JSON results of an earlier run to compare against")
+	parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, as a fraction (default %(default)s)")
+	parser.add_argument("--vm", action="store_true", help="also time running the program in the bytecode VM")
+	parser.add_argument("--symbols", type=int, default=0, metavar="N", help="also compare SymbolTable against a dict with N symbols")
+	args = parser.parse_args(argv)
+
+	text = Generator(args.mix, args.literal_length, args.seed).program(args.statements)
+	if args.source:
+		with open(args.source, "w") as file:
+			file.write(text)
+
+	results = {"statements" : args.statements, "literalLength" : args.literal_length, "mix" : args.mix or MIX, "seed" : args.seed,
+		"optimize" : args.optimize, "version" : compiler.VERSION, "python" : platform.python_version(), **benchmark(text, args.repeat, args.optimize)}
+	if args.vm:
+		results["vm"] = benchmarkVM(text, args.repeat)
+	printResults(results)
+
+	if args.symbols:
+		for tableType in (dict, SymbolTable):
+			size, seconds = measureSymbols(tableType, args.symbols)
+			print("{:>12}{:>10} symbols{:>12} bytes{:>8.1f} B/symbol{:>10.3f} s".format(tableType.__name__, args.symbols, size, size / args.symbols, seconds))
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump(results, file, indent=4)
+
+	if args.baseline:
+		with open(args.baseline, "r") as file:
+			regressions = compare(results, json.load(file), args.threshold)
+		for regression in regressions:
+			print(f"Regression: {regression}")
+		return 1 if regressions else 0
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,119 @@
+# --- Imports --- #
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import compiler
+from result import CompileResult
+from ste import SymbolTableEntry
+
+# --- Variables --- #
+
+DEFAULT_MAX_BYTES : int = 256 << 20
+ENTRY_SUFFIX : str = ".json"
+
+
+# --- Functions --- #
+
+def compilerFingerprint() -> str:
+	"""Hashes VERSION and the compiler's own sources, so editing the compiler invalidates the cache"""
+
+	digest = hashlib.sha256(compiler.VERSION.encode())
+	for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(compiler.__file__)), "*.py"))):
+		with open(path, "rb") as file:
+			digest.update(file.read())
+
+	return digest.hexdigest()
+
+
+# --- BuildCache Class --- #
+
+class BuildCache(object):
+
+	def __init__(self, directory : str, maxBytes : int = DEFAULT_MAX_BYTES):
+		"""Constructor for BuildCache()"""
+
+		self.__directory : str = directory
+		self.__maxBytes : int = maxBytes
+		self.__fingerprint : str = compilerFingerprint()
+
+		os.makedirs(directory, exist_ok=True)
+
+	@property
+	def directory(self) -> str:
+		return self.__directory
+
+	def key(self, text : str, title : str, options : dict = None) -> str:
+		"""Content address of one compile: the compiler, its options, the title and the source text"""
+
+		digest = hashlib.sha256(self.__fingerprint.encode())
+		digest.update(json.dumps({"title" : title, **(options or {})}, sort_keys=True).encode())
+		digest.update(b"\0")
+		digest.update(text.encode())
+
+		return digest.hexdigest()
+
+	def path(self, key : str) -> str:
+		return os.path.join(self.__directory, key + ENTRY_SUFFIX)
+
+	def load(self, key : str) -> CompileResult:
+		"""Returns the cached CompileResult for key, or None on a miss"""
+
+		path = self.path(key)
+
+		try:
+			with open(path, "r") as file:
+				entry = json.load(file)
+			os.utime(path) #Most recently used
+		except (OSError, ValueError): #Missing, evicted by another worker, or torn
+			return None
+
+		symbolTable = {name : SymbolTableEntry(*fields) for name, fields in entry["symbolTable"].items()}
+		return CompileResult(entry["asm"], entry["listing"], symbolTable, [], entry["stats"])
+
+	def store(self, key : str, result : CompileResult) -> None:
+		"""Saves result under key, then evicts the least recently used entries past maxBytes"""
+
+		entry = {"asm" : result.asm, "listing" : result.listing, "symbolTable" : {name : list(v._replace(value=str(v.value))) for name, v in result.symbolTable.items()}, "stats" : result.stats}
+
+		fd, temp = tempfile.mkstemp(dir=self.__directory, suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w") as file:
+				json.dump(entry, file)
+			os.replace(temp, self.path(key)) #Readers never see a half-written entry
+		except BaseException:
+			os.unlink(temp)
+			raise
+
+		self.evict()
+
+	def evict(self) -> None:
+		"""Removes the least recently used entries until the cache fits in maxBytes"""
+
+		entries : list = []
+		total : int = 0
+
+		with os.scandir(self.__directory) as it:
+			for entry in it:
+				if entry.name.endswith(ENTRY_SUFFIX):
+					try:
+						stat = entry.stat()
+					except OSError:
+						continue
+					entries.append((stat.st_mtime, stat.st_size, entry.path))
+					total += stat.st_size
+
+		if total <= self.__maxBytes:
+			return
+
+		entries.sort()
+		for mtime, size, path in entries:
+			if total <= self.__maxBytes:
+				break
+			try:
+				os.unlink(path)
+			except OSError:
+				pass
+			total -= size
@@ -0,0 +1,105 @@
+# --- Imports --- #
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from diagnostics import MAX_ERRORS, summary
+from listing import LISTING_MODES
+
+# --- Variables --- #
+
+DEFAULT_SOCKET : str = os.path.join(tempfile.gettempdir(), f"commission-{os.getuid()}.sock")
+RECEIVE_BYTES : int = 1 << 16
+
+
+# --- Functions --- #
+
+def request(message : dict, path : str = DEFAULT_SOCKET) -> dict:
+	"""Sends one message to the daemon at path and returns its response
+
+	Messages are one JSON object per line each way, see daemon.CompileServer.
+	"""
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+		connection.connect(path)
+		connection.sendall(json.dumps(message).encode() + b"\n")
+
+		chunks : list = []
+		while True:
+			chunk = connection.recv(RECEIVE_BYTES)
+			if not chunk:
+				break
+			chunks.append(chunk)
+			if chunk.endswith(b"\n"):
+				break
+
+	if not chunks:
+		raise ConnectionError("The daemon closed the connection without responding")
+	return json.loads(b"".join(chunks))
+
+def main(argv : list = None) -> int:
+	"""Thin compile client: the source goes to a running daemon and the outputs come back"""
+
+	parser = argparse.ArgumentParser(prog="client.py", description="Commission compile daemon client")
+	parser.add_argument("files", nargs="*", help="title [source listing object]")
+	parser.add_argument("-O", dest="optimize", type=int, choices=(0, 1, 2), default=0, help="optimization level: 1 propagates constants, pools literals, leaves out unused constants and drops redundant moves and jumps; 2 also allocates registers and drops dead stores and unreachable code (default: 0)")
+	parser.add_argument("--listing", choices=LISTING_MODES, default="always", help="when to write the .ccmn listing (default: always)")
+	parser.add_argument("--max-errors", type=int, default=MAX_ERRORS, metavar="N", help="stop after N errors, 0 for no limit (default: %(default)s)")
+	parser.add_argument("--socket", default=DEFAULT_SOCKET, help="daemon socket (default: %(default)s)")
+	parser.add_argument("--deterministic", action="store_true", help="stamp the .ccmn header with SOURCE_DATE_EPOCH (default 0) instead of now")
+	parser.add_argument("--status", action="store_true", help="print the daemon's counters instead of compiling")
+	parser.add_argument("--shutdown", action="store_true", help="stop the daemon")
+	args = parser.parse_args(argv)
+
+	if args.status or args.shutdown:
+		try:
+			response = request({"op" : "shutdown" if args.shutdown else "status"}, args.socket)
+		except OSError:
+			print(f"CompilerError: Unable to reach the daemon at {args.socket}")
+			return 1
+		for name, value in response.get("stats", {}).items():
+			print(f"{name}: {value}")
+		return 0
+
+	if not 1 <= len(args.files) <= 4:
+		parser.error("expected title [source listing object]")
+
+	try:
+		title = args.files[0]
+		sourceName, listingName, objectName = (args.files[1:] + [""] * 3)[:3]
+
+		with open(sourceName or f"{title}.cmn", "r") as sourceFile:
+			text = sourceFile.read()
+
+		message = {"op" : "compile", "title" : title, "source" : text, "optimize" : args.optimize, "listing" : args.listing, "maxErrors" : args.max_errors,
+			"timestamp" : int(os.environ.get("SOURCE_DATE_EPOCH", 0)) if args.deterministic else None}
+		response = request(message, args.socket)
+
+		if "error" in response:
+			print(response["error"])
+			return 1
+
+		if response["listing"] is not None:
+			with open(listingName or f"{title}.ccmn", "w") as listingFile:
+				listingFile.write(response["listing"])
+		with open(objectName or f"{title}.asm", "w") as objectFile:
+			objectFile.write(response["asm"])
+	except OSError:
+		print(f"CompilerError: Unable to reach the daemon at {args.socket} or open/create important files")
+		return 1
+
+	for line, column, diagnostic in response["diagnostics"]:
+		print(f"Line {line}: {diagnostic}")
+	if response["diagnostics"]:
+		print(summary(response["diagnostics"], response["limited"]))
+	for name, count in response["stats"].items():
+		print(f"{name}: {count}")
+
+	return 1 if response["diagnostics"] else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,16 +1,29 @@
 # --- Imports --- #
 
+import contextlib
 import datetime as dt
-from pprint import pprint
+import ir
+import os
+from backend import Backend
+from diagnostics import MAX_ERRORS, CompileError, Diagnostic, Diagnostics
+from emitter import Emitter
+from expression import BINARY, COMPARISON, UNARY, Node, Operator, combine, evaluationOrder, leaf, rule
+from instrument import Recorder
+from interface import Interface, InterfaceLoader, UnitSymbolTable, exportLabel, isExported, makeInterface, sourceDigest
+from ir import IR
+from peephole import Peephole
+from listing import listingHeader, renderListing, wantListing
+from lexer import END_OF_FILE, KEYWORDS, LITERALS, TYPES, Token, tokenize
+from source import SourceBuffer
 from stack import Stack
+from result import CompileResult
 from ste import SymbolTableEntry
+from symtab import SymbolTable
 
 # --- Variables --- #
 
-#tuple = frozen list (basically)
-TYPES = {"int", "bool", "str", "char", "list",} #set, dict, stream
-KEYWORDS = {"frozen", "not", "raise"} | TYPES #"class", "def"
-SPEC_SYMBOLS = {"=", "-", "+", "<", ">", "(", ")", '[', ']'}
+VERSION : str = "0.2.0"
+TEMP_FORMAT : str = "_t{}" #Name and label of a temp; no identifier starts with '_', so none can clash
 ERRORS = {"ArithmeticError", "AssertionError",
 					"AttributeError", "BaseException",
 					"BlockingIOError", "BrokenPipeError",
@@ -42,173 +55,232 @@ ERRORS = {"ArithmeticError", "AssertionError",
 
 class Compiler(object):
 
-	END_OF_FILE : chr = '0x04' #My choice
+	END_OF_FILE : chr = END_OF_FILE
 
-	def __init__(self, *args):
-		"""Constructor for Compiler()"""
+	def __init__(self, source : SourceBuffer, title : str = "", timestamp : dt.datetime = None, objectStream = None, optimize : int = 0, tokens = None, recorder : Recorder = None, maxErrors : int = MAX_ERRORS, symbolTable : SymbolTable = None, loader : InterfaceLoader = None, ir : IR = None):
+		"""Constructor for Compiler(), lexing source itself unless given its tokens, into a new SymbolTable and IR unless given them
+
+		With a Recorder, __main__ times each phase and statement into it (see instrument()).
+		Errors are collected until there are maxErrors of them (0 for no limit).
+		With a loader, source is compiled as the unit title, which may import other units'
+		interfaces and whose code is linked by link.py, rather than as a whole program.
+		"""
 
 		#SymbolTable Stuff
-		self.__symbolTable : dict = {}
+		if symbolTable is not None:
+			self.__symbolTable = symbolTable
+		elif loader is not None:
+			self.__symbolTable = UnitSymbolTable(self.importConflict)
+		else:
+			self.__symbolTable = SymbolTable()
 
 		types = tuple((type[0].upper() for type in TYPES))
 		self.__counts = dict(zip(types, (-1,)*len(types)))
 
-		#Registers
-		self.__contentsOfAReg = ""
-		self.__definedStorage = False
+		#Units
+		self.__loader : InterfaceLoader = loader
+		self.__imports : dict = {} #Unit -> its Interface, in import order
+		self.__imported : dict = self.__symbolTable.imported if loader is not None else {} #Imported name in use -> its global label
+
+		#Intermediate Code
+		self.__ir : IR = ir if ir is not None else IR()
+
+		#Temps
+		self.__tempNo : int = -1
 
 		#Stacks
 		self.__operatorStk = Stack()
 		self.__operandStk = Stack()
 
 		# Lexical Stuff
-		self.__ch : chr = ''
+		self.__current : Token = Token("EOF", END_OF_FILE, 0, 0)
 		self.__token : str = ""
-		self.__comment : str = ""
 
 		#Error
-		self.__lineNo : int = 0
 		self.__errorCount : int = 0
-		self.__check : bool = True
 
 		# Other
-		if len(args) == 2:
-			self.__title : str = args[1]
-			args = (self.__title,)*3
-
-		try:
-			self.__sourceFile = open(f"{args[0]}.cmn", "r")
-			self.__listingFile = open(f"{args[1]}.ccmn", "w")
-			self.__objectFile = open(f"{args[2]}.asm", "w")
-		except Exception:
-			print("CompilerError: Unable to open/create important files")
-			exit(1)
-
-	def isBoolean(self, s : str):
-		return s == "True" or s == "False"
-
-	def isInteger(self, s : str):
-		return (s[0] == '+' or s[0] == '-' and s[1:].isdigit()) or s.isdigit()
-
-	def isString(self, s : str):
-		return s[0] == '\"' and s[-1] == '\"'
-
-	def isChar(self, s : str):
-		return s[0] == '\'' and s[-1] == '\''
-
-	def isList(self, s : str): # NEW
-		return s[0] == '[' and s[-1] == ']'
-
-	def isSpecSymbol(self, s : str):
-		return s in SPEC_SYMBOLS
+		self.__title : str = title
+		self.__timestamp : dt.datetime = timestamp
+		self.__source : SourceBuffer = source
+		self.__tokens = iter(tokens) if tokens is not None else tokenize(source.text)
+		self.__diagnostics = Diagnostics(maxErrors)
+		self.__optimizer = Peephole(optimize) if optimize else None
+		self.__emitter = Emitter(objectStream, optimizer=self.__optimizer)
+		self.__backend = Backend(self.__ir, self.__symbolTable, self.__emitter, title, optimize, self.__imported if loader is not None else None)
+		self.__options : dict = {"optimize" : optimize}
+		self.__recorder : Recorder = recorder
+
+	@property
+	def asm(self) -> str:
+		return self.__emitter.getvalue()
+
+	@property
+	def listing(self) -> str:
+		"""The .ccmn, rendered now from the source and the diagnostics so far
+
+		A compile that stopped at the error limit is listed only as far as its last error.
+		"""
+
+		diagnostics = self.__diagnostics
+		lastLine = diagnostics[-1].line if diagnostics.full else 0
+		return renderListing(self.__source, self.__title, self.__timestamp, diagnostics, lastLine)
+
+	@property
+	def diagnostics(self) -> Diagnostics:
+		return self.__diagnostics
+
+	@property
+	def current(self) -> Token:
+		"""The token being looked at"""
+		return self.__current
+
+	@property
+	def interface(self) -> Interface:
+		"""What the unit exports: every symbol it declares, under its global label"""
+
+		title = self.__title
+		symbols = {name : entry._replace(internalName=exportLabel(title, name, entry), alloc="NO")
+			for name, entry in self.__symbolTable.items() if name not in self.__imported and isExported(name)}
+		imports = {unit : interface.digest for unit, interface in self.__imports.items()}
+
+		return makeInterface(title, symbols, imports, self.__backend.externs, sourceDigest(self.__source.text, self.__options))
+
+	@property
+	def symbolTable(self) -> SymbolTable:
+		return self.__symbolTable
+
+	@property
+	def nameCounts(self) -> dict:
+		"""Number of the last internal name given out, by type letter"""
+		return self.__counts
+
+	@property
+	def ir(self) -> IR:
+		return self.__ir
+
+	@property
+	def stats(self) -> dict:
+		"""Counters of the compile, such as instructions removed by each peephole rule"""
+
+		stats : dict = self.__backend.stats
+		if self.__optimizer is not None:
+			stats.update((f"peephole.{name}", count) for name, count in self.__optimizer.counts.items())
+		return stats
 
 	def isKeyword(self, s : str):
-		return (s in KEYWORDS or self.isBoolean(s))
-
-	def isNonKeyId(self, s : str):
-		return not self.isKeyword(s) and all(True if ch.isalnum() or ch == '_' else False for ch in s)
-
-	def isLiteral(self, s : str):
-		return self.isInteger(s) or self.isBoolean(s) or s == "not True" or s == "not False" or self.isString(s) or self.isChar(s) or self.isList(s)
+		return s in KEYWORDS or s == "True" or s == "False"
 
 	def isTemp(self, s : str):
-		return s[0] == "T" and s != "True"
+		return s[:2] == TEMP_FORMAT[:2]
 
 	# def isConst(self, s : str):
 		# return all((True if char.isupper() or char.isdigit() or char == '_' else False for char in s))
 
-	def isType(self, s : str):
-		return s in TYPES
-
 	def isError(self, s : str):
 		return s in ERRORS
 
-	def processError(self, err="") -> None:
-		"""Outputs error messages to .ccmn"""
+	def processError(self, err="", at : Token = None) -> None:
+		"""Records the error, at the current token unless given another, and raises a CompileError, which abandons the statement (see prog())"""
 
-		print(f"Line {self.__lineNo}: {err}")
+		at = at or self.__current
+		diagnostic = Diagnostic(at.line, at.column, err)
 		self.__errorCount += 1
-		self.__listingFile.write(f"\nLine {self.__lineNo}: {err}\n\n")
-		self.__listingFile.write("Automatically generated from compiler.py...\n") # self.__createListingFooter()
-		exit(self.__errorCount)
+		self.__diagnostics.add(diagnostic)
+		raise CompileError(diagnostic)
 
-	def createHeaders(self):
-		"""Creates headers from .ccmn and .asm"""
-
-		time = dt.datetime.now(dt.timezone.utc)
-
-		self.__listingFile.write("{}\t{}\n\n".format(self.__title, time.strftime("%Y/%m/%D %H:%M %Z")))
-		self.emitPrologue()
-
-	def whichType(self, name : str):
-		"""Determines the type of a variable"""
+	def whichType(self, token : Token):
+		"""Determines the type of a literal or variable token"""
 
 		datatype : str = ""
 
-		if self.isLiteral(name):
-			if self.isBoolean(name) or name == "not True" or name == "not False":
-				datatype = "BOOL"#BOOLEAN"
-			elif self.isInteger(name):
-				datatype = "INT"#INTEGER"
-			elif self.isChar(name):
-				datatype = "CHAR"
-			elif self.isList(name): # NEW
-				datatype = "LIST" # NEW
-			else:
-				datatype = "STR"#STRING"
+		if token.kind in LITERALS:
+			datatype = token.kind
+		elif token.text in self.__symbolTable:
+			datatype = self.__symbolTable[token.text].type
 		else:
-			if name in self.__symbolTable:
-				datatype = self.__symbolTable[name][1]
-			else:
-				self.processError("ReferenceError: No type determined")
+			self.processError("ReferenceError: No type determined")
 
 		return datatype
 
-	def whichValue(self, name : str):
-		"""Determines value of a variable"""
+	def whichValue(self, token : Token):
+		"""Determines value of a literal or variable token"""
 
-		value : str
+		value : str = ""
 
-		if self.isLiteral(name):
-			value = name
+		if token.kind in LITERALS:
+			value = token.text
+		elif token.text in self.__symbolTable:
+			value = self.__symbolTable[token.text].value
 		else:
-			if name in self.__symbolTable:
-				value = self.__symbolTable[name].value
-			else:
-				processError("ReferenceError: No type determined")
+			self.processError("ReferenceError: No type determined")
 
 		return value
 
 	def prog(self):
-		"""Overall program 'statement'"""
+		"""Overall program 'statement', recovering from errors in panic mode until the error limit"""
+
+		while self.__current.kind != "EOF":
+			line = self.__current.line
+			try:
+				self.statement()
+			except CompileError:
+				if self.__diagnostics.full or not self.recover(line):
+					return
+
+	def statement(self):
+		"""One statement, dispatched on its first token"""
 
 		type : str = ""
+		kind = self.__current.kind
 
-		while self.__token != self.END_OF_FILE:
-			if self.__token == "frozen": #Constant
-				self.nextToken()
-				self.assignStmt(self.typeStmts(), "CONST")
-			elif self.isType(self.__token): #Variable
-				self.assignStmt(self.typeStmts(), "VAR")
-			elif self.isNonKeyId(self.__token): #Variable
-				type = self.typeStmts()
-				if self.__token == '=':
-					self.assignStmt(type)
-				elif self.__token == "<<":#"<-":
-					self.writeStmt()
-				elif self.__token == ">>":#"->":
-					self.readStmt()
-			elif self.__token == "raise":
+		if kind == "KEYWORD" and self.__token == "frozen": #Constant
+			self.nextToken()
+			self.assignStmt(self.typeStmts(), "CONST")
+		elif kind == "TYPE": #Variable
+			self.assignStmt(self.typeStmts(), "VAR")
+		elif kind == "ID": #Variable
+			type = self.typeStmts()
+			if self.__token == '=':
+				self.assignStmt(type)
+			elif self.__token == "<<":#"<-":
+				self.writeStmt()
+			elif self.__token == ">>":#"->":
+				self.readStmt()
+		elif kind == "KEYWORD" and self.__token == "raise":
+			self.nextToken()
+			self.raiseStmt()
+		elif kind == "KEYWORD" and self.__token == "import":
+			self.nextToken()
+			self.importStmt()
+		else:
+			self.processError(f"SyntaxError: Keyword expected, not {self.__token}")
+
+	def recover(self, line : int) -> bool:
+		"""Panic mode: drops the failed statement and resumes at the first token after line
+
+		Statements take one line each, so whatever is left of the line is skipped, along with
+		any lexical errors (which are still reported). Returns False once the error limit is hit.
+		"""
+
+		self.__operatorStk = Stack()
+		self.__operandStk = Stack()
+		self.__tempNo = -1
+
+		while self.__current.kind != "EOF" and (self.__current.line <= line or self.__current.kind == "ERROR"):
+			try:
 				self.nextToken()
-				self.raiseStmt()
-			else:
-				self.processError(f"SyntaxError: Keyword expected, not {self.__token}")
+			except CompileError:
+				if self.__diagnostics.full:
+					return False
+
+		return True
 
 	def typeStmts(self):
 
 		type : str = ""
 
-		if self.isType(self.__token):
+		if self.__current.kind == "TYPE":
 			type = self.__token.upper()
 			# type = self.__token
 			# if type == "int":
@@ -231,40 +303,152 @@ class Compiler(object):
 	def assignStmt(self, type : str, mode : str = "VAR"):
 
 		x : str
-		y : str
+		y : Node
 
 		if self.__token != "=":
 			self.processError(f"SyntaxError: Expected \'=\', got {self.__token}")
 
-		y = self.nextToken()
-
-		if (self.__token == "+" or self.__token == "-"): #If positive or negative int
-			self.nextToken()
-			if not self.isInteger(self.__token):
-				self.processError("SyntaxError: Integer expected after sign")
-			y += self.__token
-			if y[0] == '+':
-				y = y[1:]
-		elif self.__token == "not":
-			self.nextToken()
-			if not self.isBoolean(self.__token):
-				self.processError("SyntaxError: Boolean expected after \"not\"")
-			y += f" {self.__token}"
-
-		if not (self.isBoolean(self.__token) or self.isInteger(self.__token) or self.isString(self.__token) or
-		self.isChar(self.__token) or self.isList(self.__token) or self.isNonKeyId(self.__token)):
-			self.processError(f"SyntaxError: Expected boolean, integer, string, char, or list, got {self.__token}")
+		equals : Token = self.__current
+		line : int = equals.line
+		self.nextToken()
+		start : Token = self.__current
+		y = self.expression(equals)
 
 		if (type != ""): #For explicit vars
-			if (self.whichType(self.__token) != type):
-				self.processError(f"TypeError: The stated type \"{type}\" was not the type given")
+			if (y.type != type):
+				self.processError(f"TypeError: The stated type \"{type}\" was not the type given", start)
 
 		x = self.__operandStk.pop()
+		if x in self.__symbolTable and self.__symbolTable[x].mode == "CONST": #Optimized code uses the declared value wherever it is read
+			self.processError("RedefinitionError: You may not redefine a constant", start)
+		if x in self.__symbolTable and self.__symbolTable[x].type != y.type: #A copy moves one dword, so only between the same type
+			self.processError(f"TypeError: {x} is {self.__symbolTable[x].type}, not {y.type}", start)
+
+		if y.op is None: #A literal, folded or not, or a name
+			if x not in self.__symbolTable:
+				inType = self.whichType(y.token)
+				self.insert(x, inType, mode, self.storedValue(inType, self.whichValue(y.token)), "YES", 1)
+			else:
+				self.code("=", self.operandOf(y), x, line=line)
+			return
+
+		if mode == "CONST":
+			self.processError("ValueError: A frozen value must be known at compile time", start)
 		if x not in self.__symbolTable:
-			self.insert(x, self.whichType(y), mode,  self.whichValue(y), "YES", 1)
-		else:
-			self.code("=", self.__token, x)
-		self.nextToken()
+			self.insert(x, y.type, mode, "1", "YES", 1) #One dword of .bss, as for a temp: the value is only known at run time
+
+		self.generate(y, x, line)
+
+	def expression(self, after : Token) -> Node:
+		"""Parses the expression following the token after, with the operator and operand stacks, and returns its tree
+
+		Operators wait on the operator stack until one that binds less tightly, a ')' or the end
+		of the expression, then take their operands off the operand stack (see reduce()). The
+		expression ends at the first token that cannot continue it, and only goes on past the end
+		of line, the line of the token before it, inside parentheses.
+		"""
+
+		operators : Stack = self.__operatorStk
+		floor : int = len(operators)
+		depth : int = 0
+		expectOperand : bool = True
+		previous : Token = after
+		line : int = after.line
+
+		while True:
+			token = self.__current
+			text = self.__token
+			symbol : bool = token.kind == "SYMBOL" or token.kind == "KEYWORD"
+
+			if expectOperand:
+				if not depth and token.line != line:
+					self.processError("SyntaxError: Expected boolean, integer, string, char, or list, got the end of the line", previous)
+				elif symbol and text == "(":
+					operators.add(Operator("(", 0, token))
+					depth += 1
+				elif symbol and text in UNARY:
+					operators.add(Operator(text, 1, token))
+				elif token.kind in LITERALS or token.kind == "ID":
+					self.__operandStk.add(leaf(token, self.whichType(token)))
+					expectOperand = False
+				else:
+					self.processError(f"SyntaxError: Expected boolean, integer, string, char, or list, got {text}")
+			elif symbol and text in BINARY and (depth or token.line == line):
+				precedence : int = BINARY[text].precedence
+				self.reduce(floor, precedence + 1 if precedence == COMPARISON else precedence)
+				if precedence == COMPARISON and len(operators) > floor and operators.top().arity and rule(operators.top().text, operators.top().arity).precedence == COMPARISON:
+					self.processError("SyntaxError: Comparisons cannot be chained, put one in parentheses", token)
+				operators.add(Operator(text, 2, token))
+				expectOperand = True
+			elif symbol and text == ")" and depth:
+				self.reduce(floor, 0)
+				operators.pop()
+				depth -= 1
+			else:
+				break
+
+			line = token.line
+			previous = token
+			self.nextToken()
+
+		self.reduce(floor, 0)
+		if depth:
+			self.processError("SyntaxError: '(' was never closed", operators.top().token)
+		return self.__operandStk.pop()
+
+	def reduce(self, floor : int, precedence : int):
+		"""Applies the stacked operators above floor, down to a '(', that bind at least as tightly as precedence"""
+
+		operators : Stack = self.__operatorStk
+		operands : Stack = self.__operandStk
+
+		while len(operators) > floor and operators.top().arity and rule(operators.top().text, operators.top().arity).precedence >= precedence:
+			op : Operator = operators.pop()
+			args : tuple = tuple(reversed([operands.pop() for _ in range(op.arity)]))
+			types : tuple = tuple(arg.type for arg in args)
+
+			if any(type not in rule(op.text, op.arity).types for type in types) or len(set(types)) > 1:
+				self.processError(f"TypeError: {op.text} cannot be applied to {' and '.join(types)}", op.token)
+
+			try:
+				operands.add(combine(op.text, args))
+			except ZeroDivisionError:
+				self.processError("ZeroDivisionError: integer division or modulo by zero", op.token)
+
+	def operandOf(self, node : Node) -> str:
+		"""Symbol holding the value of a leaf, entering a literal as a constant the first time it is used"""
+
+		token : Token = node.token
+		if token.kind == "ID":
+			return token.text
+
+		name : str = str(token.text)
+		if name not in self.__symbolTable:
+			self.__symbolTable[name] = SymbolTableEntry(self.genInternalName(token.kind), token.kind, "CONST", self.storedValue(token.kind, token.text), "YES", 1)
+		return name
+
+	def generate(self, node : Node, target : str = "", line : int = 0) -> str:
+		"""Emits the IR computing node into target, or a temp, and returns where its value is
+
+		Operands are computed in Sethi-Ullman order and their temps freed as soon as they have
+		been used, so an expression holds as few temps at once as it can. The code is put on the
+		statement's line.
+		"""
+
+		if node.op is None:
+			return self.operandOf(node)
+
+		order : tuple = evaluationOrder(node.operands)
+		names : list = [""] * len(order)
+		for i in order:
+			names[i] = self.generate(node.operands[i], line=line)
+		for i in reversed(order):
+			if self.isTemp(names[i]):
+				self.freeTemp()
+
+		target = target or self.getTemp(node.type)
+		self.code(node.op, names[-1], names[0] if len(names) == 2 else "", target, line)
+		return target
 
 	def raiseStmt(self):
 
@@ -277,7 +461,7 @@ class Compiler(object):
 		self.nextToken()
 		if self.__token == '(':
 			info = self.nextToken()
-			if not (self.isInteger(self.__token) or self.isString(self.__token) or self.isChar(self.__token)):
+			if self.__current.kind not in ("INT", "STR", "CHAR"):
 				self.processError("SyntaxError: Illegal symbol in raise statement")
 
 		self.nextToken()
@@ -287,6 +471,35 @@ class Compiler(object):
 		# self.insert("E")
 		# self.processError(f"{error}: {info}")
 
+	def importStmt(self):
+		"""Declares the symbols another unit exports, as its interface describes them"""
+
+		unit : str = self.__token
+
+		if self.__current.kind != "ID":
+			self.processError(f"SyntaxError: Expected a unit name, got {self.__token}")
+		if self.__loader is None:
+			self.processError("ImportError: Only units can import, see link.py")
+		if unit == self.__title:
+			self.processError(f"ImportError: {unit} cannot import itself")
+
+		if unit not in self.__imports:
+			interface = self.__loader.load(unit)
+			if interface is None:
+				self.processError(f"ImportError: No interface for unit {unit}, it must be built first")
+
+			for name in list(iter(self.__symbolTable)): #Its exports are only looked up as they are used
+				if name in interface.symbols:
+					self.processError(f"ImportError: {name} from {unit} is already defined")
+
+			self.__imports[unit] = interface
+			self.__symbolTable.addInterface(interface)
+
+		self.nextToken()
+
+	def importConflict(self, name : str, units : list) -> None:
+		self.processError(f"ImportError: {name} is exported by both {units[0]} and {units[1]}")
+
 	def readStmt(self):
 
 		if self.__token != ">>":
@@ -307,110 +520,64 @@ class Compiler(object):
 		self.code("<<", self.__token, self.__operandStk.pop())
 		self.nextToken()
 
-	def code(self, op : str, rhs : str = "", lhs : str = ""):
-		"""Placeholder for important function"""
+	def code(self, op : str, rhs : str = "", lhs : str = "", dst : str = "", line : int = 0):
+		"""Checks a statement and appends its intermediate code, on line or the current token's
+
+		For an operator, dst = lhs op rhs, or dst = op rhs without lhs.
+		"""
+
+		symbol = self.__ir.symbol
+		line = line or self.__current.line
+
 		if op == "=":
-			self.emitAssignCode(rhs, lhs)
+			if rhs not in self.__symbolTable: #if name is not in symbol table
+				self.processError(f"ReferenceError: {rhs} is not in symbol table") #processError(reference to undefined symbol)
+
+			self.__ir.add(ir.COPY, symbol(lhs), symbol(rhs), line=line)
 		elif op == "<<":
-			self.emitWriteCode(rhs, lhs)
+			if lhs not in self.__symbolTable:
+				self.processError(f"ReferenceError: {lhs} is not in symbol table")
+			if rhs not in self.__symbolTable:
+				self.processError(f"ReferenceError: {rhs} is not in symbol table")
+			if self.__symbolTable[rhs].type not in ("INT", "BOOL"): #WriteInt and TRUE/FALSE are all the .asm can write
+				self.processError(f"TypeError: {rhs} is {self.__symbolTable[rhs].type}, only int and bool can be written")
+
+			self.__ir.add(ir.WRITE, src1=symbol(rhs), src2=symbol(lhs), line=line)
 		elif op == ">>":
-			self.emitReadCode(rhs, lhs)
+			if lhs not in self.__symbolTable:
+				self.processError(f"ReferenceError: {lhs} is not in symbol table")
+			if rhs not in self.__symbolTable: #if name is not in symbol table
+				self.processError(f"ReferenceError: {rhs} is not in symbol table") #processError(reference to undefined symbol)
+
+			if self.__symbolTable[rhs].type != "INT": #"INTEGER": #if data type of name is not INTEGER
+				self.processError("can't read variables of this type")# processError(can't read variables of this type)
+
+			if self.__symbolTable[rhs].mode != "VAR": #if storage mode of name is not VAR
+				self.processError("attempting to read to a read-only location") #processError(attempting to read to a read-only location)
+
+			self.__ir.add(ir.READ, symbol(rhs), symbol(lhs), line=line)
+		elif op in BINARY or op in UNARY:
+			for name in (rhs, lhs, dst):
+				if name and name not in self.__symbolTable:
+					self.processError(f"ReferenceError: {name} is not in symbol table")
+
+			if lhs:
+				self.__ir.add(BINARY[op].opcode, symbol(dst), symbol(lhs), symbol(rhs), line=line)
+			else:
+				self.__ir.add(UNARY[op].opcode, symbol(dst), symbol(rhs), line=line)
 		else:
 			self.processError("CompilerError: Function code should not be called with illegal arguments")
 
 	def nextToken(self) -> str:
 		"""Determines the next token"""
 
-		self.__comment = ""
-		self.__token = ""
-
-		while self.__token == "":
-			if self.__ch == '#':
-				while self.__ch != '\n' and self.__ch != self.END_OF_FILE:
-					self.__comment += self.__ch
-					self.nextChar()
-			elif self.__ch.isspace():
-				self.nextChar()
-
-			elif self.__ch == "<":
-				self.__token += self.__ch
-				self.nextChar()
-				if self.__ch == "<":
-					self.__token += self.__ch
-					self.nextChar()
-			elif self.__ch == ">":
-				self.__token += self.__ch
-				self.nextChar()
-				if self.__ch == ">":
-					self.__token += self.__ch
-					self.nextChar()
-
-			elif self.__ch == '\'':
-				self.__token += self.__ch
-				self.__token += self.nextChar()
-				if self.nextChar() != '\'':
-					self.processError("SyntaxError: Unexpected letter")
-				if self.__ch == self.END_OF_FILE:
-					self.processError("EOFError: Unexpected EOF")
-				self.__token += self.__ch
-				self.nextChar()
-			elif self.__ch == '\"':
-				self.__token += self.__ch
-				while self.nextChar() != '\"':
-					if self.__ch == self.END_OF_FILE:
-						self.processError("EOFError: Unexpected EOF")
-					self.__token += self.__ch
-				self.__token += self.__ch
-				self.nextChar()
-			elif self.__ch == '[': #NEW
-				self.__token += self.__ch
-				while self.nextChar() != ']':
-					if self.__ch == self.END_OF_FILE:
-						self.processError("EOFError: Unexpected EOF")
-					self.__token += self.__ch
-				self.__token += self.__ch
-				self.nextChar()
-
-			elif self.isSpecSymbol(self.__ch):
-				self.__token = self.__ch
-				self.nextChar()
-			elif self.__ch.isalpha() and self.__ch != self.END_OF_FILE: #upper is implied const, lower is implied variable
-				while (self.__ch.isalpha() or self.__ch.isdigit() or self.__ch == '_') and self.__ch != self.END_OF_FILE:
-					self.__token += self.__ch
-					self.nextChar()
-
-				if self.__ch == self.END_OF_FILE:
-					self.processError("EOFError: Unexpected EOF")
-			elif self.__ch.isdigit():
-				self.__token = self.__ch
-				while (self.nextChar().isdigit() and self.__ch != self.END_OF_FILE):
-					self.__token += self.__ch;
-			elif self.__ch == self.END_OF_FILE:
-				self.__token = self.__ch
-			else:
-				self.processError(f"SyntaxError: Invalid symbol {self.__ch} received...")
+		self.__current = next(self.__tokens, self.__current)
+		if self.__current.kind == "ERROR":
+			self.processError(self.__current.text)
 
+		self.__token = self.__current.text
 		return self.__token
 
-	def nextChar(self) -> chr:
-		"""Gets the next character from the file"""
-
-		self.__ch = self.__sourceFile.read(1)
-		if not self.__ch:
-			self.__ch = self.END_OF_FILE
-
-		if self.__ch != self.END_OF_FILE:
-			if self.__check:
-				self.__lineNo += 1;
-				self.__listingFile.write("{:>5}| ".format(self.__lineNo))
-				self.__check = False;
-
-			self.__listingFile.write(self.__ch)
-			if self.__ch == '\n':
-				self.__check = True
-
-		return self.__ch
-
 	def genInternalName(self, value : str):
 		"""Determines the internal name for the variable"""
 
@@ -433,21 +600,14 @@ class Compiler(object):
 		# else:
 			# return ""
 
-	def getLabel(self):
-		"""Return a label name"""
-
-		self.__labelCount += 1
-		return f".L{self.__labelCount}"
-
-	def getTemp(self):
+	def getTemp(self, type : str = "INT"):
+		"""The next free temp, _t1.._tn, given one dword of .bss the first time and retyped for this use"""
 
 		temp : str = ""
 
 		self.__tempNo += 1
-		temp = f"t{self.__tempNo}"
-		if self.__tempNo > self.__maxTempNo:
-			insert(temp, "UNKNOWN", "VARIABLE", "1", "NO", 1)
-			self.__maxTempNo += 1
+		temp = TEMP_FORMAT.format(self.__tempNo + 1)
+		self.__symbolTable[temp] = SymbolTableEntry(temp, type, "VAR", "1", "YES", 1)
 
 		return temp
 
@@ -455,7 +615,7 @@ class Compiler(object):
 		"""Free temporary variable from its captivity"""
 
 		self.__tempNo -= 1
-		if self.__tempNo < 0:
+		if self.__tempNo < -1:
 			self.processError("CompilerError: tempNo should be ≥ –1")
 
 	def insert(self, externalName : str, inType : str, inMode : str, inValue : str, inAlloc : str, inUnits : str):
@@ -470,142 +630,206 @@ class Compiler(object):
 		for n in name:
 			if self.isKeyword(n):
 				self.processError("SyntaxError: Illegal use of a keyword")
-			elif (len(self.__symbolTable) >= 512):
-				self.processError("OverflowError: Symbol Table holds too many symbols.")
 			elif n in self.__symbolTable:
 				if self.__symbolTable[n].mode == "CONST":
 					self.processError("RedefinitionError: You may not redefine a constant")
 			# else:
-			if inType == "BOOL":#"BOOLEAN":
-				if inValue == "False":
-					inValue = '0'
-				else:
-					inValue = "-1"
-			elif inType == "LIST" and inValue[0] == '[' and inValue[-1] == ']':
-				inValue = inValue[1:-1]
-
 			self.__symbolTable[n] = SymbolTableEntry(self.genInternalName(inType),inType,inMode,inValue,inAlloc,inUnits)
 			# print(self.__symbolTable[n])
 
-	def emit(self, label : str = "", instruction : str = "", operands : str = "", comment : str = ""):
-		"""Output assembly code"""
-		self.__objectFile.write("{:8}{:8}{:24}{}\n".format(label, instruction, operands, comment))
-
-	def emitPrologue(self):
-		"""Prologue assembly code"""
-
-		self.__objectFile.write("%INCLUDE \"Along32.inc\"\n%INCLUDE \"Macros_Along.inc\"\n\n")
-		self.emit("SECTION", ".text")
-		self.emit("global", "_start", "", f"; {self.__title}\n")
-		self.emit("_start:")
-
-	def emitStorage(self):
-		"""Variable storage assembly code"""
-
-		self.emit("SECTION", ".data")
-		for k,v in self.__symbolTable.items():
-			if v.mode == "CONST" and v.alloc == "YES":
-				if v.type == "STR" or v.type == "CHAR":
-					self.emit(v.internalName, "dd", f"{v.value},0", f"; {k}")
-				else:
-					self.emit(v.internalName, "dd", v.value, f"; {k}")
-
-		self.__objectFile.write("\n")
-		self.emit("SECTION", ".bss")
-		for k,v in self.__symbolTable.items():
-			if v.mode == "VAR" and v.alloc == "YES":
-				if v.type == "STR" or v.type == "CHAR":
-					self.emit(v.internalName, "resd", f"{v.value},0", f"; {k}")
-				else:
-					self.emit(v.internalName, "resd", v.value, f"; {k}")
-
-	def emitAssignCode(self, rhs : str, lhs : str):
+	@staticmethod
+	def storedValue(inType : str, inValue : str):
+		"""How a value of inType is kept in the symbol table: bools as 0 or -1, lists without brackets"""
 
-		if rhs not in self.__symbolTable: #if name is not in symbol table
-			self.processError(f"ReferenceError: {rhs} is not in symbol table") #processError(reference to undefined symbol)
-
-		if self.__contentsOfAReg != rhs:
-			self.emit("", "mov", f"eax,[{self.__symbolTable[rhs].internalName}]")
-		self.emit("", "mov", f"[{self.__symbolTable[lhs].internalName}],eax")
-
-	def emitReadCode(self, rhs : str, lhs : str):
-
-		name : str = rhs
-
-		if lhs not in self.__symbolTable:
-			self.processError(f"ReferenceError: {lhs} is not in symbol table")
-		if name not in self.__symbolTable: #if name is not in symbol table
-			self.processError(f"ReferenceError: {name} is not in symbol table") #processError(reference to undefined symbol)
-
-		if self.whichType(name) != "INT": #"INTEGER": #if data type of name is not INTEGER
-			self.processError("can't read variables of this type")# processError(can't read variables of this type)
+		if inType == "BOOL":#"BOOLEAN":
+			if inValue == "False":
+				inValue = '0'
+			else:
+				inValue = "-1"
+		elif inType == "LIST" and inValue[0] == '[' and inValue[-1] == ']':
+			inValue = inValue[1:-1]
 
-		if self.__symbolTable[name].mode != "VARIABLE": #if storage mode of name is not VARIABLE
-			self.processError("attempting to read to a read-only location") #processError(attempting to read to a read-only location)
+		return inValue
 
-		self.emit("", "call", "ReadInt", "; read int; value placed in eax") #emit code to call the Irvine ReadInt function
-		self.emit("", "mov", f"[{self.__symbolTable[name].internalName}],eax", f"; store eax at {name}") #emit code to store the contents of the A register at name
-		self.__contentsOfAReg = name # set the contentsOfAReg = name
+	def parse(self):
+		"""Front end: checks the program, filling the symbol table and IR
 
-	def emitWriteCode(self, rhs : str, lhs : str):
+		Raises one CompileError for every diagnostic at the end, so there is nothing to lower.
+		"""
 
-		name : str = rhs
+		running : bool = True
 
-		if lhs not in self.__symbolTable:
-			self.processError(f"ReferenceError: {lhs} is not in symbol table")
-		if name not in self.__symbolTable:
-			self.processError(f"ReferenceError: {name} is not in symbol table")
+		try:
+			self.nextToken()
+		except CompileError:
+			running = not self.__diagnostics.full and self.recover(0)
 
-		if self.__contentsOfAReg != name:
-			self.emit("", "mov", f"eax,[{self.__symbolTable[name].internalName}]", f"; load {name} in eax") #emit the code to load name in the A register
-			self.__contentsOfAReg = name
+		if running:
+			self.prog()
 
-		if self.__symbolTable[name].type == "INT": #"INTEGER":
-			self.emit("", "call", "WriteInt", "; write int in eax to standard out")
-		else:
-			self.emit("", "cmp", "eax,0", "; compare to 0") #emit code to compare the A register to 0
+		diagnostics = self.__diagnostics
+		if diagnostics:
+			raise CompileError(diagnostics[0], diagnostics=diagnostics, limited=diagnostics.full)
 
-			label : str = self.getLabel() #acquire a new label Ln
-			self.emit("", "je", label, "; jump if equal to print FALSE") #emit code to jump if equal to the acquired label Ln
-			self.emit("", "mov", "edx,TRUELIT", "; load address of TRUE literal in edx") #emit code to load address of TRUE literal in the D register
+	def lower(self):
+		"""Back end: emits the assembly for the IR"""
+		self.__backend.lower()
 
-			label2 : str = self.getLabel() #acquire a new label Ln
-			self.emit("", "jmp", label2, f"; unconditionally jump to {label2}") #emit code to unconditionally jump to label L(n + 1)
-			self.emit(f"{label}:") #emit code to label the next line with the first acquired label Ln
-			self.emit("", "mov", "edx,FALSLIT", "; load address of FALSE literal in edx") #emit code to load address of FALSE literal in the D register
-			self.emit(f"{label2}:") #emit code to label the next line with the second acquired label L(n + 1)
-			self.emit("", "call", "WriteString", "; write string to standard out") #emit code to call the Irvine WriteString function
+	def instrument(self):
+		"""Points the statement, storage and peephole methods at timed wrappers and lexes up front
 
-			if not self.__definedStorage: #if static variable definedStorage is false
-				self.__definedStorage = True #set definedStorage to true
-				self.__objectFile.write("\n") #output an endl to objectFile
-				self.emit("SECTION", ".data") #emit code to begin a .data SECTION
-				self.emit("TRUELIT", "db", "'TRUE',0", "; literal string TRUE") #emit code to create label TRUELIT, instruction db, operands 'TRUE',0
-				self.emit("FALSLIT", "db", "'FALSE',0", "; literal string FALSE\n") #emit code to create label FALSELIT, instruction db, operands 'FALSE',0
-				self.emit("SECTION", ".text") #emit code to resume .text SECTION
+		Only called with a Recorder, so a plain compile never pays for it. Lexing ahead of the
+		parser is what lets the lex phase be told apart from parsing; the tokens are the same.
+		"""
 
-		self.emit("", "call", "Crlf", "; write \r\n to standard out") #emit code to call the Irvine Crlf function
+		recorder = self.__recorder
+		line = lambda: {"line" : self.__current.line}
 
-	def emitEpilogue(self):
-		"""Output epilogue assembly code"""
+		with recorder.span("lex"):
+			self.__tokens = list(self.__tokens)
+		recorder.count("chars", len(self.__source))
+		recorder.count("tokens", len(self.__tokens))
+		self.__tokens = iter(self.__tokens)
 
-		self.emit("", "Exit", "{0}", "\n")
-		self.emitStorage()
+		for name in ("assignStmt", "readStmt", "writeStmt", "raiseStmt", "insert"):
+			setattr(self, name, recorder.wrap(getattr(self, name), name, argsOf=line))
+		self.__backend.emitStorage = recorder.wrap(self.__backend.emitStorage, "emitStorage", "phase")
+		self.__emitter.optimize = recorder.wrap(self.__emitter.optimize, "peephole", "phase")
 
 	def __main__(self):
 		"""Main Function"""
 
-		self.createHeaders()
-		self.nextChar()
-		self.nextToken()
-		self.prog()
-		self.emitEpilogue()
+		recorder = self.__recorder
+		if recorder is None:
+			self.parse()
+			self.lower()
+			return
 
-		pprint(self.__symbolTable)
-
-	def __del__(self):
-		"""Deconstructor for Compiler()"""
-
-		self.__sourceFile.close()
-		self.__listingFile.close()
-		self.__objectFile.close()
+		self.instrument()
+		try:
+			with recorder.span("parse"):
+				self.parse()
+			with recorder.span("lower"):
+				self.lower()
+		finally:
+			recorder.count("symbols", len(self.__symbolTable))
+			recorder.count("ir", len(self.__ir))
+			recorder.count("instructions", self.__emitter.textLines)
+
+
+# --- Functions --- #
+
+def deterministicTime() -> dt.datetime:
+	"""Fixed header time for reproducible output, taken from SOURCE_DATE_EPOCH (default 0)"""
+
+	return dt.datetime.fromtimestamp(int(os.environ.get("SOURCE_DATE_EPOCH", 0)), dt.timezone.utc)
+
+def compileSource(source, title : str = "", timestamp : dt.datetime = None, objectStream = None, optimize : int = 0, recorder : Recorder = None, listing : str = "always", maxErrors : int = MAX_ERRORS) -> CompileResult:
+	"""Compiles Commission source held in a string, text stream or SourceBuffer
+
+	Raises CompileError after collecting every error (at most maxErrors, 0 for no limit); its
+	result holds the output produced up to that point.
+	With an objectStream the assembly is streamed into it in chunks and the result's asm is None.
+	optimize is the optimization level: 0 for none; 1 propagates frozen ints and bools, pools equal
+	literals, leaves out constants nothing refers to and drops redundant moves and jumps; 2 also
+	keeps variables in ebx, ecx and edx and drops dead stores and unreachable code.
+	A Recorder, when given, collects the timings and counters of the compile.
+	listing is one of LISTING_MODES; the result's listing is None when it is not rendered.
+	"""
+
+	if isinstance(source, str):
+		source = SourceBuffer(source, title)
+	elif not isinstance(source, SourceBuffer):
+		source = SourceBuffer(source.read(), title)
+
+	c = Compiler(source, title, timestamp, objectStream, optimize, recorder=recorder, maxErrors=maxErrors)
+	return runCompiler(c, listing, recorder)
+
+def runCompiler(c : Compiler, listing : str = "always", recorder : Recorder = None) -> CompileResult:
+	"""Runs c to the end and returns its CompileResult, or raises CompileError with the result attached"""
+
+	def render(failed : bool) -> str:
+		if not wantListing(listing, failed):
+			return None
+		if recorder is None:
+			return c.listing
+		with recorder.span("listing"):
+			return c.listing
+
+	try:
+		c.__main__()
+	except CompileError as err:
+		err.result = CompileResult(c.asm, render(True), c.symbolTable, list(c.diagnostics), c.stats)
+		raise
+
+	return CompileResult(c.asm, render(False), c.symbolTable, list(c.diagnostics), c.stats)
+
+def writeOutputs(result : CompileResult, listingName : str, objectName : str) -> int:
+	"""Writes the .ccmn and .asm of result that are not None, one write each, returning the bytes written"""
+
+	written : int = 0
+
+	if result.listing is not None:
+		with open(listingName, "w") as listingFile:
+			listingFile.write(result.listing)
+			written += listingFile.tell()
+	if result.asm is not None:
+		with open(objectName, "w") as objectFile:
+			objectFile.write(result.asm)
+			written += objectFile.tell()
+
+	return written
+
+def compileFile(title : str, sourceName : str = "", listingName : str = "", objectName : str = "", cache = None, timestamp : dt.datetime = None, stream : bool = False, optimize : int = 0, recorder : Recorder = None, listing : str = "always", maxErrors : int = MAX_ERRORS) -> CompileResult:
+	"""Compiles sourceName (title.cmn) and writes the .ccmn and .asm, even when there is an error
+
+	With a BuildCache, an unchanged source is copied out of the cache instead of being compiled.
+	With stream, the .asm is written in chunks while compiling instead of once at the end.
+	With a Recorder, reading and writing the files are timed too, and the bytes written counted.
+	The .ccmn is only rendered and written when listing (one of LISTING_MODES) asks for it.
+	"""
+
+	result : CompileResult = None
+	key : str = ""
+
+	listingName = listingName or f"{title}.ccmn"
+	objectName = objectName or f"{title}.asm"
+	timestamp = timestamp or dt.datetime.now(dt.timezone.utc)
+	header : str = listingHeader(title, timestamp)
+	span = recorder.span if recorder is not None else lambda name: contextlib.nullcontext()
+
+	with span("read"):
+		source = SourceBuffer.fromFile(sourceName or f"{title}.cmn")
+
+	if cache is not None: #Cached listings are stored without their header
+		key = cache.key(source.text, title, {"optimize" : optimize, "listing" : wantListing(listing, False)})
+		result = cache.load(key)
+		if result is not None:
+			if result.listing is not None:
+				result = result._replace(listing=header + result.listing)
+			with span("write"):
+				written = writeOutputs(result, listingName, objectName)
+			if recorder is not None:
+				recorder.count("cacheHits")
+				recorder.count("bytes", written)
+			return result
+
+	objectStream = open(objectName, "w") if stream else None
+	try:
+		result = compileSource(source, title, timestamp, objectStream, optimize, recorder, listing, maxErrors)
+	except CompileError as err:
+		result = err.result
+		raise
+	finally:
+		if objectStream is not None:
+			objectStream.close()
+		if result is not None:
+			with span("write"):
+				written = writeOutputs(result, listingName, objectName)
+			if recorder is not None:
+				recorder.count("bytes", written + (os.path.getsize(objectName) if stream else 0))
+
+	if cache is not None and result.asm is not None:
+		cache.store(key, result._replace(listing=result.listing and result.listing[len(header):]))
+
+	return result
@@ -0,0 +1,186 @@
+# --- Imports --- #
+
+import argparse
+import datetime as dt
+import difflib
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import compiler
+from batch import findSources
+from diagnostics import MAX_ERRORS, CompileError, failureMessage
+from source import SourceBuffer
+
+# --- Variables --- #
+
+CaseResult = namedtuple("CaseResult", ["title", "seconds", "drift", "message"]) #drift holds a diff per output that differs from its golden file
+
+OUTPUTS = ("asm", "ccmn")
+THRESHOLD : float = 0.25 #Allowed slowdown of a case against the baseline
+NOISE : float = 0.005 #Seconds a case may slow down by regardless, since small cases time unsteadily
+DIFF_LINES : int = 20 #Lines of each diff shown
+
+
+# --- Functions --- #
+
+def withoutTime(listing : str) -> str:
+	"""listing with the time taken off its header line, which only the title is compared on"""
+
+	header, newline, rest = listing.partition('\n')
+	return header.partition('\t')[0] + newline + rest
+
+def diff(name : str, expected : str, actual : str) -> str:
+	"""The start of a unified diff from expected to actual, empty when they are the same"""
+
+	if expected == actual:
+		return ""
+
+	lines = list(difflib.unified_diff(expected.splitlines(True), actual.splitlines(True), f"{name} (golden)", f"{name} (now)"))
+	if len(lines) > DIFF_LINES:
+		lines = lines[:DIFF_LINES] + [f"... {len(lines) - DIFF_LINES} more lines\n"]
+	return "".join(line if line.endswith('\n') else line + '\n' for line in lines)
+
+def compileCase(source : SourceBuffer, title : str, optimize : int = 0, maxErrors : int = MAX_ERRORS) -> dict:
+	"""Output extension -> text of compiling source, even when it has errors"""
+
+	try:
+		result = compiler.compileSource(source, title, optimize=optimize, maxErrors=maxErrors)
+	except CompileError as err:
+		result = err.result
+
+	return {"asm" : result.asm, "ccmn" : result.listing}
+
+def runCase(path : str, optimize : int = 0, repeat : int = 3, maxErrors : int = MAX_ERRORS, update : bool = False) -> CaseResult:
+	"""Compiles one case repeat times and diffs its outputs against the golden .asm and .ccmn next to it
+
+	The time is the best of the repeats. With update, the golden files are written instead.
+	"""
+
+	title : str = path[:-len(".cmn")]
+	drift : list = []
+
+	try:
+		source = SourceBuffer.fromFile(path)
+		best : float = None
+		for _ in range(repeat):
+			start = time.perf_counter()
+			outputs = compileCase(source, title, optimize, maxErrors)
+			seconds = time.perf_counter() - start
+			best = seconds if best is None else min(best, seconds)
+
+		for extension in OUTPUTS:
+			name = f"{title}.{extension}"
+			if update:
+				with open(name, "w") as file:
+					file.write(outputs[extension])
+				continue
+
+			if not os.path.exists(name):
+				drift.append(f"{name}: no golden file\n")
+				continue
+			with open(name, "r") as file:
+				expected = file.read()
+			drift.append(diff(name, withoutTime(expected), withoutTime(outputs[extension])) if extension == "ccmn" else diff(name, expected, outputs[extension]))
+	except Exception as err:
+		return CaseResult(title, 0.0, [], failureMessage(err))
+
+	return CaseResult(title, best, [text for text in drift if text], "")
+
+def runCorpus(paths : list, jobs : int = 0, optimize : int = 0, repeat : int = 3, maxErrors : int = MAX_ERRORS, update : bool = False) -> list:
+	"""Runs every case across a process pool of jobs workers (one per core by default), in order"""
+
+	worker = partial(runCase, optimize=optimize, repeat=repeat, maxErrors=maxErrors, update=update)
+	jobs = min(jobs or os.cpu_count() or 1, len(paths))
+
+	if jobs <= 1:
+		return [worker(path) for path in paths]
+
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		return list(pool.map(worker, paths))
+
+def compare(results : list, baseline : dict, threshold : float = THRESHOLD) -> dict:
+	"""Title -> message for the cases more than threshold (and NOISE) slower than in baseline"""
+
+	slow : dict = {}
+	cases = baseline.get("cases", {})
+
+	for result in results:
+		old = cases.get(result.title)
+		new = result.seconds
+		if old and new > old * (1 + threshold) and new - old > NOISE:
+			slow[result.title] = f"{old * 1000:.1f} ms -> {new * 1000:.1f} ms (+{(new / old - 1) * 100:.1f}%)"
+
+	return slow
+
+def printResults(results : list, slow : dict, update : bool = False) -> int:
+	"""Prints each case and the totals, returning how many cases failed"""
+
+	failed : int = 0
+
+	for result in results:
+		if result.message:
+			status = "ERROR"
+		elif result.drift:
+			status = "DRIFT"
+		elif result.title in slow:
+			status = "SLOW"
+		else:
+			status = "updated" if update else "ok"
+
+		print("{:>10.1f} ms  {:8}{}".format(result.seconds * 1000, status, result.title))
+		if result.message:
+			print(f"{'':>15}{result.message}")
+		for text in result.drift:
+			print("".join(f"{'':>15}{line}\n" for line in text.splitlines()), end="")
+		if result.title in slow:
+			print(f"{'':>15}{slow[result.title]}")
+
+		failed += status not in ("ok", "updated")
+
+	print("\n{} cases, {} passed, {} failed in {:.3f} s compiling".format(len(results), len(results) - failed, failed, sum(result.seconds for result in results)))
+	return failed
+
+def main(argv : list = None) -> int:
+	"""Runs the corpus, returning 1 when an output drifted from its golden file or a case slowed down"""
+
+	parser = argparse.ArgumentParser(prog="corpus.py", description="Compiles .cmn cases and checks them against their golden .asm and .ccmn. "
+		"Cases are titled by their path as given, so run it from where the golden files were made.")
+	parser.add_argument("patterns", nargs="+", help="cases: .cmn files, directories (searched recursively) or globs")
+	parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: one per core)")
+	parser.add_argument("-O", dest="optimize", type=int, choices=(0, 1, 2), default=0, help="optimization level the golden files were made at")
+	parser.add_argument("-r", "--repeat", type=int, default=3, help="compiles of each case to take the best time of")
+	parser.add_argument("--max-errors", type=int, default=MAX_ERRORS, metavar="N", help="stop after N errors, 0 for no limit (default: %(default)s)")
+	parser.add_argument("--update", action="store_true", help="write the golden files from the current compiler instead of checking them")
+	parser.add_argument("-o", "--output", metavar="FILE", help="write the case times as JSON to FILE, to be a baseline")
+	parser.add_argument("--baseline", metavar="FILE", help="JSON case times of an earlier run to compare against")
+	parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, as a fraction (default %(default)s)")
+	args = parser.parse_args(argv)
+
+	paths = findSources(args.patterns)
+	if not paths:
+		parser.error("no .cmn cases found")
+
+	results = runCorpus(paths, args.jobs, args.optimize, args.repeat, args.max_errors, args.update)
+
+	slow : dict = {}
+	if args.baseline:
+		with open(args.baseline, "r") as file:
+			slow = compare(results, json.load(file), args.threshold)
+
+	failed = printResults(results, slow, args.update)
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump({"optimize" : args.optimize, "repeat" : args.repeat, "version" : compiler.VERSION, "python" : platform.python_version(),
+				"time" : dt.datetime.now(dt.timezone.utc).isoformat(), "cases" : {result.title : result.seconds for result in results}}, file, indent=4)
+
+	return 1 if failed else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,236 @@
+# --- Imports --- #
+
+import argparse
+import asyncio
+import datetime as dt
+import hashlib
+import json
+import os
+import signal
+import socket
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import compiler
+from client import DEFAULT_SOCKET
+from diagnostics import MAX_ERRORS, CompileError, failureMessage
+
+# --- Variables --- #
+
+CACHE_ENTRIES : int = 256
+MAX_PENDING : int = 64 #Compiles waiting for a worker before new ones are turned away
+LINE_LIMIT : int = 1 << 30 #Longest request line, so whole sources fit
+EPOCH = dt.datetime.fromtimestamp(0, dt.timezone.utc) #Header time of cached listings, which is cut off anyway
+
+
+# --- Functions --- #
+
+def compileRequest(text : str, title : str, optimize : int, listing : str = "always", maxErrors : int = MAX_ERRORS) -> dict:
+	"""Runs in a worker: compiles text and returns the response fields, the listing without its header"""
+
+	try:
+		result = compiler.compileSource(text, title, EPOCH, optimize=optimize, listing=listing, maxErrors=maxErrors)
+		limited : bool = False
+	except CompileError as err:
+		result = err.result
+		limited = err.limited
+
+	return {"asm" : result.asm, "listing" : result.listing and result.listing[len(compiler.listingHeader(title, EPOCH)):],
+		"diagnostics" : [list(diagnostic) for diagnostic in result.diagnostics], "limited" : limited,
+		"symbolTable" : {name : list(entry._replace(value=str(entry.value))) for name, entry in result.symbolTable.items()}, "stats" : result.stats}
+
+
+# --- CompileServer Class --- #
+
+class CompileServer(object):
+
+	def __init__(self, path : str = DEFAULT_SOCKET, jobs : int = 0, cacheEntries : int = CACHE_ENTRIES, maxPending : int = MAX_PENDING):
+		"""Constructor for CompileServer()
+
+		Serves one JSON object per line on a Unix socket. {"op" : "compile", "source", "title",
+		"optimize", "listing", "maxErrors", "timestamp"} answers with the asm, listing, diagnostics, symbol table and stats;
+		"status" and "shutdown" answer with the server's counters. Compiles run on jobs worker
+		processes, identical requests in flight share one compile, and the last cacheEntries
+		results are kept in memory.
+		"""
+
+		self.__path : str = path
+		self.__jobs : int = jobs or os.cpu_count() or 1
+		self.__cacheEntries : int = cacheEntries
+		self.__maxPending : int = maxPending
+
+		self.__cache = OrderedDict() #Key -> response fields, least recently used first
+		self.__inFlight : dict = {} #Key -> Future of a compile already running
+		self.__pending : int = 0
+		self.__counts : dict = {"requests" : 0, "compiles" : 0, "cacheHits" : 0, "shared" : 0, "busy" : 0, "errors" : 0}
+
+		self.__pool : ProcessPoolExecutor = None
+		self.__slots : asyncio.Semaphore = None
+		self.__stopping : asyncio.Event = None
+
+	@property
+	def stats(self) -> dict:
+		return {**self.__counts, "cached" : len(self.__cache), "pending" : self.__pending, "jobs" : self.__jobs}
+
+	def key(self, text : str, title : str, optimize : int, listing : str, maxErrors : int) -> str:
+		digest = hashlib.sha256(json.dumps({"title" : title, "optimize" : optimize, "listing" : listing, "maxErrors" : maxErrors}, sort_keys=True).encode())
+		digest.update(b"\0")
+		digest.update(text.encode())
+		return digest.hexdigest()
+
+	def removeStaleSocket(self) -> None:
+		"""Unlinks a socket file left by a daemon that is gone, refusing to replace a live one"""
+
+		if not os.path.exists(self.__path):
+			return
+
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+			try:
+				probe.connect(self.__path)
+			except OSError:
+				os.unlink(self.__path)
+				return
+
+		raise OSError(f"A daemon is already listening on {self.__path}")
+
+	async def serve(self) -> None:
+		"""Listens until a shutdown request or SIGTERM/SIGINT"""
+
+		self.removeStaleSocket()
+
+		self.__pool = ProcessPoolExecutor(max_workers=self.__jobs)
+		self.__slots = asyncio.Semaphore(self.__jobs)
+		self.__stopping = asyncio.Event()
+
+		loop = asyncio.get_running_loop()
+		for signum in (signal.SIGTERM, signal.SIGINT):
+			loop.add_signal_handler(signum, self.__stopping.set)
+
+		server = await asyncio.start_unix_server(self.handle, self.__path, limit=LINE_LIMIT)
+		os.chmod(self.__path, 0o600) #Only this user may compile through it
+		print(f"Listening on {self.__path} with {self.__jobs} workers", flush=True)
+
+		try:
+			async with server:
+				await self.__stopping.wait()
+		finally:
+			self.__pool.shutdown(cancel_futures=True)
+			if os.path.exists(self.__path):
+				os.unlink(self.__path)
+
+	async def handle(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter) -> None:
+		"""Answers every request line of one connection in order"""
+
+		try:
+			while not self.__stopping.is_set() and (line := await reader.readline()):
+				try:
+					response = await self.dispatch(json.loads(line))
+				except (ValueError, KeyError, TypeError) as err:
+					response = {"error" : f"RequestError: {type(err).__name__}: {err}"}
+				writer.write(json.dumps(response).encode() + b"\n")
+				await writer.drain()
+		except (ConnectionError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+			pass
+		except asyncio.CancelledError: #Connections still open at shutdown just end
+			pass
+		finally:
+			writer.close()
+
+	async def dispatch(self, message : dict) -> dict:
+
+		op = message.get("op", "compile")
+		self.__counts["requests"] += 1
+
+		if op == "compile":
+			return await self.compile(message)
+		elif op == "status":
+			return {"stats" : self.stats}
+		elif op == "shutdown":
+			self.__stopping.set()
+			return {"stats" : self.stats}
+
+		raise ValueError(f"Unknown op {op}")
+
+	async def compile(self, message : dict) -> dict:
+		"""Response to a compile request, from the cache, a compile in flight, or a worker"""
+
+		text : str = message["source"]
+		title : str = message.get("title", "")
+		optimize : int = int(message.get("optimize", 0))
+		listing : str = message.get("listing", "always")
+		maxErrors : int = int(message.get("maxErrors", MAX_ERRORS))
+		timestamp = message.get("timestamp")
+		key = self.key(text, title, optimize, listing, maxErrors)
+
+		fields = self.__cache.get(key)
+		try:
+			if fields is not None:
+				self.__cache.move_to_end(key)
+				self.__counts["cacheHits"] += 1
+			elif key in self.__inFlight:
+				self.__counts["shared"] += 1
+				fields = await asyncio.shield(self.__inFlight[key])
+			elif self.__pending >= self.__maxPending:
+				self.__counts["busy"] += 1
+				return {"error" : f"ServerBusy: {self.__pending} compiles are already waiting"}
+			else:
+				fields = await self.run(key, text, title, optimize, listing, maxErrors)
+		except Exception as err:
+			return {"error" : failureMessage(err)}
+
+		time = dt.datetime.fromtimestamp(timestamp, dt.timezone.utc) if timestamp is not None else None
+		if fields["listing"] is None:
+			return fields
+		return {**fields, "listing" : compiler.listingHeader(title, time) + fields["listing"]}
+
+	async def run(self, key : str, text : str, title : str, optimize : int, listing : str, maxErrors : int) -> dict:
+		"""Compiles on a worker once one is free and caches the result"""
+
+		loop = asyncio.get_running_loop()
+		future = self.__inFlight[key] = loop.create_future()
+		self.__pending += 1
+
+		try:
+			async with self.__slots:
+				fields = await loop.run_in_executor(self.__pool, compileRequest, text, title, optimize, listing, maxErrors)
+		except asyncio.CancelledError:
+			future.cancel()
+			raise
+		except Exception as err:
+			self.__counts["errors"] += 1
+			future.set_exception(err)
+			future.exception() #Retrieved, so it is not logged when nobody shares the compile
+			raise
+		finally:
+			self.__pending -= 1
+			del self.__inFlight[key]
+
+		self.__counts["compiles"] += 1
+		future.set_result(fields)
+
+		self.__cache[key] = fields
+		if len(self.__cache) > self.__cacheEntries:
+			self.__cache.popitem(last=False)
+
+		return fields
+
+def main(argv : list = None) -> int:
+
+	parser = argparse.ArgumentParser(prog="daemon.py", description="Commission compile daemon")
+	parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket to listen on (default: %(default)s)")
+	parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: one per core)")
+	parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="results kept in memory (default: %(default)s)")
+	parser.add_argument("--max-pending", type=int, default=MAX_PENDING, help="compiles allowed to wait for a worker (default: %(default)s)")
+	args = parser.parse_args(argv)
+
+	try:
+		asyncio.run(CompileServer(args.socket, args.jobs, args.cache_entries, args.max_pending).serve())
+	except OSError as err:
+		print(f"CompilerError: {err}")
+		return 1
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
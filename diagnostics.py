@@ -0,0 +1,81 @@
+# --- Imports --- #
+
+from collections import namedtuple
+
+# --- Variables --- #
+
+MAX_ERRORS : int = 20 #Errors collected before a compile gives up, 0 for no limit
+
+
+# --- Diagnostic --- #
+
+Diagnostic = namedtuple("Diagnostic", ["line", "column", "message"])
+
+
+# --- Diagnostics Class --- #
+
+class Diagnostics(object):
+
+	def __init__(self, maxErrors : int = MAX_ERRORS):
+		"""Constructor for Diagnostics(), which collects the errors of one compile up to maxErrors"""
+
+		self.__diagnostics : list = []
+		self.__maxErrors : int = maxErrors
+
+	def __len__(self):
+		return len(self.__diagnostics)
+
+	def __iter__(self):
+		return iter(self.__diagnostics)
+
+	def __getitem__(self, i : int) -> Diagnostic:
+		return self.__diagnostics[i]
+
+	@property
+	def full(self) -> bool:
+		"""Whether the error limit has been reached"""
+		return bool(self.__maxErrors) and len(self.__diagnostics) >= self.__maxErrors
+
+	def add(self, diagnostic : Diagnostic) -> bool:
+		"""Collects diagnostic, returning whether the compile should stop"""
+
+		self.__diagnostics.append(diagnostic)
+		return self.full
+
+
+# --- Functions --- #
+
+def summary(diagnostics, limited : bool = False) -> str:
+	"""One line count of diagnostics, for the end of a compile"""
+
+	count = len(diagnostics)
+	return "{} error{}{}".format(count, "" if count == 1 else "s", ", stopped at the error limit" if limited else "")
+
+def failureMessage(err : Exception) -> str:
+	"""Message for an exception other than CompileError, for a driver to report in its place
+
+	Drivers of many compiles (batch, corpus, link, the daemon) catch every exception, so that a
+	file that cannot be opened or a bug in the compiler fails one compile rather than them all.
+	"""
+
+	if isinstance(err, OSError):
+		return "CompilerError: Unable to open/create important files"
+	return f"CompilerError: {type(err).__name__}: {err}"
+
+
+# --- CompileError Class --- #
+
+class CompileError(Exception):
+
+	def __init__(self, diagnostic : Diagnostic, result = None, diagnostics : list = None, limited : bool = False):
+		"""Constructor for CompileError(), for one diagnostic or every diagnostic of a compile"""
+
+		self.diagnostics : list = list(diagnostics or (diagnostic,))
+		super().__init__("\n".join(f"Line {d.line}: {d.message}" for d in self.diagnostics))
+		self.diagnostic : Diagnostic = diagnostic #The first
+		self.result = result #CompileResult of everything produced before the error
+		self.limited : bool = limited #Whether the compile stopped at the error limit
+
+	@property
+	def summary(self) -> str:
+		return summary(self.diagnostics, self.limited)
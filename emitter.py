@@ -0,0 +1,123 @@
+# --- Imports --- #
+
+from collections import namedtuple
+from itertools import islice
+from peephole import lastBarrier
+
+# --- Variables --- #
+
+Line = namedtuple("Line", ["label", "instruction", "operands", "comment"])
+
+SECTIONS = (".text", ".data", ".bss")
+PRELUDE : str = "%INCLUDE \"Along32.inc\"\n%INCLUDE \"Macros_Along.inc\"\n\n"
+LINE_FORMAT : str = "{:8}{:8}{:24}{}\n"
+CHUNK_LINES : int = 1 << 14 #.text lines held before a streaming Emitter writes them out
+
+
+# --- Emitter Class --- #
+
+class Emitter(object):
+
+	def __init__(self, stream = None, chunkLines : int = 0, optimizer = None):
+		"""Constructor for Emitter()
+
+		Without a stream everything is kept in memory until getvalue(). With one, .text is written
+		to it in chunks of chunkLines (CHUNK_LINES by default) lines as it grows and .data/.bss are
+		written by close(). An optimizer (Peephole) rewrites the .text lines before they are written; a streamed chunk
+		then stops at the last line no rule looks across (see lastBarrier()), the rest being held
+		for the next one, so the stream gets the same lines as an in-memory compile.
+		"""
+
+		self.__sections : dict = {name : [] for name in SECTIONS}
+		self.__stream = stream
+		self.__chunkLines : int = chunkLines or CHUNK_LINES
+		self.__optimizer = optimizer
+		self.__started : bool = False #Whether the prelude has gone to the stream
+		self.__flushedLines : int = 0 #.text lines already written to the stream
+		self.__heldLines : int = 0 #.text lines a flush held back, which the next chunk comes on top of
+
+	@property
+	def streaming(self) -> bool:
+		return self.__stream is not None
+
+	@property
+	def textLines(self) -> int:
+		""".text lines emitted, after optimization once they have been flushed or closed"""
+		return self.__flushedLines + len(self.__sections[".text"])
+
+	def emit(self, section : str, label : str = "", instruction : str = "", operands : str = "", comment : str = ""):
+		"""Adds one formatted line to section"""
+
+		lines = self.__sections[section]
+		lines.append(Line(label, instruction, operands, comment))
+
+		if self.__stream is not None and section == ".text" and len(lines) >= self.__heldLines + self.__chunkLines:
+			self.flush()
+
+	def emitBlock(self, section : str, lines) -> None:
+		"""Adds the Lines lines() yields to section, produced only when the section is written out
+
+		For large data, which then never sits in memory as Lines. Blocks are not optimized.
+		"""
+		self.__sections[section].append(lines)
+
+	def renderLines(self, section : str):
+		"""Yields the SECTION line and then every formatted line of section, expanding blocks"""
+
+		yield LINE_FORMAT.format("SECTION", section, "", "")
+		for line in self.__sections[section]:
+			if isinstance(line, Line):
+				yield LINE_FORMAT.format(*line)
+			else:
+				yield from (LINE_FORMAT.format(*line) for line in line())
+
+	def render(self, section : str) -> str:
+		"""Returns the SECTION line followed by the body of section"""
+		return "".join(self.renderLines(section))
+
+	def getvalue(self) -> str:
+		"""Returns the whole assembly file, or None when it went to a stream"""
+
+		if self.__stream is not None:
+			return None
+
+		return PRELUDE + "\n".join(self.render(section) for section in SECTIONS)
+
+	def optimize(self) -> None:
+		"""Runs the optimizer over the .text lines held so far"""
+
+		if self.__optimizer is not None:
+			self.__sections[".text"] = self.__optimizer.run(self.__sections[".text"])
+
+	def flush(self, final : bool = False) -> None:
+		"""Writes the .text lines held so far to the stream in one write
+
+		With an optimizer, lines past the last barrier are held back unless this is the final flush.
+		"""
+
+		if not self.__started:
+			self.__started = True
+			self.__stream.write(PRELUDE + LINE_FORMAT.format("SECTION", ".text", "", ""))
+
+		lines = self.__sections[".text"]
+		cut : int = len(lines) if final or self.__optimizer is None else lastBarrier(lines)
+		self.__sections[".text"] = lines[:cut]
+		self.optimize()
+
+		self.__stream.write("".join(LINE_FORMAT.format(*line) for line in self.__sections[".text"]))
+		self.__flushedLines += len(self.__sections[".text"])
+		self.__sections[".text"] = lines[cut:]
+		self.__heldLines = len(lines) - cut
+
+	def close(self) -> None:
+		"""Optimizes what is held and writes it out when streaming"""
+
+		if self.__stream is None:
+			self.optimize()
+		else:
+			self.flush(True)
+			for section in SECTIONS[1:]:
+				self.__stream.write("\n")
+				lines = self.renderLines(section)
+				while chunk := "".join(islice(lines, self.__chunkLines)):
+					self.__stream.write(chunk)
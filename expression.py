@@ -0,0 +1,90 @@
+# --- Imports --- #
+
+import ir
+import operator
+from collections import namedtuple
+from lexer import Token
+
+# --- Variables --- #
+
+Rule = namedtuple("Rule", ["precedence", "opcode", "types", "result", "fold"]) #Operand types it takes, the type it gives, and how to compute it
+Operator = namedtuple("Operator", ["text", "arity", "token"]) #On the operator stack; "(" has arity 0
+Node = namedtuple("Node", ["op", "operands", "type", "token", "need"]) #Leaves have no op and a Token, need is the Sethi-Ullman number
+
+#Python's precedences, lowest first. Comparisons do not chain.
+BINARY = {
+	"or" : Rule(1, ir.OR, ("BOOL",), "BOOL", operator.or_),
+	"and" : Rule(2, ir.AND, ("BOOL",), "BOOL", operator.and_),
+	"==" : Rule(4, ir.EQ, ("INT", "BOOL"), "BOOL", operator.eq),
+	"!=" : Rule(4, ir.NE, ("INT", "BOOL"), "BOOL", operator.ne),
+	"<" : Rule(4, ir.LT, ("INT",), "BOOL", operator.lt),
+	"<=" : Rule(4, ir.LE, ("INT",), "BOOL", operator.le),
+	">" : Rule(4, ir.GT, ("INT",), "BOOL", operator.gt),
+	">=" : Rule(4, ir.GE, ("INT",), "BOOL", operator.ge),
+	"+" : Rule(5, ir.ADD, ("INT",), "INT", operator.add),
+	"-" : Rule(5, ir.SUB, ("INT",), "INT", operator.sub),
+	"*" : Rule(6, ir.MUL, ("INT",), "INT", operator.mul),
+	"//" : Rule(6, ir.DIV, ("INT",), "INT", operator.floordiv),
+	"%" : Rule(6, ir.MOD, ("INT",), "INT", operator.mod),
+}
+UNARY = {
+	"not" : Rule(3, ir.NOT, ("BOOL",), "BOOL", operator.not_),
+	"-" : Rule(7, ir.NEG, ("INT",), "INT", operator.neg),
+	"+" : Rule(7, None, ("INT",), "INT", operator.pos), #Nothing to compute
+}
+COMPARISON : int = 4 #Precedence of the comparisons
+
+
+# --- Functions --- #
+
+def leaf(token : Token, type : str) -> Node:
+	return Node(None, (), type, token, 0)
+
+def isFoldable(node : Node) -> bool:
+	"""Whether node is an int or bool literal, whose value is known now"""
+	return node.op is None and (node.token.kind == "INT" or node.token.kind == "BOOL")
+
+def wrap(value : int) -> int:
+	"""value as the 32-bit signed integer the program would compute"""
+	return (value + (1 << 31)) % (1 << 32) - (1 << 31)
+
+def valueOf(token : Token):
+	return token.text == "True" if token.kind == "BOOL" else int(token.text)
+
+def literal(value, type : str, at : Token) -> Node:
+	"""Leaf for a folded value, positioned at the token at"""
+
+	text = ("True" if value else "False") if type == "BOOL" else str(wrap(value))
+	return leaf(Token(type, text, at.line, at.column), type)
+
+def rule(text : str, arity : int) -> Rule:
+	return UNARY[text] if arity == 1 else BINARY[text]
+
+def combine(text : str, operands : tuple) -> Node:
+	"""Node applying the operator text to operands, whose types have been checked
+
+	Literal operands are folded into a literal, as the program would compute it. Raises
+	ZeroDivisionError when that means dividing by zero.
+	"""
+
+	how = rule(text, len(operands))
+
+	if all(isFoldable(operand) for operand in operands):
+		return literal(how.fold(*(valueOf(operand.token) for operand in operands)), how.result, operands[0].token)
+	if how.opcode is None:
+		return operands[0]
+
+	if len(operands) == 1:
+		need = max(operands[0].need, 1)
+	else:
+		first, second = (operands[i] for i in evaluationOrder(operands))
+		need = max(first.need, (first.op is not None) + second.need, 1) #first's value is held while second is computed
+
+	return Node(text, tuple(operands), how.result, None, need)
+
+def evaluationOrder(operands : tuple) -> tuple:
+	"""Indexes of operands in the order to compute them: the one needing more temps first (Sethi-Ullman)"""
+
+	if len(operands) == 2 and operands[1].need > operands[0].need:
+		return (1, 0)
+	return tuple(range(len(operands)))
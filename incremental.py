@@ -0,0 +1,521 @@
+# --- Imports --- #
+
+import datetime as dt
+import os
+import time
+from bisect import bisect_right
+import compiler
+from diagnostics import MAX_ERRORS, CompileError
+from ir import IR
+from lexer import Token, tokenize
+from source import SourceBuffer
+from symtab import SymbolTable
+
+# --- Variables --- #
+
+POLL_SECONDS : float = 0.25
+BLOCK : int = 1 << 16 #Characters compared at a time when diffing two versions of a source
+
+
+# --- Functions --- #
+
+def commonPrefix(a : str, b : str) -> int:
+	"""Length of the longest common prefix of a and b"""
+
+	limit = min(len(a), len(b))
+	i : int = 0
+
+	while i < limit and a[i:i + BLOCK] == b[i:i + BLOCK]:
+		i += BLOCK
+	while i < limit and a[i] == b[i]:
+		i += 1
+
+	return min(i, limit)
+
+def commonSuffix(a : str, b : str, limit : int) -> int:
+	"""Length of the longest common suffix of a and b, at most limit"""
+
+	i : int = 0
+
+	while i + BLOCK <= limit and a[len(a) - i - BLOCK:len(a) - i] == b[len(b) - i - BLOCK:len(b) - i]:
+		i += BLOCK
+	while i < limit and a[len(a) - i - 1] == b[len(b) - i - 1]:
+		i += 1
+
+	return i
+
+def isLiteral(name : str) -> bool:
+	"""Whether name is a literal's, whose entry is the same whenever it is inserted but for its internal name"""
+	return not name.isidentifier() or name == "True" or name == "False"
+
+def markFailed(units : list, diagnostics) -> None:
+	"""Marks the units touching a diagnostic as failed, so they are always parsed again"""
+
+	lines = [unit.line for unit in units]
+	for diagnostic in diagnostics: #The unit it is in, and the one before when it is on the lookahead
+		i = bisect_right(lines, diagnostic.line) - 1
+		if i >= 0:
+			units[i].failed = True
+		if i >= 1 and lines[i] == diagnostic.line:
+			units[i - 1].failed = True
+
+
+# --- Unit Class --- #
+
+class Unit(object):
+
+	__slots__ = ("start", "line", "end", "endLine", "peekEnd", "peek", "reads", "writes", "code", "failed", "mark")
+
+	def __init__(self, start : int, line : int, reads : list = None, writes : list = None):
+		"""Constructor for Unit(), the statements starting on one line and what parsing them did
+
+		start is the offset of the first token and end that of the next unit's first token, the
+		lookahead, which ends at peekEnd; peek is its (kind, text, column), unless its text is a
+		large Literal or an error. reads are the (name, entry fields) the statements looked
+		up before writing them, writes the (name, SymbolTableEntry) they inserted, and code their
+		IR as (op, dst, src1, src2 names, line - self.line). mark is where the build's symbol table
+		and IR stood when the unit started (see IncrementalCompiler.mark()).
+		"""
+
+		self.start : int = start
+		self.line : int = line
+		self.end : int = start
+		self.endLine : int = line
+		self.peekEnd : int = start
+		self.peek : tuple = None
+		self.reads : list = reads if reads is not None else []
+		self.writes : list = writes if writes is not None else []
+		self.code : list = []
+		self.failed : bool = False
+		self.mark : tuple = None
+
+
+# --- TrackedSymbolTable Class --- #
+
+class TrackedSymbolTable(SymbolTable):
+
+	def __init__(self):
+		"""Constructor for TrackedSymbolTable(), a SymbolTable that logs lookups and inserts into a Unit
+
+		It also journals every entry it overwrites, so it can be rolled back to a mark().
+		"""
+
+		super().__init__()
+		self.__unit : Unit = None
+		self.__seen : set = set() #Names the unit has already read or written
+		self.__journal : list = [] #(name, entry it had) before each change to a row
+
+	def track(self, unit : Unit) -> None:
+		"""Logs into unit from now on, or stops logging with None"""
+
+		self.__unit = unit
+		self.__seen = set()
+
+	def fields(self, name : str) -> tuple:
+		"""Everything but the internal name of name's entry, None when it is not in the table; not logged"""
+		return SymbolTable.fields(self, name)
+
+	def log(self, name : str) -> None:
+		if self.__unit is not None and name not in self.__seen:
+			self.__seen.add(name)
+			self.__unit.reads.append((name, SymbolTable.fields(self, name)))
+
+	def __contains__(self, name : str):
+		self.log(name)
+		return super().__contains__(name)
+
+	def __getitem__(self, name : str):
+		self.log(name)
+		return super().__getitem__(name)
+
+	def __setitem__(self, name : str, entry):
+		if self.__unit is not None:
+			self.__seen.add(name)
+			self.__unit.writes.append((name, entry))
+		if super().__contains__(name):
+			self.__journal.append((name, super().__getitem__(name)))
+		super().__setitem__(name, entry)
+
+	def setAlloc(self, name : str, alloc : bool):
+		self.__journal.append((name, super().__getitem__(name)))
+		super().setAlloc(name, alloc)
+
+	def mark(self) -> tuple:
+		"""Where the table stands, to roll it back to"""
+		return len(self.__journal), len(self)
+
+	def rollBack(self, mark : tuple) -> None:
+		"""Undoes every change made since mark"""
+
+		journal = self.__journal
+		length, rows = mark
+
+		while len(journal) > length:
+			name, entry = journal.pop()
+			SymbolTable.__setitem__(self, name, entry)
+		self.truncate(rows)
+
+
+# --- TokenSource Class --- #
+
+class TokenSource(object):
+
+	def __init__(self, text : str):
+		"""Constructor for TokenSource(), a token stream that can restart anywhere in text"""
+
+		self.__text : str = text
+		self.__tokens = tokenize(text)
+		self.__lookahead : Token = None
+		self.__resume : tuple = None #Where to lex on from once the lookahead is taken
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		if self.__lookahead is not None:
+			token, self.__lookahead = self.__lookahead, None
+			return token
+		if self.__tokens is None:
+			self.__tokens = tokenize(self.__text, *self.__resume)
+		return next(self.__tokens)
+
+	def seek(self, offset : int, line : int, lookahead : Token = None) -> None:
+		"""Lexes on from offset, which is on line, or gives lookahead first when it is the token there
+
+		With a lookahead, lexing only starts again once something reads past it, so a run of
+		statements that are all replayed is never lexed.
+		"""
+
+		if lookahead is None:
+			self.__tokens = tokenize(self.__text, offset, line)
+			self.__lookahead = None
+		else:
+			self.__tokens = None
+			self.__lookahead = lookahead
+			self.__resume = (offset + (len(lookahead.text) if lookahead.kind != "EOF" else 0), line)
+
+
+# --- IncrementalCompiler Class --- #
+
+class IncrementalCompiler(compiler.Compiler):
+
+	def __init__(self, source : SourceBuffer, reusable : dict, title : str = "", timestamp : dt.datetime = None, optimize : int = 0, maxErrors : int = MAX_ERRORS, record : bool = True,
+			previous : tuple = None):
+		"""Constructor for IncrementalCompiler()
+
+		reusable maps offsets in source to (Unit, line shift, offset shift) of the previous build.
+		When a statement starts at one of them and the unit's reads still hold, its inserts and IR
+		are replayed and lexing jumps past it, instead of parsing it again.
+		previous is (units, mark, TrackedSymbolTable, IR) of the last build: the units at the start
+		of source, which are kept as they are without being looked at, and the mark of the unit
+		after them, which the last build's symbol table and IR are rolled back to and built on.
+		Without record, the units only mark where statements start, for a build that is not reused.
+		"""
+
+		kept : list = []
+		code : IR = None
+		self.__record : bool = record
+		self.__table = TrackedSymbolTable() if record else SymbolTable()
+
+		if previous is not None:
+			kept, (tableMark, length, names, counts), self.__table, code = previous
+			self.__table.rollBack(tableMark)
+			code.truncate(length, names)
+
+		self.__tokens = TokenSource(source.text)
+		super().__init__(source, title, timestamp, None, optimize, tokens=self.__tokens, maxErrors=maxErrors, symbolTable=self.__table, ir=code)
+		if previous is not None:
+			self.nameCounts.update(zip(self.nameCounts, counts))
+
+		self.__source : SourceBuffer = source
+		self.__reusable : dict = reusable
+		self.__units : list = []
+		self.__unit : Unit = None
+		self.__codeStart : int = 0
+		self.__kept : list = kept
+		self.__reused : int = 0
+
+	@property
+	def units(self) -> list:
+		return self.__units
+
+	@property
+	def kept(self) -> int:
+		"""Units taken from the last build as they are, before the first statement"""
+		return len(self.__kept)
+
+	@property
+	def reused(self) -> int:
+		return self.__reused
+
+	def mark(self) -> tuple:
+		"""Where the symbol table, the IR and the internal names stand, to roll a later build back to"""
+
+		code = self.ir
+		return self.__table.mark(), len(code), len(code.names), tuple(self.nameCounts.values())
+
+	def offsetOf(self, token) -> int:
+		if token.kind == "EOF":
+			return len(self.__source)
+		return self.__source.lineStarts[token.line - 1] + token.column - 1
+
+	def closeUnit(self, token) -> None:
+		"""Ends the current unit where token, the lookahead, starts"""
+
+		unit = self.__unit
+		if unit is None:
+			return
+
+		unit.end = self.offsetOf(token)
+		unit.endLine = token.line
+		unit.peekEnd = unit.end + (len(token.text) if token.kind != "EOF" else 0)
+		unit.peek = (token.kind, token.text, token.column) if isinstance(token.text, str) and token.kind != "ERROR" else None
+		self.__units.append(unit)
+		self.__unit = None
+
+		if not self.__record:
+			return
+		self.__table.track(None)
+
+		code = self.ir
+		names = code.names
+		unit.code = []
+		for i in range(self.__codeStart, len(code)):
+			op, dst, src1, src2 = code[i]
+			unit.code.append((op, names[dst] if dst >= 0 else None, names[src1] if src1 >= 0 else None, names[src2] if src2 >= 0 else None, code.line(i) - unit.line))
+
+	def valid(self, unit : Unit) -> bool:
+		"""Whether everything unit looked up is still the same
+
+		A literal the unit found missing may be there now: the unit inserted it, and replaying
+		leaves the entry as it is, as parsing would have.
+		"""
+
+		fields = self.__table.fields
+		return all(fields(name) == value or (value is None and isLiteral(name)) for name, value in unit.reads)
+
+	def replay(self, old : Unit, lineShift : int, offsetShift : int) -> None:
+		"""Applies old's inserts and IR as if it had just been parsed, then lexes on after it
+
+		The units after it are replayed in the same way for as long as they still hold, so a run
+		of them is neither lexed nor dispatched statement by statement.
+		"""
+
+		table = self.__table
+		code = self.ir
+		symbol = code.symbol
+		reusable = self.__reusable
+
+		while True:
+			unit = Unit(old.start + offsetShift, old.line + lineShift, old.reads, old.writes)
+			unit.end = old.end + offsetShift
+			unit.endLine = old.endLine + lineShift
+			unit.peekEnd = old.peekEnd + offsetShift
+			unit.peek = old.peek
+			unit.code = old.code
+			if self.__record:
+				unit.mark = self.mark()
+
+			for name, entry in old.writes: #Temps are named by their place in the pool, not numbered
+				if isLiteral(name) and name in table:
+					continue
+				table[name] = entry if self.isTemp(name) else entry._replace(internalName=self.genInternalName(entry.type))
+
+			for op, dst, src1, src2, line in old.code:
+				code.add(op, symbol(dst) if dst is not None else -1, symbol(src1) if src1 is not None else -1, symbol(src2) if src2 is not None else -1, unit.line + line)
+
+			self.__units.append(unit)
+			self.__reused += 1
+
+			match = reusable.get(unit.end)
+			if match is None or not self.valid(match[0]):
+				break
+			old, lineShift, offsetShift = match
+
+		self.resume(unit)
+
+	def keep(self) -> None:
+		"""Takes the units kept from the last build, whose inserts and IR are already in place, then lexes on after them"""
+
+		self.__units.extend(self.__kept)
+		self.resume(self.__kept[-1])
+
+	def resume(self, unit : Unit) -> None:
+		"""Lexes on after unit, which is already done, from its lookahead"""
+
+		peek = unit.peek
+		self.__unit = None
+		self.__tokens.seek(unit.end, unit.endLine, peek and Token(peek[0], peek[1], unit.endLine, peek[2]))
+		self.nextToken()
+
+	def statement(self):
+		"""Starts a new unit on every new line, replaying it from the last build when possible"""
+
+		token = self.current
+
+		if self.__kept and not self.__units: #The first statement
+			self.keep()
+			return
+
+		if self.__unit is None or token.line > self.__unit.line:
+			self.closeUnit(token)
+			offset = self.offsetOf(token)
+
+			match = self.__reusable.get(offset)
+			if match is not None and self.valid(match[0]):
+				self.replay(*match)
+				return
+
+			self.__unit = Unit(offset, token.line)
+			self.__codeStart = len(self.ir)
+			if self.__record:
+				self.__unit.mark = self.mark()
+				self.__table.track(self.__unit)
+
+		super().statement()
+
+	def parse(self):
+		try:
+			super().parse()
+		finally:
+			self.closeUnit(self.current)
+
+
+# --- IncrementalBuild Class --- #
+
+class IncrementalBuild(object):
+
+	def __init__(self, title : str = "", optimize : int = 0, listing : str = "always", maxErrors : int = MAX_ERRORS):
+		"""Constructor for IncrementalBuild(), which recompiles successive versions of one source
+
+		Each update() diffs the new text against the last one. The statements before the change
+		are kept as they are, in the symbol table and IR rolled back to where the change starts,
+		so an edit never revisits them. Those after it are replayed, unless their lookups now give
+		different answers, and only the statements in the changed range are parsed again. The
+		whole program is still lowered, listed and written, so those phases take time in
+		proportion to its size. The output is the same as a full compile's.
+		"""
+
+		self.__title : str = title
+		self.__optimize : int = optimize
+		self.__listing : str = listing
+		self.__maxErrors : int = maxErrors
+
+		self.__text : str = None
+		self.__units : list = []
+		self.__table : TrackedSymbolTable = None
+		self.__ir : IR = None
+		self.__stats : dict = {}
+
+	@property
+	def stats(self) -> dict:
+		"""Counters of the last update"""
+		return self.__stats
+
+	def reusable(self, text : str) -> tuple:
+		"""(units of the last build kept as they are, units of it that text leaves untouched by their offset in text)
+
+		The units kept are those at the start of text, up to the first that comes after the change
+		or failed; it is never the last one.
+		"""
+
+		old = self.__text
+		if old is None:
+			return 0, {}
+
+		prefix = commonPrefix(old, text)
+		suffix = commonSuffix(old, text, min(len(old), len(text)) - prefix)
+		oldEnd = len(old) - suffix
+		offsetShift = len(text) - len(old)
+		lineShift = text.count('\n', prefix, len(text) - suffix) - old.count('\n', prefix, oldEnd)
+
+		if prefix < max(len(old), len(text)):
+			self.__stats["changed"] = (old.count('\n', 0, prefix) + 1, text.count('\n', 0, max(prefix, len(text) - suffix - 1)) + 1)
+
+		reusable : dict = {}
+		for unit in self.__units:
+			if unit.failed:
+				continue
+			if unit.peekEnd < prefix: #Its text and lookahead come before the change
+				reusable[unit.start] = (unit, 0, 0)
+			elif unit.start >= oldEnd: #Its text and lookahead are all after it
+				reusable[unit.start + offsetShift] = (unit, lineShift, offsetShift)
+
+		kept : int = 0
+		for unit in self.__units:
+			if unit.failed or unit.peekEnd >= prefix:
+				break
+			kept += 1
+
+		return kept, reusable
+
+	def update(self, text : str, timestamp : dt.datetime = None) -> compiler.CompileResult:
+		"""Compiles text, reusing what it can of the last build; raises CompileError like compileSource()
+
+		The result's symbol table is the build's own, which the next update() changes.
+		"""
+
+		self.__stats = {}
+		source = SourceBuffer(text, self.__title)
+		kept, reusable = self.reusable(text)
+		previous = (self.__units[:kept], self.__units[kept].mark, self.__table, self.__ir) if kept else None
+		c = IncrementalCompiler(source, reusable, self.__title, timestamp, self.__optimize, self.__maxErrors, previous=previous)
+
+		try:
+			return compiler.runCompiler(c, self.__listing)
+		finally:
+			units = c.units
+			markFailed(units, c.diagnostics)
+
+			self.__text = text
+			self.__units = units
+			self.__table = c.symbolTable
+			self.__ir = c.ir
+			self.__stats.update({"units" : len(units), "kept" : c.kept, "reused" : c.reused, "parsed" : len(units) - c.kept - c.reused})
+
+def watch(title : str, sourceName : str = "", listingName : str = "", objectName : str = "", optimize : int = 0, listing : str = "always",
+		maxErrors : int = MAX_ERRORS, timestamp : dt.datetime = None, interval : float = POLL_SECONDS) -> None:
+	"""Polls sourceName (title.cmn) and rebuilds the .ccmn and .asm incrementally whenever it changes, until interrupted"""
+
+	sourceName = sourceName or f"{title}.cmn"
+	listingName = listingName or f"{title}.ccmn"
+	objectName = objectName or f"{title}.asm"
+
+	build = IncrementalBuild(title, optimize, listing, maxErrors)
+	seen : tuple = None
+
+	while True:
+		try:
+			stat = os.stat(sourceName)
+		except OSError:
+			time.sleep(interval)
+			continue
+
+		if (stat.st_mtime_ns, stat.st_size) != seen:
+			seen = (stat.st_mtime_ns, stat.st_size)
+			start = time.perf_counter()
+
+			try:
+				text = SourceBuffer.fromFile(sourceName).text
+			except (OSError, UnicodeDecodeError):
+				print("CompilerError: Unable to open/create important files")
+				time.sleep(interval)
+				continue
+
+			try:
+				result = build.update(text, timestamp)
+			except CompileError as err:
+				result = err.result
+				print(err)
+				print(err.summary)
+
+			try:
+				compiler.writeOutputs(result, listingName, objectName)
+			except OSError:
+				print("CompilerError: Unable to open/create important files")
+
+			stats = build.stats
+			changed = f", lines {stats['changed'][0]}-{stats['changed'][1]} changed" if stats.get("changed") else ""
+			print(f"{title}: built in {(time.perf_counter() - start) * 1000:.1f} ms, {stats['parsed']} of {stats['units']} statement lines parsed{changed}", flush=True)
+
+		time.sleep(interval)
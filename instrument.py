@@ -0,0 +1,126 @@
+# --- Imports --- #
+
+import json
+import os
+import threading
+import time
+
+# --- Variables --- #
+
+US : float = 1e6 #Trace timestamps are in microseconds
+
+
+# --- Span Class --- #
+
+class Span(object):
+
+	__slots__ = ("recorder", "name", "category", "args", "wall", "cpu")
+
+	def __init__(self, recorder, name : str, category : str, args : dict):
+		"""Constructor for Span(), a with block timed by recorder in wall and CPU time"""
+
+		self.recorder = recorder
+		self.name : str = name
+		self.category : str = category
+		self.args : dict = args
+
+	def __enter__(self):
+		self.wall = time.perf_counter()
+		self.cpu = time.process_time()
+		return self
+
+	def __exit__(self, *exc):
+		self.recorder.record(self.name, self.category, self.wall, time.perf_counter(), time.process_time() - self.cpu, self.args)
+		return False
+
+
+# --- Recorder Class --- #
+
+class Recorder(object):
+
+	def __init__(self, trace : bool = False):
+		"""Constructor for Recorder()
+
+		Collects per-span totals and counters for --stats and, with trace, every span as a Chrome
+		trace event for --trace. Nothing calls into it unless a Compiler is given one, so an
+		uninstrumented compile runs exactly the same code as before.
+		"""
+
+		self.__origin : float = time.perf_counter()
+		self.__trace : bool = trace
+		self.__events : list = []
+		self.__totals : dict = {} #(category, name) -> [calls, wall seconds, cpu seconds]
+		self.__counters : dict = {}
+
+	@property
+	def totals(self) -> dict:
+		return self.__totals
+
+	@property
+	def counters(self) -> dict:
+		return self.__counters
+
+	def record(self, name : str, category : str, start : float, end : float, cpu : float = 0.0, args : dict = None) -> None:
+		"""Adds one finished span, timed with time.perf_counter()"""
+
+		total = self.__totals.get((category, name))
+		if total is None:
+			total = self.__totals[(category, name)] = [0, 0.0, 0.0]
+		total[0] += 1
+		total[1] += end - start
+		total[2] += cpu
+
+		if self.__trace:
+			event = {"name" : name, "cat" : category, "ph" : "X", "ts" : (start - self.__origin) * US, "dur" : (end - start) * US,
+				"pid" : os.getpid(), "tid" : threading.get_ident()}
+			if args:
+				event["args"] = args
+			self.__events.append(event)
+
+	def span(self, name : str, category : str = "phase", **args) -> Span:
+		"""with recorder.span(name): times the block"""
+		return Span(self, name, category, args)
+
+	def wrap(self, function, name : str, category : str = "statement", argsOf = None):
+		"""Returns function timed as a span on every call, in wall time, and CPU time for phases
+
+		argsOf, when given, is called before function and its dict is attached to the trace event.
+		"""
+
+		record = self.record
+		clock = time.perf_counter
+		cpuClock = time.process_time if category == "phase" else (lambda: 0.0)
+
+		def timed(*args, **kwargs):
+			spanArgs = argsOf() if argsOf is not None else None
+			start = clock()
+			cpu = cpuClock()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				record(name, category, start, clock(), cpuClock() - cpu, spanArgs)
+
+		return timed
+
+	def count(self, name : str, n : int = 1) -> None:
+		self.__counters[name] = self.__counters.get(name, 0) + n
+
+	def report(self) -> str:
+		"""Table of the span totals followed by the counters, for --stats"""
+
+		lines : list = ["{:<12}{:<16}{:>10}{:>12}{:>12}".format("category", "span", "calls", "wall s", "cpu s")]
+		for (category, name), (calls, wall, cpu) in self.__totals.items():
+			lines.append("{:<12}{:<16}{:>10}{:>12.6f}{:>12}".format(category, name, calls, wall, f"{cpu:.6f}" if category == "phase" else "-"))
+
+		lines.extend(f"{name}: {value}" for name, value in self.__counters.items())
+		return "\n".join(lines) + "\n"
+
+	def chromeTrace(self) -> dict:
+		"""Trace-event JSON object, loadable by chrome://tracing or Perfetto"""
+
+		counters = {"name" : "counters", "ph" : "C", "ts" : (time.perf_counter() - self.__origin) * US, "pid" : os.getpid(), "args" : self.__counters}
+		return {"traceEvents" : self.__events + [counters], "displayTimeUnit" : "ms"}
+
+	def writeTrace(self, path : str) -> None:
+		with open(path, "w") as file:
+			json.dump(self.chromeTrace(), file)
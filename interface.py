@@ -0,0 +1,308 @@
+# --- Imports --- #
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from collections import namedtuple
+from ste import SymbolTableEntry
+from symtab import MODE_CODES, MODES, TYPE_CODES, TYPES, SymbolTable
+
+# --- Variables --- #
+
+INTERFACE_SUFFIX : str = ".cmni"
+INTERFACE_MAGIC : bytes = b"CMNI"
+INTERFACE_VERSION : int = 2
+UNIT_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z") #Unit names become parts of NASM labels
+INIT_FORMAT : str = "{}@init" #Label of the code of a unit, called by the link step's _start
+END : int = 0xFFFFFFFF #End of a hash chain
+
+#Layout: header, symbol records, hash buckets, import records, extern records, string table.
+#Strings are (offset into the string table, length) pairs of UTF-8, all integers little-endian.
+HEADER = struct.Struct("<4sHH6I4I5I") #Magic, version, flags, unit, source and digest strings, symbol/bucket/import/extern counts, section offsets
+RECORD = struct.Struct("<6IIIBBH") #Name, label and value strings, units, next record in the chain, type, mode, padding
+IMPORT = struct.Struct("<4I") #Unit and digest strings
+EXTERN = struct.Struct("<2I") #Label string
+BUCKET = struct.Struct("<I") #First record of the chain
+
+Interface = namedtuple("Interface", ["unit", "symbols", "imports", "externs", "source", "digest"])
+
+
+# --- SymbolIndex Class --- #
+
+class SymbolIndex(object):
+
+	def __init__(self, data, header : tuple):
+		"""Constructor for SymbolIndex(), the exported symbols of a binary interface, looked up in place
+
+		data is the mapped file. A lookup hashes the name to a bucket and walks its chain of
+		fixed-width records, decoding only the record that matches, so the cost of a lookup
+		does not depend on how many symbols the interface has.
+		"""
+
+		self.__data = data
+		(self.__count, self.__buckets, self.__records, self.__bucketsOffset, self.__strings) = (header[9], header[10], header[13], header[14], header[17])
+
+	def __len__(self):
+		return self.__count
+
+	def string(self, offset : int, length : int) -> str:
+		start = self.__strings + offset
+		return str(self.__data[start:start + length], "utf-8")
+
+	def record(self, i : int) -> tuple:
+		return RECORD.unpack_from(self.__data, self.__records + i * RECORD.size)
+
+	def entry(self, record : tuple) -> SymbolTableEntry:
+		string = self.string
+		return SymbolTableEntry(string(record[2], record[3]), TYPES[record[8]], MODES[record[9]], string(record[4], record[5]), "NO", record[6])
+
+	def find(self, name : str) -> tuple:
+		"""Record of name, None when it is not exported"""
+
+		if not self.__buckets:
+			return None
+
+		key = name.encode()
+		data = self.__data
+		i = BUCKET.unpack_from(data, self.__bucketsOffset + (zlib.crc32(key) % self.__buckets) * BUCKET.size)[0]
+
+		while i != END:
+			record = self.record(i)
+			start = self.__strings + record[0]
+			if record[1] == len(key) and data[start:start + record[1]] == key:
+				return record
+			i = record[7]
+
+		return None
+
+	def __contains__(self, name : str):
+		return self.find(name) is not None
+
+	def __getitem__(self, name : str) -> SymbolTableEntry:
+		record = self.find(name)
+		if record is None:
+			raise KeyError(name)
+		return self.entry(record)
+
+	def get(self, name : str, default = None) -> SymbolTableEntry:
+		record = self.find(name)
+		return default if record is None else self.entry(record)
+
+	def __iter__(self):
+		return (self.string(*self.record(i)[:2]) for i in range(self.__count))
+
+	def items(self):
+		for i in range(self.__count):
+			record = self.record(i)
+			yield self.string(record[0], record[1]), self.entry(record)
+
+	def values(self):
+		return (entry for name, entry in self.items())
+
+	def close(self) -> None:
+		"""Unmaps the file; the index cannot be used after"""
+		self.__data.close()
+
+
+# --- InterfaceLoader Class --- #
+
+class InterfaceLoader(object):
+
+	def __init__(self, searchPath = (".",)):
+		"""Constructor for InterfaceLoader(), which finds unit interfaces in the directories of searchPath"""
+
+		self.__searchPath : tuple = tuple(searchPath)
+		self.__loaded : dict = {}
+
+	def find(self, unit : str) -> str:
+		"""Path of unit's interface file, None when no directory has one"""
+
+		for directory in self.__searchPath:
+			path = os.path.join(directory, unit + INTERFACE_SUFFIX)
+			if os.path.exists(path):
+				return path
+		return None
+
+	def load(self, unit : str) -> Interface:
+		"""unit's Interface, None when it is missing or unreadable"""
+
+		if unit not in self.__loaded:
+			path = self.find(unit) if isUnitName(unit) else None
+			try:
+				self.__loaded[unit] = readInterface(path) if path else None
+			except (OSError, ValueError, struct.error):
+				self.__loaded[unit] = None
+
+		return self.__loaded[unit]
+
+	def close(self) -> None:
+		"""Unmaps every interface loaded, once the compile using them is done"""
+
+		for interface in self.__loaded.values():
+			if interface is not None:
+				interface.symbols.close()
+		self.__loaded.clear()
+
+
+# --- UnitSymbolTable Class --- #
+
+class UnitSymbolTable(SymbolTable):
+
+	def __init__(self, onConflict = None):
+		"""Constructor for UnitSymbolTable(), a unit's SymbolTable that also sees its imports
+
+		A name that is not declared locally is looked up in the imported interfaces the first
+		time it is used and only then copied in, so importing costs nothing per exported
+		symbol. onConflict(name, units) is called when more than one import exports it.
+		"""
+
+		super().__init__()
+		self.__interfaces : list = []
+		self.__imported : dict = {} #Imported name in use -> its global label
+		self.__onConflict = onConflict
+
+	@property
+	def imported(self) -> dict:
+		return self.__imported
+
+	def addInterface(self, interface : Interface) -> None:
+		self.__interfaces.append(interface)
+
+	def resolve(self, name : str) -> bool:
+		"""Whether name is declared or imported, copying an imported entry in on first use"""
+
+		if super().__contains__(name):
+			return True
+
+		found = [interface for interface in self.__interfaces if name in interface.symbols]
+		if not found:
+			return False
+		if len(found) > 1 and self.__onConflict is not None:
+			self.__onConflict(name, [interface.unit for interface in found])
+
+		entry = found[0].symbols[name]
+		self.__imported[name] = entry.internalName
+		super().__setitem__(name, entry)
+		return True
+
+	def __contains__(self, name : str):
+		return self.resolve(name)
+
+	def __getitem__(self, name : str) -> SymbolTableEntry:
+		self.resolve(name)
+		return super().__getitem__(name)
+
+	def get(self, name : str, default = None) -> SymbolTableEntry:
+		return super().get(name, default) if self.resolve(name) else default
+
+
+# --- Functions --- #
+
+def isUnitName(unit : str) -> bool:
+	return UNIT_NAME.match(unit) is not None
+
+def isExported(name : str) -> bool:
+	"""Whether name is one a unit exports: declared by it, not a literal or temp the compiler entered"""
+	return name.isidentifier() and name[0] != "_" and name != "True" and name != "False"
+
+def exportLabel(unit : str, name : str, entry : SymbolTableEntry) -> str:
+	"""Global label of a unit's symbol, its name when NASM can spell it"""
+
+	return f"{unit}${name}" if name.isascii() else f"{unit}${entry.internalName}"
+
+def sourceDigest(text : str, options : dict) -> str:
+	"""Digest of a unit's source and the options it was compiled with"""
+
+	digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode())
+	digest.update(b"\0")
+	digest.update(text.encode())
+	return digest.hexdigest()
+
+def makeInterface(unit : str, symbols : dict, imports : dict, externs : list, source : str) -> Interface:
+	"""Interface of unit, whose digest covers only what importers see, so they rebuild only when it changes"""
+
+	fields = {name : [entry.internalName, entry.type, entry.mode, str(entry.value), entry.units] for name, entry in symbols.items()}
+	digest = hashlib.sha256(json.dumps([unit, fields], sort_keys=True).encode()).hexdigest()
+	return Interface(unit, symbols, imports, externs, source, digest)
+
+def encodeInterface(interface : Interface) -> bytes:
+	"""The binary form of interface, see HEADER"""
+
+	strings : list = []
+	offsets : dict = {}
+	size : list = [0]
+
+	def string(text) -> tuple:
+		data = str(text).encode()
+		if data not in offsets:
+			offsets[data] = size[0]
+			strings.append(data)
+			size[0] += len(data)
+		return offsets[data], len(data)
+
+	symbols = list(interface.symbols.items())
+	buckets = 1 << max(len(symbols) - 1, 0).bit_length() if symbols else 0 #A power of two, at least one per symbol
+	heads : list = [END] * buckets
+	records : list = []
+
+	for i, (name, entry) in enumerate(symbols):
+		bucket = zlib.crc32(name.encode()) % buckets
+		records.append(RECORD.pack(*string(name), *string(entry.internalName), *string(entry.value), int(entry.units), heads[bucket], TYPE_CODES[entry.type], MODE_CODES[entry.mode], 0))
+		heads[bucket] = i
+
+	imports = [IMPORT.pack(*string(unit), *string(digest)) for unit, digest in interface.imports.items()]
+	externs = [EXTERN.pack(*string(label)) for label in interface.externs]
+	unit, source, digest = string(interface.unit), string(interface.source), string(interface.digest)
+
+	recordsOffset = HEADER.size
+	bucketsOffset = recordsOffset + len(records) * RECORD.size
+	importsOffset = bucketsOffset + buckets * BUCKET.size
+	externsOffset = importsOffset + len(imports) * IMPORT.size
+	stringsOffset = externsOffset + len(externs) * EXTERN.size
+
+	header = HEADER.pack(INTERFACE_MAGIC, INTERFACE_VERSION, 0, *unit, *source, *digest, len(records), buckets, len(imports), len(externs),
+		recordsOffset, bucketsOffset, importsOffset, externsOffset, stringsOffset)
+
+	return b"".join((header, *records, *(BUCKET.pack(head) for head in heads), *imports, *externs, *strings))
+
+def writeInterface(interface : Interface, path : str) -> None:
+	"""Saves interface in the binary format, replacing path in one step"""
+
+	temp = f"{path}.{os.getpid()}.tmp"
+	with open(temp, "wb") as file:
+		file.write(encodeInterface(interface))
+	os.replace(temp, path)
+
+def readInterface(path : str) -> Interface:
+	"""Maps the interface saved at path; its symbols are read from the mapping as they are looked up
+
+	The mapping stays open until the caller is done with the interface and calls symbols.close().
+	Raises ValueError for a file that is not a version INTERFACE_VERSION interface.
+	"""
+
+	with open(path, "rb") as file:
+		try:
+			data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError: #Empty file
+			raise ValueError(f"{path} is not an interface")
+
+	try:
+		if len(data) < HEADER.size:
+			raise ValueError(f"{path} is not an interface")
+		header = HEADER.unpack_from(data)
+		if header[0] != INTERFACE_MAGIC or header[1] != INTERFACE_VERSION:
+			raise ValueError(f"{path} is not a version {INTERFACE_VERSION} interface")
+
+		symbols = SymbolIndex(data, header)
+		string = symbols.string
+		imports = {string(*record[:2]) : string(*record[2:]) for record in IMPORT.iter_unpack(data[header[15]:header[15] + header[11] * IMPORT.size])}
+		externs = [string(*record) for record in EXTERN.iter_unpack(data[header[16]:header[16] + header[12] * EXTERN.size])]
+
+		return Interface(string(header[3], header[4]), symbols, imports, externs, string(header[5], header[6]), string(header[7], header[8]))
+	except BaseException:
+		data.close()
+		raise
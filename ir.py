@@ -0,0 +1,112 @@
+# --- Imports --- #
+
+from array import array
+
+# --- Variables --- #
+
+NONE : int = -1 #Unused operand
+
+#Opcodes, dst = src1 op src2
+COPY : int = 0 #dst = src1
+READ : int = 1 #dst = read from stream src1
+WRITE : int = 2 #write src1 to stream src2
+NEG : int = 3 #dst = -src1
+NOT : int = 4 #dst = not src1
+ADD : int = 5
+SUB : int = 6
+MUL : int = 7
+DIV : int = 8 #Floor division, as //
+MOD : int = 9 #Remainder of the floor division, as %
+AND : int = 10
+OR : int = 11
+EQ : int = 12 #Comparisons give a bool
+NE : int = 13
+LT : int = 14
+LE : int = 15
+GT : int = 16
+GE : int = 17
+OPCODES = ("COPY", "READ", "WRITE", "NEG", "NOT", "ADD", "SUB", "MUL", "DIV", "MOD", "AND", "OR", "EQ", "NE", "LT", "LE", "GT", "GE")
+UNARY = {NEG, NOT}
+COMPARISONS = {EQ, NE, LT, LE, GT, GE}
+
+
+# --- IR Class --- #
+
+class IR(object):
+
+	def __init__(self):
+		"""Constructor for IR()
+
+		Three-address code held in parallel arrays, one slot per instruction. Operands are
+		indexes into the IR's own list of symbol names.
+		"""
+
+		self.__ops = array("B")
+		self.__dsts = array("i")
+		self.__src1s = array("i")
+		self.__src2s = array("i")
+		self.__lines = array("I")
+
+		self.__names : list = []
+		self.__indexes : dict = {}
+
+	def __len__(self):
+		return len(self.__ops)
+
+	def __getitem__(self, i : int) -> tuple:
+		"""(op, dst, src1, src2) of instruction i"""
+		return self.__ops[i], self.__dsts[i], self.__src1s[i], self.__src2s[i]
+
+	def __iter__(self):
+		return zip(self.__ops, self.__dsts, self.__src1s, self.__src2s)
+
+	@property
+	def names(self) -> list:
+		"""Symbol names, by operand index"""
+		return self.__names
+
+	def symbol(self, name : str) -> int:
+		"""Operand index of name, added on first use"""
+
+		index = self.__indexes.get(name)
+		if index is None:
+			index = self.__indexes[name] = len(self.__names)
+			self.__names.append(name)
+
+		return index
+
+	def add(self, op : int, dst : int = NONE, src1 : int = NONE, src2 : int = NONE, line : int = 0) -> int:
+		"""Appends an instruction and returns its position"""
+
+		self.__ops.append(op)
+		self.__dsts.append(dst)
+		self.__src1s.append(src1)
+		self.__src2s.append(src2)
+		self.__lines.append(line)
+
+		return len(self.__ops) - 1
+
+	def truncate(self, length : int, names : int) -> None:
+		"""Drops every instruction after the first length, and every symbol name after the first names"""
+
+		for column in (self.__ops, self.__dsts, self.__src1s, self.__src2s, self.__lines):
+			del column[length:]
+		for name in self.__names[names:]:
+			del self.__indexes[name]
+		del self.__names[names:]
+
+	def line(self, i : int) -> int:
+		"""Source line instruction i came from"""
+		return self.__lines[i]
+
+	def dump(self) -> str:
+		"""Readable listing of the instructions, for debugging"""
+
+		names = self.__names
+		text : list = []
+
+		for i, (op, dst, src1, src2) in enumerate(self):
+			operands = ", ".join(names[operand] for operand in (dst, src1, src2) if operand != NONE)
+			text.append("{:>5}  {:8}{}\n".format(self.__lines[i], OPCODES[op], operands))
+
+		return "".join(text)
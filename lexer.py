@@ -0,0 +1,163 @@
+# --- Imports --- #
+
+import re
+
+# --- Variables --- #
+
+END_OF_FILE : str = '0x04' #My choice
+LARGE_LITERAL : int = 1 << 12 #String and list literals this long stay in the source as a Literal
+
+#tuple = frozen list (basically)
+TYPES = {"int", "bool", "str", "char", "list",} #set, dict, stream
+KEYWORDS = {"frozen", "not", "and", "or", "raise", "import"} | TYPES #"class", "def"
+SPEC_SYMBOLS = {"=", "-", "+", "*", "//", "%", "<", ">", "<=", ">=", "==", "!=", "(", ")", '[', ']'}
+LITERALS = {"INT", "BOOL", "STR", "CHAR", "LIST"}
+
+NAME_KINDS = {**dict.fromkeys(KEYWORDS - TYPES, "KEYWORD"), **dict.fromkeys(TYPES, "TYPE"), "True" : "BOOL", "False" : "BOOL"}
+
+TOKEN_PATTERN = re.compile(r"""
+	(?:\s+|\#[^\n]*)*
+	(?:
+		(?P<CHAR>'.')
+		|(?P<STR>"[^"]*")
+		|(?P<LIST>\[[^\]]*\])
+		|(?P<SYMBOL><<|>>|<=|>=|==|!=|//|[=\-+*%<>()\]])
+		|(?P<NAME>[^\W\d_]\w*)
+		|(?P<INT>\d+)
+		|(?P<EOF>\Z)
+		|(?P<BAD>'[^'\n]*'?|.)
+	)
+""", re.VERBOSE | re.DOTALL)
+
+
+# --- Token Class --- #
+
+class Token(object):
+
+	__slots__ = ("kind", "text", "line", "column")
+
+	def __init__(self, kind : str, text : str, line : int, column : int):
+		"""Constructor for Token()"""
+
+		self.kind : str = kind
+		self.text : str = text
+		self.line : int = line
+		self.column : int = column
+
+	def __repr__(self):
+		return f"Token({self.kind!r}, {self.text!r}, {self.line}, {self.column})"
+
+
+# --- Literal Class --- #
+
+class Literal(object):
+
+	__slots__ = ("source", "start", "end")
+
+	def __init__(self, source : str, start : int, end : int):
+		"""Constructor for Literal(), the text of a large literal read in place from source
+
+		It stands in for the str source[start:end]: slicing gives another Literal of the same
+		source, and only str() copies the characters out.
+		"""
+
+		self.source : str = source
+		self.start : int = start
+		self.end : int = end
+
+	def __len__(self):
+		return self.end - self.start
+
+	def __str__(self):
+		return self.source[self.start:self.end]
+
+	def __repr__(self):
+		return repr(str(self))
+
+	def __format__(self, spec : str):
+		return format(str(self), spec)
+
+	def __getitem__(self, key):
+		if isinstance(key, slice):
+			start, stop, step = key.indices(len(self))
+			if step == 1:
+				return Literal(self.source, self.start + start, self.start + max(start, stop))
+			return str(self)[key]
+
+		if key < 0:
+			key += len(self)
+		if not 0 <= key < len(self):
+			raise IndexError("Literal index out of range")
+		return self.source[self.start + key]
+
+	def __eq__(self, other):
+		if isinstance(other, Literal):
+			return len(self) == len(other) and str(self) == str(other)
+		if isinstance(other, str):
+			return len(self) == len(other) and self.source.startswith(other, self.start)
+		return NotImplemented
+
+	def __hash__(self):
+		return hash(str(self)) #Equal to the hash of the same str
+
+
+# --- Functions --- #
+
+def span(text) -> tuple:
+	"""(source, start, end) of a str or Literal, for scanning it in place"""
+
+	if isinstance(text, Literal):
+		return text.source, text.start, text.end
+	return text, 0, len(text)
+
+
+def tokenize(text : str, pos : int = 0, line : int = 1):
+	"""Yields the Tokens of text from pos, which is on line, ending with an EOF Token
+
+	Lexical errors are yielded as ERROR Tokens holding the message. Lexing goes on after a bad
+	character; an unterminated literal or a name at the very end leaves only the EOF Token.
+	"""
+
+	count = text.count
+	length : int = len(text)
+	scanned : int = pos
+	lineStart : int = text.rfind('\n', 0, pos) + 1
+
+	for m in TOKEN_PATTERN.finditer(text, pos):
+		kind = m.lastgroup
+		start = m.start(kind)
+
+		newlines = count('\n', scanned, start)
+		if newlines:
+			line += newlines
+			lineStart = text.rfind('\n', scanned, start) + 1
+		scanned = start
+
+		end = m.end(kind)
+		large : bool = (kind == "STR" or kind == "LIST") and end - start >= LARGE_LITERAL
+		value = None if large else m.group(kind)
+		column = start - lineStart + 1
+
+		if kind == "NAME":
+			if m.end() == length: #Names must be followed by something
+				yield Token("ERROR", "EOFError: Unexpected EOF", line, column)
+				yield Token("EOF", END_OF_FILE, line, column + len(value))
+				return
+			yield Token(NAME_KINDS.get(value, "ID"), value, line, column)
+		elif kind == "BAD":
+			if value[0] == '\'': #A char literal not of one letter, taken whole so it is reported once
+				yield Token("ERROR", "SyntaxError: Unexpected letter", line, column)
+			elif value == '\"' or value == '[': #Unterminated, so the rest of the text is lost
+				yield Token("ERROR", "EOFError: Unexpected EOF", line, column)
+				eofLineStart = max(text.rfind('\n', start) + 1, lineStart)
+				yield Token("EOF", END_OF_FILE, line + count('\n', start), length - eofLineStart + 1)
+				return
+			else:
+				yield Token("ERROR", f"SyntaxError: Invalid symbol {value} received...", line, column)
+		elif kind == "EOF":
+			yield Token("EOF", END_OF_FILE, line, column)
+			return
+		elif large:
+			yield Token(kind, Literal(text, start, end), line, column)
+		else:
+			yield Token(kind, value, line, column)
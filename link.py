@@ -0,0 +1,290 @@
+# --- Imports --- #
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import compiler
+from diagnostics import MAX_ERRORS, CompileError, failureMessage
+from emitter import Emitter
+from interface import INIT_FORMAT, INTERFACE_SUFFIX, InterfaceLoader, isUnitName, readInterface, sourceDigest, writeInterface
+from lexer import tokenize
+from listing import LISTING_MODES
+from source import SourceBuffer
+
+# --- Variables --- #
+
+START_SUFFIX : str = ".start.asm" #The root unit's _start, which calls every unit's init in order
+
+Unit = namedtuple("Unit", ["name", "path", "imports"])
+UnitResult = namedtuple("UnitResult", ["name", "status", "seconds", "message", "digest"])
+
+
+# --- LinkError Class --- #
+
+class LinkError(Exception):
+
+	def __init__(self, message : str):
+		"""Constructor for LinkError(), raised when the units of a program do not fit together"""
+		super().__init__(f"LinkError: {message}")
+
+
+# --- Functions --- #
+
+def scanImports(text : str) -> list:
+	"""Units named by the import statements of text, in order, without compiling it"""
+
+	imports : list = []
+	previous = None
+
+	for token in tokenize(text):
+		if token.kind == "ID" and previous is not None and previous.kind == "KEYWORD" and previous.text == "import" and token.text not in imports:
+			imports.append(token.text)
+		previous = token
+
+	return imports
+
+def findSource(name : str, searchPath : tuple) -> str:
+	for directory in searchPath:
+		path = os.path.join(directory, f"{name}.cmn")
+		if os.path.exists(path):
+			return path
+	return None
+
+def discover(root : str, searchPath : tuple) -> dict:
+	"""Unit name -> Unit for root and everything it imports, directly or not"""
+
+	units : dict = {}
+	stack : list = [root]
+
+	while stack:
+		name = stack.pop()
+		if name in units:
+			continue
+		if not isUnitName(name):
+			raise LinkError(f"{name} is not a valid unit name")
+
+		path = findSource(name, searchPath)
+		if path is None:
+			raise LinkError(f"No source for unit {name} in {', '.join(searchPath)}")
+
+		units[name] = Unit(name, path, scanImports(SourceBuffer.fromFile(path).text))
+		stack.extend(reversed(units[name].imports))
+
+	return units
+
+def buildOrder(units : dict, root : str) -> list:
+	"""Units in an order where each comes after everything it imports"""
+
+	order : list = []
+	state : dict = {} #Name -> False while its imports are being visited, True once ordered
+
+	def visit(name : str, path : list):
+		if state.get(name) is False:
+			raise LinkError(f"Import cycle {' -> '.join(path[path.index(name):] + [name])}")
+		if state.get(name):
+			return
+
+		state[name] = False
+		for dependency in units[name].imports:
+			visit(dependency, path + [name])
+		state[name] = True
+		order.append(name)
+
+	visit(root, [])
+	return order
+
+def interfacePath(unit : Unit) -> str:
+	return unit.path[:-len(".cmn")] + INTERFACE_SUFFIX
+
+def upToDate(unit : Unit, digests : dict, optimize : int) -> str:
+	"""Digest of unit's interface when its outputs are current, None when it must be compiled"""
+
+	try:
+		interface = readInterface(interfacePath(unit))
+	except (OSError, ValueError, KeyError, TypeError):
+		return None
+
+	try:
+		text = SourceBuffer.fromFile(unit.path).text
+	except (OSError, ValueError, KeyError, TypeError):
+		return None
+	finally:
+		interface.symbols.close() #Only the header fields are needed
+
+	if interface.source != sourceDigest(text, {"optimize" : optimize}):
+		return None
+	if interface.imports != {dependency : digests[dependency] for dependency in unit.imports}:
+		return None
+	if not os.path.exists(unit.path[:-len(".cmn")] + ".asm"):
+		return None
+
+	return interface.digest
+
+def compileUnit(unit : Unit, searchPath : tuple, timestamp = None, optimize : int = 0, listing : str = "always", maxErrors : int = MAX_ERRORS) -> UnitResult:
+	"""Compiles one unit against the interfaces of its imports and saves its own, turning failures into a UnitResult"""
+
+	base : str = unit.path[:-len(".cmn")]
+	start = time.perf_counter()
+	loader = InterfaceLoader(searchPath)
+
+	try:
+		c = compiler.Compiler(SourceBuffer.fromFile(unit.path), unit.name, timestamp, optimize=optimize, maxErrors=maxErrors, loader=loader)
+		try:
+			result = compiler.runCompiler(c, listing)
+		except CompileError as err:
+			compiler.writeOutputs(err.result, f"{base}.ccmn", f"{base}.asm")
+			return UnitResult(unit.name, "FAILED", time.perf_counter() - start, f"{err}\n{err.summary}", None)
+
+		compiler.writeOutputs(result, f"{base}.ccmn", f"{base}.asm")
+		interface = c.interface
+		writeInterface(interface, interfacePath(unit))
+	except Exception as err:
+		return UnitResult(unit.name, "FAILED", time.perf_counter() - start, failureMessage(err), None)
+	finally:
+		loader.close()
+
+	return UnitResult(unit.name, "compiled", time.perf_counter() - start, "", interface.digest)
+
+def build(units : dict, order : list, searchPath : tuple, jobs : int = 0, timestamp = None, optimize : int = 0, listing : str = "always", maxErrors : int = MAX_ERRORS, force : bool = False) -> dict:
+	"""Compiles the units that changed, or whose imports' interfaces did, as soon as their imports are done
+
+	Units whose imports are all done compile concurrently on jobs worker processes. Returns
+	unit name -> UnitResult, in order.
+	"""
+
+	results : dict = {}
+	digests : dict = {}
+	pending : list = list(order)
+	running : dict = {} #Future -> unit name
+
+	with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(order))) as pool:
+		while pending or running:
+			for name in list(pending):
+				unit = units[name]
+				if any(dependency in results and results[dependency].digest is None for dependency in unit.imports):
+					pending.remove(name)
+					results[name] = UnitResult(name, "skipped", 0.0, "An import failed to compile", None)
+				elif all(dependency in digests for dependency in unit.imports):
+					pending.remove(name)
+					digest = None if force else upToDate(unit, digests, optimize)
+					if digest is not None:
+						results[name] = UnitResult(name, "current", 0.0, "", digest)
+						digests[name] = digest
+					else:
+						running[pool.submit(compileUnit, unit, searchPath, timestamp, optimize, listing, maxErrors)] = name
+
+			if not running:
+				continue #Units found current may have readied others
+
+			done, _ = wait(running, return_when=FIRST_COMPLETED)
+			for future in done:
+				result = results[running.pop(future)] = future.result()
+				if result.digest is not None:
+					digests[result.name] = result.digest
+
+	return {name : results[name] for name in order}
+
+def link(root : str, units : dict, order : list) -> str:
+	"""Checks every unit's references against the others' interfaces and writes root's _start, returning its path"""
+
+	interfaces : dict = {}
+	try:
+		for name in order:
+			try:
+				interfaces[name] = readInterface(interfacePath(units[name]))
+			except (OSError, ValueError, KeyError, TypeError):
+				raise LinkError(f"No usable interface for unit {name}")
+
+		labels : set = set()
+		for name, interface in interfaces.items():
+			labels.add(INIT_FORMAT.format(name))
+			labels.update(entry.internalName for entry in interface.symbols.values())
+
+		for name, interface in interfaces.items():
+			for dependency, digest in interface.imports.items():
+				if interfaces[dependency].digest != digest:
+					raise LinkError(f"{name} was compiled against an older interface of {dependency}")
+			for label in interface.externs:
+				if label not in labels:
+					raise LinkError(f"Unresolved reference to {label} in {name}")
+	finally:
+		for interface in interfaces.values():
+			interface.symbols.close()
+
+	emitter = Emitter()
+	emitter.emit(".text", "global", "_start", "", f"; {root}")
+	for name in order:
+		emitter.emit(".text", "extern", INIT_FORMAT.format(name))
+	emitter.emit(".text", "_start:", comment="\n")
+	for name in order:
+		emitter.emit(".text", "", "call", INIT_FORMAT.format(name))
+	emitter.emit(".text", "", "Exit", "{0}")
+	emitter.close()
+
+	path = units[root].path[:-len(".cmn")] + START_SUFFIX
+	with open(path, "w") as startFile:
+		startFile.write(emitter.getvalue())
+
+	return path
+
+def main(argv : list = None) -> int:
+	"""Builds a program of separately compiled units: compiles what changed, then links"""
+
+	parser = argparse.ArgumentParser(prog="link.py", description="Commission unit build and link driver")
+	parser.add_argument("root", help="the program's main unit, as a name or .cmn file")
+	parser.add_argument("-I", dest="include", action="append", default=[], metavar="DIR", help="also look for units in DIR")
+	parser.add_argument("-j", "--jobs", type=int, default=0, help="units compiled at once (default: one per core)")
+	parser.add_argument("-O", dest="optimize", type=int, choices=(0, 1, 2), default=0, help="optimization level: 1 propagates constants, pools literals, leaves out unused constants and drops redundant moves and jumps; 2 also allocates registers and drops dead stores and unreachable code (default: 0)")
+	parser.add_argument("--listing", choices=LISTING_MODES, default="always", help="when to write each unit's .ccmn listing (default: always)")
+	parser.add_argument("--max-errors", type=int, default=MAX_ERRORS, metavar="N", help="stop after N errors per unit, 0 for no limit (default: %(default)s)")
+	parser.add_argument("--force", action="store_true", help="compile every unit, even those that are current")
+	parser.add_argument("--deterministic", action="store_true", help="stamp the .ccmn headers with SOURCE_DATE_EPOCH (default 0) instead of now")
+	args = parser.parse_args(argv)
+
+	root = os.path.basename(args.root)
+	root = root[:-len(".cmn")] if root.endswith(".cmn") else root
+	searchPath = (os.path.dirname(args.root) or ".", *args.include)
+	timestamp = compiler.deterministicTime() if args.deterministic else None
+	start = time.perf_counter()
+
+	try:
+		units = discover(root, searchPath)
+		order = buildOrder(units, root)
+	except LinkError as err:
+		print(err)
+		return 1
+	except OSError:
+		print("CompilerError: Unable to open/create important files")
+		return 1
+
+	results = build(units, order, searchPath, args.jobs, timestamp, args.optimize, args.listing, args.max_errors, args.force)
+
+	for result in results.values():
+		print("{:>10.3f} s  {:9}{}".format(result.seconds, result.status, result.name))
+		if result.message:
+			print("".join(f"{'':>15}{line}\n" for line in result.message.splitlines()), end="")
+
+	counts = {status : sum(1 for result in results.values() if result.status == status) for status in ("compiled", "current", "FAILED", "skipped")}
+	print("\n{} units, {} compiled, {} current, {} failed, {} skipped in {:.3f} s".format(len(results), *counts.values(), time.perf_counter() - start))
+
+	if counts["FAILED"] or counts["skipped"]:
+		return 1
+
+	try:
+		path = link(root, units, order)
+	except LinkError as err:
+		print(err)
+		return 1
+	except OSError:
+		print("CompilerError: Unable to open/create important files")
+		return 1
+
+	print(f"Linked {len(order)} units: {path} {' '.join(units[name].path[:-len('.cmn')] + '.asm' for name in order)}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
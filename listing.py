@@ -0,0 +1,45 @@
+# --- Imports --- #
+
+import datetime as dt
+from source import SourceBuffer
+
+# --- Variables --- #
+
+LISTING_MODES = ("always", "errors", "never") #When a .ccmn is rendered
+LINE_FORMAT : str = "{:>5}| {}"
+FOOTER : str = "Automatically generated from compiler.py...\n"
+
+
+# --- Functions --- #
+
+def listingHeader(title : str, time : dt.datetime = None) -> str:
+	"""Creates the .ccmn header, stamped with time (now by default)"""
+
+	time = time or dt.datetime.now(dt.timezone.utc)
+	return "{}\t{}\n\n".format(title, time.strftime("%Y/%m/%D %H:%M %Z"))
+
+def wantListing(mode : str, failed : bool) -> bool:
+	return mode == "always" or (mode == "errors" and failed)
+
+def renderListing(source : SourceBuffer, title : str = "", time : dt.datetime = None, diagnostics = (), lastLine : int = 0) -> str:
+	"""Renders the .ccmn of a finished compile from the source's line index
+
+	Source lines are numbered through lastLine (0 for all) with each diagnostic's message after
+	its line, and the listing ends with the footer when there are diagnostics.
+	"""
+
+	text : list = [listingHeader(title, time)]
+	first : int = 1
+
+	for diagnostic in sorted(diagnostics, key=lambda diagnostic: diagnostic.line):
+		if diagnostic.line >= first:
+			text.extend(LINE_FORMAT.format(lineNo, line) for lineNo, line in source.lines(first, diagnostic.line))
+		text.append(f"\nLine {diagnostic.line}: {diagnostic.message}\n\n")
+		first = max(first, diagnostic.line + 1)
+
+	if not lastLine or lastLine >= first:
+		text.extend(LINE_FORMAT.format(lineNo, line) for lineNo, line in source.lines(first, lastLine))
+	if diagnostics:
+		text.append(FOOTER)
+
+	return "".join(text)
@@ -0,0 +1,163 @@
+# --- Imports --- #
+
+import contextlib
+import datetime as dt
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import compiler
+from diagnostics import MAX_ERRORS, CompileError
+from incremental import IncrementalCompiler, markFailed
+from instrument import Recorder
+from result import CompileResult
+from source import SourceBuffer
+
+# --- Variables --- #
+
+Chunk = namedtuple("Chunk", ["start", "end", "line"]) #Offsets of a run of whole lines and the line it starts on
+
+MIN_CHUNK : int = 1 << 16 #Characters below which a chunk is not worth a worker
+CHUNKS_PER_JOB : int = 2 #So a worker left with slow statements does not hold up the others
+
+
+# --- Functions --- #
+
+def splitSource(text : str, chunks : int) -> list:
+	"""Splits text into at most chunks Chunks of about the same size, each starting on a new line
+
+	Statements end at the end of their line, so a line start is a statement boundary, unless a
+	parenthesized expression goes on across it. A chunk cut there only costs its first
+	statement being parsed again when merging.
+	"""
+
+	starts : list = [0]
+	size : int = max(len(text) // max(chunks, 1), MIN_CHUNK)
+
+	while starts[-1] + size < len(text):
+		start = text.find('\n', starts[-1] + size) + 1
+		if start <= 0 or start >= len(text):
+			break
+		starts.append(start)
+
+	lines : list = [1]
+	for previous, start in zip(starts, starts[1:]):
+		lines.append(lines[-1] + text.count('\n', previous, start))
+
+	return [Chunk(start, end, line) for start, end, line in zip(starts, starts[1:] + [len(text)], lines)]
+
+def parseChunk(text : str, last : bool, known : dict = None, title : str = "") -> tuple:
+	"""Parses text, one chunk of a source, on its own, returning (Units, definitions) of its statements
+
+	The symbol table starts out holding known, what earlier chunks are thought to define, so a
+	statement using a name from one it does not know of fails here and is left out, along with
+	every other that failed. So is the last one, unless this is the last chunk: its lookahead was
+	the end of the chunk rather than the next statement. definitions are the (name, entry) the
+	units left inserted, temps aside.
+	"""
+
+	c = IncrementalCompiler(SourceBuffer(text, title), {}, title, maxErrors=0)
+	table = c.symbolTable
+	for name, entry in (known or {}).items():
+		table[name] = entry
+
+	try:
+		c.parse()
+	except CompileError:
+		pass
+
+	units = c.units
+	markFailed(units, c.diagnostics)
+	if not last and units:
+		units.pop()
+	units = [unit for unit in units if not unit.failed]
+
+	return units, [(name, entry) for unit in units for name, entry in unit.writes if not c.isTemp(name)]
+
+def parseChunks(text : str, chunks : list, jobs : int, title : str = "") -> list:
+	"""Units of each chunk, parsed across a process pool of jobs workers
+
+	The first pass parses every chunk with an empty symbol table. The second parses all but the
+	first again, knowing what the first pass found the chunks before it define, so that far
+	fewer statements fail for using a name from an earlier chunk.
+	"""
+
+	pieces : list = [text[chunk.start:chunk.end] for chunk in chunks]
+	lasts : list = [i == len(chunks) - 1 for i in range(len(chunks))]
+	worker = partial(parseChunk, title=title)
+
+	with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+		first = list(pool.map(worker, pieces, lasts))
+
+		known : list = [{}]
+		for units, definitions in first[:-1]:
+			known.append({**known[-1], **dict(definitions)})
+
+		second = list(pool.map(worker, pieces[1:], lasts[1:], known[1:]))
+
+	return [units for units, definitions in first[:1] + second]
+
+def compileChunked(source : SourceBuffer, title : str = "", timestamp : dt.datetime = None, optimize : int = 0, jobs : int = 0,
+		recorder : Recorder = None, listing : str = "always", maxErrors : int = MAX_ERRORS) -> CompileResult:
+	"""Compiles source like compileSource(), parsing chunks of it across a process pool of jobs workers
+
+	Each chunk is parsed in a worker into the inserts and IR of its statements. The merge then
+	goes through the whole source in order, as an incremental build would: a statement whose
+	lookups come out the same as in its worker is replayed, numbering its internal names in
+	source order, and any other is parsed there and then. Redefined constants, names the
+	workers did not know of and every error are so found by the merge, and the output is the
+	same as a compile on one core.
+	"""
+
+	span = recorder.span if recorder is not None else lambda name: contextlib.nullcontext()
+	jobs = jobs or os.cpu_count() or 1
+	text : str = source.text
+
+	with span("split"):
+		chunks = splitSource(text, jobs * CHUNKS_PER_JOB)
+
+	with span("chunks"):
+		parsed = parseChunks(text, chunks, jobs, title) if len(chunks) > 1 else [[]] #Merging parses a single chunk anyway
+
+	reusable : dict = {}
+	for chunk, units in zip(chunks, parsed):
+		for unit in units:
+			reusable[chunk.start + unit.start] = (unit, chunk.line - 1, chunk.start)
+
+	c = IncrementalCompiler(source, reusable, title, timestamp, optimize, maxErrors, record=False)
+	try:
+		with span("merge"):
+			return compiler.runCompiler(c, listing)
+	finally:
+		if recorder is not None:
+			recorder.count("chunks", len(chunks))
+			recorder.count("statements", len(c.units))
+			recorder.count("reused", c.reused)
+
+def compileFile(title : str, sourceName : str = "", listingName : str = "", objectName : str = "", jobs : int = 0, timestamp : dt.datetime = None,
+		optimize : int = 0, recorder : Recorder = None, listing : str = "always", maxErrors : int = MAX_ERRORS) -> CompileResult:
+	"""compiler.compileFile() with the source parsed in chunks by compileChunked()"""
+
+	result : CompileResult = None
+
+	listingName = listingName or f"{title}.ccmn"
+	objectName = objectName or f"{title}.asm"
+	timestamp = timestamp or dt.datetime.now(dt.timezone.utc)
+	span = recorder.span if recorder is not None else lambda name: contextlib.nullcontext()
+
+	with span("read"):
+		source = SourceBuffer.fromFile(sourceName or f"{title}.cmn")
+
+	try:
+		result = compileChunked(source, title, timestamp, optimize, jobs, recorder, listing, maxErrors)
+	except CompileError as err:
+		result = err.result
+		raise
+	finally:
+		if result is not None:
+			with span("write"):
+				written = compiler.writeOutputs(result, listingName, objectName)
+			if recorder is not None:
+				recorder.count("bytes", written)
+
+	return result
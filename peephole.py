@@ -0,0 +1,178 @@
+# --- Variables --- #
+
+JUMPS = {"jmp", "je", "jne", "jz", "jnz", "jg", "jge", "jl", "jle", "ja", "jae", "jb", "jbe"}
+MAX_PASSES : int = 8
+
+
+# --- Functions --- #
+
+def isMemory(operand : str) -> bool:
+	return operand[:1] == '[' and operand[-1:] == ']'
+
+def operandsOf(line) -> tuple:
+	"""(destination, source) of a two operand instruction, without size specifiers such as dword"""
+
+	dst, _, src = line.operands.partition(',')
+	return dst.rpartition(' ')[2], src.rpartition(' ')[2]
+
+def labelOf(line) -> str:
+	"""Name defined by a label-only line, or '' for anything else"""
+
+	if line.label[-1:] == ':' and not line.instruction:
+		return line.label[:-1]
+	return ""
+
+def redundantMoves(lines : list) -> tuple:
+	"""Drops eax loads and stores whose value is already in place, within a basic block"""
+
+	counts : dict = {"redundantLoad" : 0, "storeLoadForwarding" : 0, "redundantStore" : 0}
+	out : list = []
+	inEax : dict = {} #Memory operand -> "load"/"store", for every location known to equal eax
+
+	for line in lines:
+		op = line.instruction
+
+		if line.label: #Labels start a new block, directives are left alone
+			inEax.clear()
+		elif op == "mov":
+			dst, src = operandsOf(line)
+			if dst == "eax" and isMemory(src):
+				if src in inEax:
+					counts["storeLoadForwarding" if inEax[src] == "store" else "redundantLoad"] += 1
+					continue
+				inEax = {src : "load"}
+			elif isMemory(dst) and src == "eax":
+				if dst in inEax:
+					counts["redundantStore"] += 1
+					continue
+				inEax[dst] = "store"
+			elif dst == "eax":
+				inEax.clear()
+			elif isMemory(dst):
+				inEax.pop(dst, None)
+		elif op != "cmp":
+			inEax.clear()
+
+		out.append(line)
+
+	return out, counts
+
+def deadStores(lines : list) -> tuple:
+	"""Drops stores that are overwritten later in the same basic block before being read"""
+
+	removed : int = 0
+	out : list = []
+	overwritten : set = set()
+
+	for line in reversed(lines):
+		op = line.instruction
+
+		if line.label or (op != "mov" and op != "cmp"):
+			overwritten.clear()
+		else:
+			dst, src = operandsOf(line)
+			if op == "mov" and isMemory(dst):
+				if dst in overwritten:
+					removed += 1
+					continue
+				overwritten.add(dst)
+			else:
+				overwritten.discard(dst)
+			overwritten.discard(src)
+
+		out.append(line)
+
+	out.reverse()
+	return out, {"deadStore" : removed}
+
+def jumpsToNext(lines : list) -> tuple:
+	"""Drops jumps whose target label directly follows them"""
+
+	removed : int = 0
+	out : list = []
+
+	for i, line in enumerate(lines):
+		if line.instruction in JUMPS and not line.label:
+			j = i + 1
+			while j < len(lines) and labelOf(lines[j]) and labelOf(lines[j]) != line.operands:
+				j += 1
+			if j < len(lines) and labelOf(lines[j]) == line.operands:
+				removed += 1
+				continue
+
+		out.append(line)
+
+	return out, {"jumpToNext" : removed}
+
+def unreachable(lines : list) -> tuple:
+	"""Drops instructions between an unconditional jmp and the next label"""
+
+	removed : int = 0
+	out : list = []
+	dead : bool = False
+
+	for line in lines:
+		if line.label:
+			dead = False
+		elif dead:
+			removed += 1
+			continue
+
+		out.append(line)
+		dead = line.instruction == "jmp" and not line.label
+
+	return out, {"unreachable" : removed}
+
+def lastBarrier(lines : list) -> int:
+	"""Index just past the last line no rule looks across, or 0 when there is none
+
+	That is a reachable, unlabeled line that is not a mov, cmp or jump: it clears what
+	redundantMoves and deadStores know, stops jumpsToNext looking for labels and is never
+	removed. The lines up to it are so optimized the same whatever follows them, and the
+	lines after it whatever came before.
+	"""
+
+	cut : int = 0
+	dead : bool = False
+
+	for i, line in enumerate(lines):
+		if line.label:
+			dead = False
+			continue
+		if not dead and line.instruction not in JUMPS and line.instruction != "mov" and line.instruction != "cmp":
+			cut = i + 1
+		dead = dead or line.instruction == "jmp"
+
+	return cut
+
+RULES = ((1, redundantMoves), (1, jumpsToNext), (2, deadStores), (2, unreachable)) #(Minimum -O level, rule)
+
+
+# --- Peephole Class --- #
+
+class Peephole(object):
+
+	def __init__(self, level : int = 1):
+		"""Constructor for Peephole()"""
+
+		self.__rules : tuple = tuple(rule for minLevel, rule in RULES if level >= minLevel)
+		self.__counts : dict = {}
+
+	@property
+	def counts(self) -> dict:
+		"""Instructions removed so far, by rule"""
+		return self.__counts
+
+	def run(self, lines : list) -> list:
+		"""Applies every rule until none of them removes anything (at most MAX_PASSES times)"""
+
+		for _ in range(MAX_PASSES):
+			before = len(lines)
+			for rule in self.__rules:
+				lines, counts = rule(lines)
+				for name, count in counts.items():
+					self.__counts[name] = self.__counts.get(name, 0) + count
+			if len(lines) == before:
+				break
+
+		return lines
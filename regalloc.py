@@ -0,0 +1,110 @@
+# --- Imports --- #
+
+from bisect import bisect_left
+from collections import namedtuple
+from ir import IR, NONE, READ, WRITE
+
+# --- Variables --- #
+
+#Allocatable registers, in order of preference. eax is left to the library routines, which take
+#and return values in it, and to moves between two symbols in memory. ReadInt, WriteInt,
+#WriteString and Crlf preserve every other register.
+REGISTERS = ("ebx", "ecx", "edx")
+
+Interval = namedtuple("Interval", ["name", "start", "end"]) #First and last instruction to touch name
+
+
+# --- LinearScan Class --- #
+
+class LinearScan(object):
+
+	def __init__(self, registers = REGISTERS):
+		"""Constructor for LinearScan(), a linear scan register allocator over straight-line code
+
+		Each symbol's interval runs from the first to the last instruction that touches it and
+		gets a register for all of it or none of it. A register is only given to an interval
+		that no instruction inside it clobbers.
+		"""
+
+		self.__registers : tuple = tuple(registers)
+		self.__spilled : list = []
+
+	@property
+	def spilled(self) -> list:
+		"""Names left in memory by the last allocate()"""
+		return self.__spilled
+
+	def allocate(self, intervals : list, clobbers : dict, early : dict = None) -> dict:
+		"""Name -> register for the intervals that get one
+
+		clobbers maps a register to the sorted instruction indexes that destroy it after reading
+		their operands, early to those that destroy it before, so no symbol the instruction
+		touches can be in it. Intervals are taken by start; when no register is free, the
+		interval ending last, this one or an active one, is the one left in memory.
+		"""
+
+		assignment : dict = {}
+		active : list = [] #Intervals holding a register, by end
+		free : list = list(self.__registers)
+		self.__spilled = []
+
+		early = early or {}
+
+		def fits(register : str, interval : Interval) -> bool:
+			points = clobbers.get(register, ())
+			i = bisect_left(points, interval.start)
+			if i < len(points) and points[i] < interval.end:
+				return False
+			points = early.get(register, ())
+			i = bisect_left(points, interval.start)
+			return i == len(points) or points[i] > interval.end
+
+		for interval in sorted(intervals, key=lambda interval: (interval.start, interval.end)):
+			while active and active[0].end < interval.start:
+				free.append(assignment[active.pop(0).name])
+			free.sort(key=self.__registers.index)
+
+			register = next((register for register in free if fits(register, interval)), None)
+			if register is not None:
+				free.remove(register)
+			else:
+				victims = [other for other in active if other.end > interval.end and fits(assignment[other.name], interval)]
+				if not victims:
+					self.__spilled.append(interval.name)
+					continue
+
+				victim = max(victims, key=lambda other: other.end)
+				register = assignment.pop(victim.name)
+				active.remove(victim)
+				self.__spilled.append(victim.name)
+
+			assignment[interval.name] = register
+			active.append(interval)
+			active.sort(key=lambda other: other.end)
+
+		return assignment
+
+
+# --- Functions --- #
+
+def liveIntervals(code : IR, candidates, extended = ()) -> list:
+	"""Intervals of the candidate names in code; those in extended stay live to the end of it"""
+
+	names = code.names
+	first : dict = {}
+	last : dict = {}
+
+	for i, (op, dst, src1, src2) in enumerate(code):
+		for operand in (src1,) if op == WRITE else (dst,) if op == READ else (dst, src1, src2): #Streams are never loaded
+			if operand != NONE:
+				name = names[operand]
+				first.setdefault(name, i)
+				last[name] = i
+
+	return [Interval(name, start, len(code) if name in extended else last[name]) for name, start in first.items() if name in candidates]
+
+def definedNames(code : IR) -> set:
+	"""Names some instruction of code writes to"""
+
+	names = code.names
+	return {names[dst] for op, dst, src1, src2 in code if dst != NONE}
@@ -0,0 +1,8 @@
+# --- Imports --- #
+
+from collections import namedtuple
+
+
+# --- CompileResult --- #
+
+CompileResult = namedtuple("CompileResult", ["asm", "listing", "symbolTable", "diagnostics", "stats"])
@@ -0,0 +1,82 @@
+# --- Imports --- #
+
+import mmap
+import os
+from array import array
+from itertools import accumulate
+
+# --- Variables --- #
+
+MMAP_THRESHOLD : int = 1 << 22 #Files at least this large (4 MiB) are memory-mapped
+
+
+# --- SourceBuffer Class --- #
+
+class SourceBuffer(object):
+
+	def __init__(self, text : str = "", name : str = ""):
+		"""Constructor for SourceBuffer()"""
+
+		self.__text : str = text
+		self.__name : str = name
+		self.__length : int = len(text)
+
+		self.__lineStarts : array = None #Offset of every line, built on first use
+
+	@classmethod
+	def fromFile(cls, path : str):
+		"""Reads a whole source file in one go, memory-mapping large ones"""
+
+		with open(path, "rb") as file:
+			size = os.fstat(file.fileno()).st_size
+			if size >= MMAP_THRESHOLD:
+				with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+					text = str(data, "utf-8")
+			else:
+				text = file.read().decode("utf-8")
+
+		if "\r" in text: #Same newline handling as text mode open()
+			text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+		return cls(text, path)
+
+	def __len__(self):
+		return self.__length
+
+	@property
+	def name(self) -> str:
+		return self.__name
+
+	@property
+	def text(self) -> str:
+		return self.__text
+
+	@property
+	def lineStarts(self) -> array:
+		"""Offset at which each line starts, line 1 first"""
+
+		if self.__lineStarts is None:
+			starts = array("Q", accumulate((len(line) + 1 for line in self.__text.split('\n')), initial=0))
+			starts.pop() #Past the end
+			if len(starts) > 1 and starts[-1] >= self.__length: #Text ends with a newline
+				starts.pop()
+			self.__lineStarts = starts
+
+		return self.__lineStarts
+
+	@property
+	def lineCount(self) -> int:
+		return len(self.lineStarts) if self.__length else 0
+
+	def line(self, lineNo : int) -> str:
+		"""Text of line lineNo (from 1), with its newline"""
+
+		starts = self.lineStarts
+		return self.__text[starts[lineNo - 1]:starts[lineNo] if lineNo < len(starts) else self.__length]
+
+	def lines(self, first : int = 1, last : int = 0):
+		"""Yields (line, text) for lines first through last (0 for the end)"""
+
+		last = min(last, self.lineCount) if last else self.lineCount
+		for lineNo in range(first, last + 1):
+			yield lineNo, self.line(lineNo)
@@ -16,4 +16,7 @@ class Stack:
 		self.__stack.append(item)
 		
 	def pop(self):
-		return self.__stack.pop()
\ No newline at end of file
+		return self.__stack.pop()
+		
+	def top(self):
+		return self.__stack[-1]
\ No newline at end of file
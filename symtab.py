@@ -0,0 +1,188 @@
+# --- Imports --- #
+
+from array import array
+from enum import Enum
+from ste import SymbolTableEntry
+
+
+# --- Code Class --- #
+
+class Code(str, Enum):
+	"""Interned symbol field value, stored as a small integer and equal to its string"""
+
+	__str__ = str.__str__
+	__format__ = str.__format__
+
+	def __repr__(self):
+		return repr(self.value)
+
+
+class Type(Code):
+
+	INT = "INT"
+	BOOL = "BOOL"
+	STR = "STR"
+	CHAR = "CHAR"
+	LIST = "LIST"
+
+
+class Mode(Code):
+
+	CONST = "CONST" #.data
+	VAR = "VAR" #.bss
+
+
+# --- Variables --- #
+
+TYPES = tuple(Type)
+MODES = tuple(Mode)
+TYPE_CODES = {type : code for code, type in enumerate(TYPES)}
+MODE_CODES = {mode : code for code, mode in enumerate(MODES)}
+ALLOCS = ("NO", "YES")
+IRREGULAR : int = -1 #Internal name kept as a string, not as the type's letter and a number
+MAX_NUMBER : int = 2 ** 31 - 1 #Largest number the signed "i" column holds
+
+
+# --- SymbolTable Class --- #
+
+class SymbolTable(object):
+
+	def __init__(self):
+		"""Constructor for SymbolTable()
+
+		Behaves like the dict of SymbolTableEntry it replaces, but keeps one row per symbol in
+		parallel columns: type, mode and alloc as byte codes, units in an unsigned array, and the
+		internal name as the number after its type's letter. Rows are also indexed by mode, so each
+		storage section is a direct walk.
+		"""
+
+		self.__rows : dict = {} #Name -> row
+
+		#Columns
+		self.__names : list = []
+		self.__numbers = array("i") #Internal name numbers
+		self.__irregular : dict = {} #Row -> internal name, for those that are not type letter + number
+		self.__types = array("B")
+		self.__modes = array("B")
+		self.__values : list = []
+		self.__allocs = array("B")
+		self.__units = array("I")
+
+		self.__sections : dict = {mode : [] for mode in MODES} #Mode -> rows, in insertion order
+
+	def __len__(self):
+		return len(self.__rows)
+
+	def __contains__(self, name : str):
+		return name in self.__rows
+
+	def __iter__(self):
+		return iter(self.__rows)
+
+	def __repr__(self):
+		return f"SymbolTable({dict(self.items())!r})"
+
+	def entry(self, row : int) -> SymbolTableEntry:
+		"""SymbolTableEntry view of row"""
+
+		type = TYPES[self.__types[row]]
+		number = self.__numbers[row]
+		internalName = self.__irregular[row] if number == IRREGULAR else f"{type[0]}{number}"
+
+		return SymbolTableEntry(internalName, type, MODES[self.__modes[row]], self.__values[row], ALLOCS[self.__allocs[row]], self.__units[row])
+
+	def __getitem__(self, name : str) -> SymbolTableEntry:
+		return self.entry(self.__rows[name])
+
+	def get(self, name : str, default = None) -> SymbolTableEntry:
+		row = self.__rows.get(name)
+		return default if row is None else self.entry(row)
+
+	def fields(self, name : str) -> tuple:
+		"""Everything in name's entry but its internal name, None when it is not in the table"""
+
+		row = self.__rows.get(name)
+		if row is None:
+			return None
+		return (TYPES[self.__types[row]], MODES[self.__modes[row]], self.__values[row], ALLOCS[self.__allocs[row]], self.__units[row])
+
+	def __setitem__(self, name : str, entry : SymbolTableEntry):
+		"""Adds name, or overwrites its row when it is already present"""
+
+		type = TYPE_CODES[entry.type]
+		mode = MODE_CODES[entry.mode]
+		number = self.number(entry.internalName, entry.type)
+		row = self.__rows.get(name)
+
+		if row is None:
+			row = self.__rows[name] = len(self.__names)
+			self.__names.append(name)
+			self.__numbers.append(number)
+			self.__types.append(type)
+			self.__modes.append(mode)
+			self.__values.append(entry.value)
+			self.__allocs.append(entry.alloc == "YES")
+			self.__units.append(int(entry.units))
+			self.__sections[MODES[mode]].append(row)
+		else:
+			if self.__modes[row] != mode:
+				self.__sections[MODES[self.__modes[row]]].remove(row)
+				self.__sections[MODES[mode]].append(row)
+				self.__sections[MODES[mode]].sort()
+
+			self.__numbers[row] = number
+			self.__types[row] = type
+			self.__modes[row] = mode
+			self.__values[row] = entry.value
+			self.__allocs[row] = entry.alloc == "YES"
+			self.__units[row] = int(entry.units)
+
+		if number == IRREGULAR:
+			self.__irregular[row] = entry.internalName
+		else:
+			self.__irregular.pop(row, None)
+
+	@staticmethod
+	def number(internalName : str, type : str) -> int:
+		"""Number in internalName when it is the letter of type followed by digits, IRREGULAR otherwise"""
+
+		digits = internalName[1:]
+		if internalName[:1] == type[0] and digits.isascii() and digits.isdecimal() and (digits[0] != '0' or digits == '0') and int(digits) <= MAX_NUMBER:
+			return int(digits)
+		return IRREGULAR
+
+	def keys(self):
+		return self.__rows.keys()
+
+	def values(self):
+		return (self.entry(row) for row in self.__rows.values())
+
+	def items(self):
+		return ((name, self.entry(row)) for name, row in self.__rows.items())
+
+	def section(self, mode : Mode, allocated : bool = True):
+		"""Yields (name, entry) for the symbols of mode, only those with storage when allocated"""
+
+		names = self.__names
+		allocs = self.__allocs
+
+		for row in self.__sections[mode]:
+			if allocs[row] or not allocated:
+				yield names[row], self.entry(row)
+
+	def truncate(self, length : int):
+		"""Drops every row after the first length, the symbols added last"""
+
+		for row in range(length, len(self.__names)):
+			del self.__rows[self.__names[row]]
+			self.__irregular.pop(row, None)
+		for rows in self.__sections.values(): #Each in row order, so the dropped rows are last
+			while rows and rows[-1] >= length:
+				rows.pop()
+
+		for column in (self.__names, self.__numbers, self.__types, self.__modes, self.__values, self.__allocs, self.__units):
+			del column[length:]
+
+	def setAlloc(self, name : str, alloc : bool):
+		"""Gives name storage or takes it away"""
+		self.__allocs[self.__rows[name]] = alloc
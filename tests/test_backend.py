@@ -0,0 +1,38 @@
+# --- Imports --- #
+
+import re
+import pytest
+import compiler
+from backend import STRING_CHUNK, UNIT_BYTES
+from lexer import LARGE_LITERAL
+
+# --- Functions --- #
+
+def dataOf(asm : str, label : str) -> list:
+	"""Operands of the dd lines of label, up to the next label"""
+
+	lines : list = []
+	for line in asm.splitlines():
+		if line.startswith(label + " "):
+			lines.append(line)
+		elif lines and line[:1].strip():
+			break
+		elif lines and line.strip():
+			lines.append(line)
+
+	return [re.match(r"\S*\s+dd\s+(.*?)\s*(?:;.*)?$", line).group(1) for line in lines]
+
+
+# --- Tests --- #
+
+@pytest.mark.parametrize("before", (STRING_CHUNK - 1, STRING_CHUNK - 2, STRING_CHUNK - 3, 0))
+def test_large_strings_are_chunked_by_bytes(before):
+	text = "a" * before + "é€😀" * 3 + "b" * LARGE_LITERAL
+	result = compiler.compileSource(f"str s = \"x\"\nfrozen str S = \"{text}\"\ns = S\n", "t", optimize=1)
+	label = result.symbolTable["S"].internalName
+	operands = dataOf(result.asm, label)
+
+	pieces = [operand[1:operand.rindex('"')] for operand in operands]
+	assert "".join(pieces) == text and operands[-1].endswith('",0')
+	assert all(len(piece.encode()) % UNIT_BYTES == 0 and len(piece.encode()) >= STRING_CHUNK for piece in pieces[:-1])
+	assert result.stats["data.bytes"] == -(-len(text.encode()) // UNIT_BYTES) * UNIT_BYTES + UNIT_BYTES
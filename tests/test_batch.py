@@ -0,0 +1,67 @@
+# --- Imports --- #
+
+import datetime as dt
+import os
+import batch
+
+# --- Variables --- #
+
+TIMESTAMP = dt.datetime(2024, 1, 1)
+
+
+# --- Functions --- #
+
+def sources(tmp_path, count : int) -> list:
+	"""Writes count .cmn files under tmp_path, every third one with an error, and returns their paths"""
+
+	(tmp_path / "sub").mkdir()
+	paths : list = []
+	for i in range(count):
+		path = tmp_path / ("sub" if i % 2 else "") / f"u{i}.cmn"
+		path.write_text(f"int io = 0\nint a = {i}\nio << a\n" + ("b = c\n" if i % 3 == 0 else ""))
+		paths.append(str(path))
+
+	return sorted(paths)
+
+def outputs(paths : list) -> dict:
+	out : dict = {}
+	for path in paths:
+		for suffix in (".asm", ".ccmn"):
+			name = path[:-len(".cmn")] + suffix
+			if os.path.exists(name):
+				with open(name) as file:
+					out[name] = file.read()
+				os.unlink(name)
+
+	return out
+
+
+# --- Tests --- #
+
+def test_find_sources(tmp_path):
+	paths = sources(tmp_path, 4)
+	(tmp_path / "notes.txt").write_text("")
+
+	assert batch.findSources([str(tmp_path)]) == paths
+	assert batch.findSources([str(tmp_path / "*.cmn"), str(tmp_path / "u0.cmn")]) == [str(tmp_path / "u0.cmn"), str(tmp_path / "u2.cmn")]
+	assert batch.findSources([str(tmp_path / "sub" / "u1")]) == [str(tmp_path / "sub" / "u1.cmn")]
+
+def test_pool_matches_one_by_one(tmp_path):
+	paths = sources(tmp_path, 9)
+
+	serial = batch.compileBatch(paths, jobs=1, timestamp=TIMESTAMP, optimize=2)
+	serialOutputs = outputs(paths)
+	pooled = batch.compileBatch(paths, jobs=3, timestamp=TIMESTAMP, optimize=2)
+
+	assert [(r.title, r.ok, r.message) for r in pooled] == [(r.title, r.ok, r.message) for r in serial]
+	assert [r.ok for r in serial] == [int(os.path.basename(path)[1:-len(".cmn")]) % 3 != 0 for path in paths]
+	assert outputs(paths) == serialOutputs
+
+def test_a_failure_does_not_stop_the_batch(tmp_path, capsys):
+	paths = sources(tmp_path, 3)
+	paths.insert(1, str(tmp_path / "missing.cmn"))
+
+	assert batch.main(paths, jobs=2, timestamp=TIMESTAMP) == 2
+	out = capsys.readouterr().out
+	assert "4 files, 2 compiled, 2 failed" in out
+	assert "Unable to open/create important files" in out and "ReferenceError" in out
@@ -0,0 +1,67 @@
+# --- Imports --- #
+
+import os
+import compiler
+from cache import ENTRY_SUFFIX, BuildCache
+from instrument import Recorder
+
+# --- Variables --- #
+
+TEXT : str = "int io = 0\nint a = 1\nint b = a + 2\nio << b\n"
+
+
+# --- Functions --- #
+
+def build(tmp_path, cache : BuildCache, text : str = TEXT, optimize : int = 0) -> tuple:
+	"""(result, asm written, cache hits) of compiling text through the cache"""
+
+	(tmp_path / "t.cmn").write_text(text)
+	recorder = Recorder()
+	result = compiler.compileFile(str(tmp_path / "t"), cache=cache, optimize=optimize, recorder=recorder)
+
+	return result, (tmp_path / "t.asm").read_text(), recorder.counters.get("cacheHits", 0)
+
+
+# --- Tests --- #
+
+def test_hit_writes_what_the_compile_did(tmp_path):
+	cache = BuildCache(str(tmp_path / "cache"))
+	first, firstAsm, firstHits = build(tmp_path, cache)
+	second, secondAsm, secondHits = build(tmp_path, cache)
+
+	assert (firstHits, secondHits) == (0, 1)
+	assert secondAsm == firstAsm == first.asm == second.asm
+	assert dict(second.symbolTable).keys() == dict(first.symbolTable).keys()
+
+def test_source_and_options_change_the_key(tmp_path):
+	cache = BuildCache(str(tmp_path / "cache"))
+	keys = {cache.key(TEXT, "t"), cache.key(TEXT + "a = 2\n", "t"), cache.key(TEXT, "u"), cache.key(TEXT, "t", {"optimize" : 2})}
+
+	assert len(keys) == 4
+	assert cache.key(TEXT, "t") == BuildCache(str(tmp_path / "other")).key(TEXT, "t")
+
+def test_torn_entry_is_a_miss(tmp_path):
+	cache = BuildCache(str(tmp_path / "cache"))
+	build(tmp_path, cache)
+	for name in os.listdir(cache.directory):
+		with open(os.path.join(cache.directory, name), "w") as file:
+			file.write("{\"asm\"")
+
+	result, asm, hits = build(tmp_path, cache)
+	assert hits == 0 and asm == result.asm
+
+def test_eviction_drops_the_least_recently_used_entry(tmp_path):
+	result = compiler.compileSource(TEXT, "t")
+	cache = BuildCache(str(tmp_path / "cache"))
+	cache.store("a", result)
+	size = os.path.getsize(cache.path("a"))
+
+	cache = BuildCache(cache.directory, maxBytes=2 * size + size // 2)
+	cache.store("b", result)
+	os.utime(cache.path("a"), (1000, 1000)) #a is the older, until it is used
+	os.utime(cache.path("b"), (2000, 2000))
+	assert cache.load("a") is not None
+	cache.store("c", result)
+
+	assert sorted(name for name in os.listdir(cache.directory) if name.endswith(ENTRY_SUFFIX)) == ["a" + ENTRY_SUFFIX, "c" + ENTRY_SUFFIX]
+	assert cache.load("b") is None
@@ -0,0 +1,64 @@
+# --- Imports --- #
+
+import io
+import os
+import pytest
+import compiler
+from corpus import withoutTime
+from diagnostics import CompileError
+from source import SourceBuffer
+
+# --- Variables --- #
+
+EXAMPLES : str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Examples")
+
+
+# --- Tests --- #
+
+def test_example_matches_golden(monkeypatch):
+	monkeypatch.chdir(os.path.dirname(EXAMPLES))
+	title = os.path.join("Examples", "test")
+	result = compiler.compileSource(SourceBuffer.fromFile(f"{title}.cmn"), title)
+
+	with open(f"{title}.asm") as file:
+		assert result.asm == file.read()
+	with open(f"{title}.ccmn") as file:
+		assert withoutTime(result.listing) == withoutTime(file.read())
+
+def test_source_kinds_compile_the_same():
+	text = "int a = 1\nb = a\n"
+	results = [compiler.compileSource(source, "t") for source in (text, io.StringIO(text), SourceBuffer(text, "t"))]
+
+	assert len({result.asm for result in results}) == 1
+	assert all(not result.diagnostics for result in results)
+
+def test_compile_error_carries_every_diagnostic_and_the_result():
+	with pytest.raises(CompileError) as info:
+		compiler.compileSource("int a = 1\nb = c\nint d = True\n", "t")
+
+	err = info.value
+	assert [d.line for d in err.diagnostics] == [2, 3]
+	assert err.diagnostic == err.diagnostics[0]
+	assert err.result is not None and err.result.listing is not None
+	assert err.summary == "2 errors"
+
+def test_error_limit_stops_the_compile():
+	with pytest.raises(CompileError) as info:
+		compiler.compileSource("".join(f"x{i} = y\n" for i in range(5)), "t", maxErrors=2)
+
+	assert len(info.value.diagnostics) == 2
+	assert info.value.limited
+
+def test_stream_leaves_asm_to_the_stream():
+	stream = io.StringIO()
+	result = compiler.compileSource("int a = 1\nb = a\n", "t", objectStream=stream)
+
+	assert result.asm is None
+	assert stream.getvalue() == compiler.compileSource("int a = 1\nb = a\n", "t").asm
+
+@pytest.mark.parametrize("statement", ("A = c", "A = c + 1", "A = 6", "frozen int A = 6", "int A = 6"))
+def test_frozen_values_cannot_be_assigned(statement):
+	with pytest.raises(CompileError) as info:
+		compiler.compileSource(f"int io = 0\nfrozen int A = 5\nint c = 9\n{statement}\nio << A\n", "t", optimize=2)
+
+	assert [(d.line, d.message) for d in info.value.diagnostics] == [(4, "RedefinitionError: You may not redefine a constant")]
@@ -0,0 +1,119 @@
+# --- Imports --- #
+
+import io
+import random
+import pytest
+import compiler
+import x86
+from source import SourceBuffer
+from vm import VM, Bytecode
+
+# --- Variables --- #
+
+INPUTS : list = [7, -3, 2147483647, 0, -2147483648, 12]
+
+
+# --- Functions --- #
+
+def runVM(text : str, stdin : list = ()) -> str:
+	c = compiler.Compiler(SourceBuffer(text, "t"), "t")
+	c.parse()
+	out = io.StringIO()
+	VM(io.StringIO("".join(f"{value}\n" for value in stdin)), out).run(Bytecode(c.ir, c.symbolTable))
+	return out.getvalue()
+
+def runAsm(text : str, optimize : int, stdin : list = ()) -> str:
+	c = compiler.Compiler(SourceBuffer(text, "t"), "t", optimize=optimize)
+	c.__main__()
+	return x86.run(c.asm, stdin, x86.storageOnly(c, text))
+
+def expression(rand : random.Random, ints : list, bools : list, type : str, depth : int) -> str:
+	"""Random expression of type over the variables ints and bools, which never divides by zero"""
+
+	if depth == 0 or rand.random() < 0.25:
+		if type == "INT":
+			return rand.choice(ints) if rand.random() < 0.7 else str(rand.randrange(-50, 50))
+		return rand.choice(bools) if bools and rand.random() < 0.7 else rand.choice(("True", "False"))
+
+	if type == "BOOL":
+		kind = rand.randrange(4)
+		if kind == 0:
+			return f"not ({expression(rand, ints, bools, 'BOOL', depth - 1)})"
+		if kind == 1:
+			return f"({expression(rand, ints, bools, 'BOOL', depth - 1)}) {rand.choice(('and', 'or'))} ({expression(rand, ints, bools, 'BOOL', depth - 1)})"
+		return f"({expression(rand, ints, bools, 'INT', depth - 1)}) {rand.choice(('==', '!=', '<', '<=', '>', '>='))} ({expression(rand, ints, bools, 'INT', depth - 1)})"
+
+	operator = rand.choice(("+", "-", "*", "//", "%", "-x"))
+	if operator == "-x":
+		return f"-({expression(rand, ints, bools, 'INT', depth - 1)})"
+	if operator in ("//", "%"): #x * x + 1 is never 0 or -1, even wrapped
+		name = rand.choice(ints)
+		divisor = str(rand.randrange(2, 10)) if rand.random() < 0.5 else f"({name} * {name} + 1)"
+		return f"({expression(rand, ints, bools, 'INT', depth - 1)}) {operator} {divisor}"
+	return f"({expression(rand, ints, bools, 'INT', depth - 1)}) {operator} ({expression(rand, ints, bools, 'INT', depth - 1)})"
+
+def program(seed : int, statements : int = 30) -> str:
+	"""Random program of declarations, assignments, expressions, reads and writes of ints and bools"""
+
+	rand = random.Random(seed)
+	ints : list = ["a", "b", "c"]
+	bools : list = []
+	lines : list = ["int io = 0\n", "int a = 3\n", "int b = -4\n", "int c = 10\n"]
+
+	for i in range(statements):
+		kind = rand.randrange(6)
+		if kind == 0:
+			name = f"i{i}"
+			lines.append(f"int {name} = {expression(rand, ints, bools, 'INT', 3)}\n")
+			ints.append(name)
+		elif kind == 1:
+			name = f"p{i}"
+			lines.append(f"bool {name} = {expression(rand, ints, bools, 'BOOL', 3)}\n")
+			bools.append(name)
+		elif kind == 2:
+			lines.append(f"{rand.choice(ints)} = {expression(rand, ints, bools, 'INT', 3)}\n")
+		elif kind == 3:
+			lines.append(f"{rand.choice(ints)} = {rand.choice(ints)}\n")
+		elif kind == 4:
+			lines.append(f"io >> {rand.choice(ints[3:] or ints)}\n")
+		lines.append(f"io << {rand.choice(ints + bools)}\n")
+
+	return "".join(lines)
+
+
+# --- Tests --- #
+
+@pytest.mark.parametrize("optimize", (0, 1, 2))
+def test_copy_between_expressions_reloads_eax(optimize):
+	text = "int io = 0\nint a = 3\nint b = 4\nint c = 10\nint d = a + b\nb = c\nint f = d + a\nio << f\n"
+
+	assert runVM(text) == "+10\n"
+	assert runAsm(text, optimize) == "+10\n"
+
+@pytest.mark.parametrize("optimize", (0, 1, 2))
+def test_variables_declared_at_run_time_have_their_own_storage(optimize):
+	text = "int io = 0\nint a = 3\nint b = 4\nint x = a + b\nbool p = a < b\nint y = a * b\nio << x\nio << p\nio << y\n"
+
+	assert runVM(text) == "+7\nTRUE\n+12\n"
+	assert runAsm(text, optimize) == runVM(text)
+
+def test_operators():
+	text = ("int io = 0\nint a = 7\nint b = -2\n"
+		"io << a // b\nio << a % b\nio << -a // 2\nio << a * b - 1\nio << a < b\nio << not (a == 7) or b != 2\n")
+	text = "".join(line if "<<" not in line else f"x{i} = {line.split('<< ')[1]}io << x{i}\n" for i, line in enumerate(text.splitlines(True)))
+
+	assert runVM(text) == "-4\n-1\n-4\n-15\nFALSE\nTRUE\n"
+	for optimize in (0, 1, 2):
+		assert runAsm(text, optimize) == runVM(text)
+
+def test_wraps_to_32_bits():
+	text = "int io = 0\nint a = 2147483647\nint b = a + 1\nio << b\nint c = a * a\nio << c\n"
+
+	assert runVM(text) == "-2147483648\n+1\n"
+	assert runAsm(text, 2) == runVM(text)
+
+@pytest.mark.parametrize("optimize", (0, 1, 2))
+def test_asm_computes_what_the_vm_does(optimize):
+	for seed in range(60):
+		text = program(seed)
+		assert runAsm(text, optimize, INPUTS) == runVM(text, INPUTS), f"seed {seed}:\n{text}"
@@ -0,0 +1,79 @@
+# --- Imports --- #
+
+import datetime as dt
+import random
+import pytest
+import bench
+import compiler
+from diagnostics import CompileError
+from incremental import IncrementalBuild, IncrementalCompiler
+from test_expression import program
+
+# --- Variables --- #
+
+TIMESTAMP = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+BAD_LINES = ("zz = yy\n", "int q = True\n", "frozen K1 = 5\n", "int = \n", "io << (1 +\n", "char c = 'ab'\n", "$\n")
+
+
+# --- Functions --- #
+
+def outputs(compile) -> tuple:
+	"""(asm, listing, diagnostics, symbols) of compile(), whether it fails or not"""
+
+	try:
+		result = compile()
+	except CompileError as err:
+		result = err.result
+	return result.asm, result.listing, result.diagnostics, dict(result.symbolTable.items())
+
+def edit(rand : random.Random, lines : list, pool : list) -> list:
+	"""lines with one line replaced, inserted or deleted, taking new lines from pool"""
+
+	lines = list(lines)
+	i = rand.randrange(len(lines))
+	kind = rand.randrange(3)
+	if kind == 0:
+		lines[i] = rand.choice(pool)
+	elif kind == 1:
+		lines.insert(i, rand.choice(pool))
+	elif len(lines) > 1:
+		del lines[i]
+	return lines
+
+
+# --- Tests --- #
+
+@pytest.mark.parametrize("optimize", (0, 2))
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_matches_full_compile(optimize, seed):
+	rand = random.Random(seed)
+	lines = (program(seed) if seed % 2 else bench.Generator(seed=seed).program(120)).splitlines(True)
+	pool = lines + list(BAD_LINES)
+	build = IncrementalBuild("t", optimize, maxErrors=5)
+	kept : int = 0
+	reused : int = 0
+
+	for _ in range(25):
+		text = "".join(lines)
+		assert outputs(lambda: build.update(text, TIMESTAMP)) == outputs(lambda: compiler.compileSource(text, "t", TIMESTAMP, optimize=optimize, maxErrors=5))
+		kept += build.stats["kept"]
+		reused += build.stats["reused"]
+		lines = edit(rand, lines, pool)
+
+	assert kept > 0 and reused > 0
+
+@pytest.mark.parametrize("optimize", (0, 2))
+def test_edit_near_the_end_does_not_revisit_earlier_units(optimize, monkeypatch):
+	lines = bench.Generator(seed=1).program(300).splitlines(True)
+	build = IncrementalBuild("t", optimize)
+	build.update("".join(lines), TIMESTAMP)
+
+	checked : list = []
+	valid = IncrementalCompiler.valid
+	monkeypatch.setattr(IncrementalCompiler, "valid", lambda self, unit: checked.append(unit.line) or valid(self, unit))
+	lines[-2] = lines[-2].rstrip("\n") + "  \n"
+	text = "".join(lines)
+
+	assert outputs(lambda: build.update(text, TIMESTAMP)) == outputs(lambda: compiler.compileSource(text, "t", TIMESTAMP, optimize=optimize))
+	assert build.stats["reused"] + build.stats["parsed"] <= 2 and build.stats["kept"] >= build.stats["units"] - 2
+	assert all(line >= len(lines) - 1 for line in checked)
@@ -0,0 +1,57 @@
+# --- Imports --- #
+
+import interface
+import link
+
+# --- Functions --- #
+
+def writeUnits(directory) -> None:
+	(directory / "shapes.cmn").write_text("frozen int SIDES = 4\nint area = 12\n")
+	(directory / "main.cmn").write_text("import shapes\nint io = 0\nint total = SIDES\ntotal = area\nio << total\n")
+
+def trackInterfaces(monkeypatch) -> list:
+	"""Interfaces read from now on"""
+
+	read : list = []
+	original = interface.readInterface
+	def readInterface(path):
+		read.append(original(path))
+		return read[-1]
+
+	monkeypatch.setattr(interface, "readInterface", readInterface)
+	monkeypatch.setattr(link, "readInterface", readInterface)
+	return read
+
+def isClosed(index) -> bool:
+	try:
+		len(list(index))
+	except ValueError: #Reading a closed mmap
+		return True
+	return False
+
+
+# --- Tests --- #
+
+def test_build_and_link(tmp_path, capsys):
+	writeUnits(tmp_path)
+
+	assert link.main([str(tmp_path / "main"), "-j", "1"]) == 0
+	assert (tmp_path / "main.start.asm").exists() and (tmp_path / "shapes.cmni").exists()
+	assert "2 units, 2 compiled" in capsys.readouterr().out
+
+	assert link.main([str(tmp_path / "main"), "-j", "1"]) == 0
+	assert "2 units, 0 compiled, 2 current" in capsys.readouterr().out
+
+def test_interfaces_are_unmapped(tmp_path, monkeypatch, capsys):
+	writeUnits(tmp_path)
+	assert link.main([str(tmp_path / "main"), "-j", "1"]) == 0
+
+	read = trackInterfaces(monkeypatch)
+	units = link.discover("main", (str(tmp_path),))
+	order = link.buildOrder(units, "main")
+	assert link.upToDate(units["shapes"], {}, 0) is not None
+	link.link("main", units, order)
+	link.compileUnit(units["main"], (str(tmp_path),))
+
+	assert len(read) == 4
+	assert all(isClosed(each.symbols) for each in read)
@@ -0,0 +1,36 @@
+# --- Imports --- #
+
+import pytest
+import bench
+import compiler
+import parallel
+from instrument import Recorder
+from source import SourceBuffer
+from test_expression import program
+from test_incremental import TIMESTAMP, outputs
+
+# --- Tests --- #
+
+def test_split_cuts_at_line_starts(monkeypatch):
+	monkeypatch.setattr(parallel, "MIN_CHUNK", 10)
+	text = "".join(f"int v{i} = {i}\n" for i in range(50))
+	chunks = parallel.splitSource(text, 4)
+
+	assert len(chunks) == 4
+	assert chunks[0].start == 0 and chunks[-1].end == len(text)
+	for chunk, following in zip(chunks, chunks[1:]):
+		assert chunk.end == following.start and text[following.start - 1] == '\n'
+		assert following.line == text.count('\n', 0, following.start) + 1
+
+@pytest.mark.parametrize("optimize", (0, 1, 2))
+@pytest.mark.parametrize("maxErrors", (0, 3))
+def test_parallel_matches_serial(monkeypatch, optimize, maxErrors):
+	monkeypatch.setattr(parallel, "MIN_CHUNK", 300)
+	texts = [bench.Generator(seed=1).program(400), program(1, 120),
+		bench.Generator(seed=2).program(200) + "frozen K1 = 5\nzz = yy\nint q = (v3 +\n v4)\n" + bench.Generator(seed=3).program(200)]
+
+	for text in texts:
+		recorder = Recorder()
+		chunked = outputs(lambda: parallel.compileChunked(SourceBuffer(text, "t"), "t", TIMESTAMP, optimize, jobs=2, recorder=recorder, maxErrors=maxErrors))
+		assert chunked == outputs(lambda: compiler.compileSource(text, "t", TIMESTAMP, optimize=optimize, maxErrors=maxErrors))
+		assert recorder.counters["chunks"] > 1 and recorder.counters["reused"] > 0
@@ -0,0 +1,82 @@
+# --- Imports --- #
+
+import pytest
+from emitter import Line
+from peephole import Peephole, deadStores, jumpsToNext, lastBarrier, redundantMoves, unreachable
+
+# --- Functions --- #
+
+def lines(*code : str) -> list:
+	"""Lines from "label: instruction operands" strings, where a label ends in ':'"""
+
+	out : list = []
+	for text in code:
+		label, instruction, operands = "", "", ""
+		words = text.split(None, 1)
+		if words and words[0].endswith(":"):
+			label, words = words[0], words[1:] and words[1].split(None, 1)
+		if words:
+			instruction, operands = words[0], words[1] if len(words) > 1 else ""
+		out.append(Line(label, instruction, operands, ""))
+
+	return out
+
+def code(out : list) -> list:
+	return [" ".join(part for part in (line.label, line.instruction, line.operands) if part) for line in out]
+
+
+# --- Tests --- #
+
+def test_redundant_moves():
+	out, counts = redundantMoves(lines("mov eax,[a]", "mov [b],eax", "mov eax,[a]", "mov eax,[b]", "mov [b],eax", "call WriteInt", "mov eax,[a]"))
+
+	assert code(out) == ["mov eax,[a]", "mov [b],eax", "call WriteInt", "mov eax,[a]"]
+	assert counts == {"redundantLoad" : 1, "storeLoadForwarding" : 1, "redundantStore" : 1}
+
+def test_labels_end_what_redundant_moves_knows():
+	out, counts = redundantMoves(lines("mov eax,[a]", "L1:", "mov eax,[a]"))
+
+	assert len(out) == 3 and not sum(counts.values())
+
+def test_dead_stores():
+	out, counts = deadStores(lines("mov [a],eax", "mov [b],eax", "mov eax,[b]", "mov [a],eax", "mov [b],ebx"))
+
+	assert code(out) == ["mov [b],eax", "mov eax,[b]", "mov [a],eax", "mov [b],ebx"]
+	assert counts == {"deadStore" : 1}
+
+@pytest.mark.parametrize("between", ("call WriteInt", "L1:", "cmp eax,[a]"))
+def test_a_read_or_block_end_keeps_the_store(between):
+	out, counts = deadStores(lines("mov [a],eax", between, "mov [a],ebx"))
+
+	assert counts == {"deadStore" : 0}
+
+def test_jumps_to_next():
+	out, counts = jumpsToNext(lines("jmp L2", "L1:", "L2:", "je L3", "mov eax,[a]", "L3:"))
+
+	assert code(out) == ["L1:", "L2:", "je L3", "mov eax,[a]", "L3:"]
+	assert counts == {"jumpToNext" : 1}
+
+def test_unreachable():
+	out, counts = unreachable(lines("jmp L1", "mov eax,[a]", "call WriteInt", "L1:", "mov eax,[b]"))
+
+	assert code(out) == ["jmp L1", "L1:", "mov eax,[b]"]
+	assert counts == {"unreachable" : 2}
+
+def test_last_barrier():
+	assert lastBarrier(lines("mov eax,[a]", "cmp eax,[b]", "je L1")) == 0
+	assert lastBarrier(lines("mov eax,[a]", "call WriteInt", "mov [b],eax")) == 2
+	assert lastBarrier(lines("call WriteInt", "jmp L1", "call Crlf", "mov eax,[a]")) == 1
+	assert lastBarrier(lines("jmp L1", "call Crlf", "L1:", "add eax,[a]", "mov [b],eax")) == 4
+
+def test_optimizing_either_side_of_the_barrier_alone_changes_nothing():
+	text = lines("mov eax,[a]", "mov [b],eax", "mov [b],eax", "call WriteInt", "mov eax,[a]", "mov eax,[a]", "jmp L1", "mov [c],eax", "L1:")
+	cut = lastBarrier(text)
+
+	assert code(Peephole(2).run(text[:cut]) + Peephole(2).run(text[cut:])) == code(Peephole(2).run(text))
+
+def test_levels_choose_the_rules():
+	text = lines("mov [a],eax", "mov [a],ebx", "jmp L1", "call Crlf", "L1:")
+
+	assert len(Peephole(0).run(text)) == 5
+	assert code(Peephole(1).run(text)) == ["mov [a],eax", "mov [a],ebx", "jmp L1", "call Crlf", "L1:"]
+	assert code(Peephole(2).run(text)) == ["mov [a],ebx", "L1:"]
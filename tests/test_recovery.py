@@ -0,0 +1,51 @@
+# --- Imports --- #
+
+import pytest
+import compiler
+from diagnostics import CompileError
+
+# --- Functions --- #
+
+def diagnose(text : str, maxErrors : int = 0) -> tuple:
+	"""([(line, message)] of compiling text, names defined despite the errors)"""
+
+	with pytest.raises(CompileError) as info:
+		compiler.compileSource(text, "t", maxErrors=maxErrors)
+
+	return [(d.line, d.message) for d in info.value.diagnostics], set(dict(info.value.result.symbolTable))
+
+
+# --- Tests --- #
+
+@pytest.mark.parametrize("text", ("int x =\nint y = 1\nint z = y\n", "int x = 1 +\nint y = 1\nint z = y\n", "int x = not\nint y = 1\nint z = y\n"))
+def test_missing_operand_is_reported_on_its_line(text):
+	diagnostics, names = diagnose(text)
+
+	assert diagnostics == [(1, "SyntaxError: Expected boolean, integer, string, char, or list, got the end of the line")]
+	assert {"y", "z"} <= names
+
+@pytest.mark.parametrize("literal", ("'ab'", "'ab", "''", "'a b c'"))
+def test_bad_char_literal_is_reported_once(literal):
+	diagnostics, names = diagnose(f"char c = {literal}\nint y = 1\n")
+
+	assert diagnostics == [(1, "SyntaxError: Unexpected letter")]
+	assert "y" in names
+
+def test_each_bad_statement_is_reported_and_the_rest_compiled():
+	text = "int a = 1\nb = c\nint d = True\nint e = a\nf = e\nint g = (a + 1\nh = 2\n"
+	diagnostics, names = diagnose(text)
+
+	assert diagnostics == [(2, "ReferenceError: No type determined"), (3, "TypeError: The stated type \"INT\" was not the type given"),
+		(6, "SyntaxError: '(' was never closed")]
+	assert {"a", "e", "f", "h"} <= names and not {"b", "d", "g"} & names
+
+def test_lexical_errors_in_a_skipped_line_are_still_reported():
+	diagnostics, names = diagnose("int a = b $ $\nint c = 1\n")
+
+	assert [line for line, message in diagnostics] == [1, 1, 1]
+	assert "c" in names
+
+def test_recovery_stops_at_the_error_limit():
+	diagnostics, names = diagnose("".join(f"x{i} = y\n" for i in range(10)), maxErrors=3)
+
+	assert [line for line, message in diagnostics] == [1, 2, 3]
@@ -0,0 +1,32 @@
+# --- Imports --- #
+
+import io
+import pytest
+import bench
+import compiler
+import emitter
+from test_expression import program
+
+# --- Tests --- #
+
+@pytest.mark.parametrize("optimize", (0, 1, 2))
+@pytest.mark.parametrize("chunkLines", (1, 7, 64))
+def test_stream_matches_in_memory(monkeypatch, optimize, chunkLines):
+	monkeypatch.setattr(emitter, "CHUNK_LINES", chunkLines)
+	texts = [program(seed) for seed in range(10)] + [bench.Generator(seed=seed).program(300) for seed in range(3)]
+
+	for text in texts:
+		stream = io.StringIO()
+		streamed = compiler.compileSource(text, "t", optimize=optimize, objectStream=stream)
+		result = compiler.compileSource(text, "t", optimize=optimize)
+
+		assert stream.getvalue() == result.asm
+		assert streamed.stats == result.stats
+
+def test_dead_stores_across_chunks_are_removed(monkeypatch):
+	monkeypatch.setattr(emitter, "CHUNK_LINES", 2)
+	text = bench.Generator(seed=0).program(300)
+	stream = io.StringIO()
+	streamed = compiler.compileSource(text, "t", optimize=2, objectStream=stream)
+
+	assert streamed.stats["peephole.deadStore"] == compiler.compileSource(text, "t", optimize=2).stats["peephole.deadStore"] > 0
@@ -0,0 +1,67 @@
+# --- Imports --- #
+
+import random
+from ste import SymbolTableEntry
+from symtab import IRREGULAR, Mode, SymbolTable
+
+# --- Variables --- #
+
+NAMES : tuple = ("I0", "I7", "B12", "S3", "C1", "L2", "I007", "T1", "B", "true", "I99999999999", "ZERO")
+
+
+# --- Functions --- #
+
+def randomEntry(rand : random.Random) -> SymbolTableEntry:
+	type = rand.choice(("INT", "BOOL", "STR", "CHAR", "LIST"))
+	return SymbolTableEntry(rand.choice(NAMES), type, rand.choice(("CONST", "VAR")), rand.choice((0, "1", "\"hi\"", None)), rand.choice(("NO", "YES")), rand.randrange(4))
+
+
+# --- Tests --- #
+
+def test_behaves_like_a_dict_of_entries():
+	rand = random.Random(0)
+	table = SymbolTable()
+	expected : dict = {}
+
+	for _ in range(2000):
+		name = f"n{rand.randrange(50)}"
+		entry = randomEntry(rand)
+		table[name] = entry
+		expected[name] = entry
+		if rand.random() < 0.1:
+			table.setAlloc(name, entry.alloc != "YES")
+			expected[name] = entry._replace(alloc="NO" if entry.alloc == "YES" else "YES")
+
+	assert dict(table.items()) == expected
+	assert list(table) == list(expected) and len(table) == len(expected)
+	assert all(table.fields(name) == tuple(entry[1:]) for name, entry in expected.items())
+	assert table.get("missing") is None and table.fields("missing") is None
+
+def test_sections_follow_mode_and_storage_in_insertion_order():
+	table = SymbolTable()
+	for name, mode, alloc in (("a", "VAR", "YES"), ("b", "CONST", "YES"), ("c", "VAR", "NO"), ("d", "VAR", "YES")):
+		table[name] = SymbolTableEntry("I0", "INT", mode, 0, alloc, 0)
+	table["a"] = SymbolTableEntry("I0", "INT", "CONST", 0, "YES", 0)
+
+	assert [name for name, entry in table.section(Mode.VAR)] == ["d"]
+	assert [name for name, entry in table.section(Mode.VAR, False)] == ["c", "d"]
+	assert [name for name, entry in table.section(Mode.CONST)] == ["a", "b"]
+
+def test_only_plain_numbers_are_packed():
+	assert SymbolTable.number("I12", "INT") == 12
+	assert SymbolTable.number("I0", "INT") == 0
+	for internalName in ("I012", "B12", "I", "I1x", "I99999999999", "I\u0661"):
+		assert SymbolTable.number(internalName, "INT") == IRREGULAR
+
+def test_truncate_drops_the_last_rows():
+	table = SymbolTable()
+	for i, mode in enumerate(("VAR", "CONST", "VAR", "CONST", "VAR")):
+		table[f"n{i}"] = SymbolTableEntry(f"x{i}" if i == 3 else f"I{i}", "INT", mode, str(i), "YES", 0)
+	table["n0"] = SymbolTableEntry("I0", "INT", "CONST", "9", "YES", 0)
+	table.truncate(3)
+
+	assert list(table.items()) == [("n0", SymbolTableEntry("I0", "INT", "CONST", "9", "YES", 0)), ("n1", SymbolTableEntry("I1", "INT", "CONST", "1", "YES", 0)),
+		("n2", SymbolTableEntry("I2", "INT", "VAR", "2", "YES", 0))]
+	assert [name for name, entry in table.section(Mode.CONST)] == ["n0", "n1"] and "n3" not in table
+	table["n5"] = SymbolTableEntry("I5", "INT", "VAR", "5", "YES", 0)
+	assert [name for name, entry in table.section(Mode.VAR)] == ["n2", "n5"]
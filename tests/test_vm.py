@@ -0,0 +1,50 @@
+# --- Imports --- #
+
+import io
+import pytest
+import compiler
+import x86
+from diagnostics import CompileError
+from source import SourceBuffer
+from vm import VM, Bytecode, VMError
+
+# --- Functions --- #
+
+def runVM(text : str, stdin : str = "") -> str:
+	c = compiler.Compiler(SourceBuffer(text, "t"), "t")
+	c.parse()
+	out = io.StringIO()
+	VM(io.StringIO(stdin), out).run(Bytecode(c.ir, c.symbolTable))
+	return out.getvalue()
+
+
+# --- Tests --- #
+
+def test_writes_match_the_asm():
+	text = ("int io = 0\nint a = -5\nbool t = True\nfrozen int K = 9\nfrozen bool F = False\nstr s = \"hi\"\nstr r = s\n"
+		"io << a\nio << t\nio << K\nio << F\nio >> a\nio << a\nio >> a\nio << a\n")
+
+	assert runVM(text, "42\nnot a number\n") == "-5\nTRUE\n+9\nFALSE\n+42\n+0\n"
+	for optimize in (0, 1, 2):
+		c = compiler.Compiler(SourceBuffer(text, "t"), "t", optimize=optimize)
+		c.__main__()
+		assert x86.run(c.asm, [42, 0], x86.storageOnly(c, text)) == runVM(text, "42\nnot a number\n")
+
+@pytest.mark.parametrize("declaration, type", (("str s = \"hi\"", "STR"), ("char s = 'c'", "CHAR"), ("list s = [1,2]", "LIST"), ("frozen str s = \"hi\"", "STR")))
+def test_text_cannot_be_written(declaration, type):
+	with pytest.raises(CompileError) as info:
+		compiler.compileSource(f"int io = 0\n{declaration}\nio << s\n", "t")
+
+	assert [(d.line, d.message) for d in info.value.diagnostics] == [(3, f"TypeError: s is {type}, only int and bool can be written")]
+
+def test_copies_keep_their_type():
+	with pytest.raises(CompileError) as info:
+		compiler.compileSource("int io = 0\nint a = 1\nstr s = \"hi\"\na = s\nio << a\n", "t")
+
+	assert [(d.line, d.message) for d in info.value.diagnostics] == [(4, "TypeError: a is INT, not STR")]
+
+def test_division_by_zero_stops_on_its_line():
+	with pytest.raises(VMError) as info:
+		runVM("int io = 0\nint a = 0\nio >> a\nint b = 1\nb = 7 // a\nio << b\n", "0\n")
+
+	assert info.value.line == 5
@@ -0,0 +1,215 @@
+# --- Imports --- #
+
+import re
+from ir import NONE
+from lexer import tokenize
+
+# --- Variables --- #
+
+REGISTERS = ("eax", "ebx", "ecx", "edx")
+SETS = {"sete" : lambda zf, lt: zf, "setne" : lambda zf, lt: not zf, "setl" : lambda zf, lt: lt, "setle" : lambda zf, lt: lt or zf,
+	"setg" : lambda zf, lt: not lt and not zf, "setge" : lambda zf, lt: not lt}
+MEMORY = re.compile(r"^(?:dword\s+)?\[(\w+)\]$")
+CODE = re.compile(r"(?:[^;'\"]|'[^']*'|\"[^\"]*\")*") #A line up to its first ; outside quotes
+
+
+# --- MachineError Class --- #
+
+class MachineError(Exception):
+	"""Raised for an instruction the emulator does not know, or a fault the CPU would take"""
+
+
+# --- Functions --- #
+
+def wrap(value : int) -> int:
+	return (value + (1 << 31)) % (1 << 32) - (1 << 31)
+
+def initialValue(text : str) -> int:
+	"""A storage line's value as the dword at its label: ints as themselves, text as its first four bytes"""
+
+	try:
+		return wrap(int(text))
+	except ValueError:
+		pass
+
+	data : bytes = b""
+	for piece in re.findall(r"'[^']*'|\"[^\"]*\"|[^,]+", text):
+		data += piece[1:-1].encode() if piece[0] in "'\"" else bytes([int(piece) & 0xff]) if piece.strip().lstrip("-").isdigit() else b"\1"
+	return wrap(int.from_bytes(data[:4].ljust(4, b"\0"), "little"))
+
+def dwordsOf(operands : str) -> int:
+	"""Dwords a dd line takes: one per number, text rounded up to whole dwords"""
+
+	count : int = 0
+	for piece in re.findall(r"'[^']*'|\"[^\"]*\"|[^,]+", operands):
+		count += -(-len(piece[1:-1].encode()) // 4) if piece[0] in "'\"" else 1
+	return count
+
+def parse(asm : str, sized = ()) -> tuple:
+	"""(instructions, labels, addresses, memory, strings) of the .asm text, each instruction an (op, operands)
+
+	Storage is laid out one dword after another, in the order it is declared, so a label
+	that reserves nothing shares its address with the next one. resd N of the labels in sized
+	reserves N zeroed dwords. Any other resd is a variable declared from a literal, whose
+	operand is the value it starts with, in one dword, as the compiler means it to.
+	"""
+
+	instructions : list = []
+	labels : dict = {}
+	addresses : dict = {}
+	memory : list = []
+	strings : dict = {}
+	section : str = ""
+
+	for line in asm.splitlines():
+		code = CODE.match(line).group().rstrip()
+		if not code.strip() or code.startswith("%"):
+			continue
+		if code.startswith("SECTION"):
+			section = code.split()[1]
+			continue
+
+		label, _, rest = code.partition(" ") if not code[0].isspace() else ("", "", code)
+		label = label.rstrip(":")
+		parts = rest.split(None, 1)
+		op = parts[0] if parts else ""
+		operands = parts[1].strip() if len(parts) > 1 else ""
+
+		if section == ".text":
+			if label and label != "global":
+				labels[label] = len(instructions)
+			if op and label != "global":
+				instructions.append((op, [operand.strip() for operand in operands.split(",")] if operands else []))
+		elif op == "db":
+			strings[label] = re.match(r"'([^']*)'", operands).group(1)
+		elif op == "resd" and label in sized:
+			if int(operands) < 0:
+				raise MachineError(f"resd {operands} for {label}")
+			addresses[label] = len(memory)
+			memory.extend([0] * int(operands))
+		elif op in ("dd", "resd"):
+			addresses[label] = len(memory)
+			memory.append(initialValue(operands))
+			memory.extend([0] * (dwordsOf(operands) - 1 if op == "dd" else 0))
+		elif label:
+			addresses[label] = len(memory)
+
+	return instructions, labels, addresses, memory, strings
+
+def storageOnly(c, text : str) -> set:
+	"""Labels of the temps and of the variables declared from a run time value, in the parsed Compiler c of text
+
+	These are written by the IR on the line that declares them, before anything reads them, so
+	the value they start with is never seen and their resd operand can only be a size.
+	"""
+
+	declared : dict = {} #Name -> line it first appears on
+	for token in tokenize(text):
+		if token.kind == "ID":
+			declared.setdefault(token.text, token.line)
+
+	read : set = set()
+	written : set = set()
+	for i, (op, dst, src1, src2) in enumerate(c.ir):
+		read.update((src1, src2))
+		if dst != NONE and dst not in read and declared.get(c.ir.names[dst], c.ir.line(i)) == c.ir.line(i):
+			written.add(dst)
+		read.add(dst)
+
+	names = c.ir.names
+	return {c.symbolTable[names[i]].internalName for i in written if names[i] in c.symbolTable}
+
+def run(asm : str, stdin : list = (), sized = ()) -> str:
+	"""Runs the .asm the compiler emitted, with ReadInt taking the ints of stdin in turn, returning what it writes
+
+	Storage is laid out as parse() describes, given the labels whose resd reserves a size.
+	"""
+
+	instructions, labels, addresses, memory, strings = parse(asm, sized)
+	registers : dict = dict.fromkeys(REGISTERS, 0)
+	inputs = iter(stdin)
+	out : list = []
+	zf : bool = False
+	sf : bool = False
+	lt : bool = False
+	pc : int = 0
+
+	def address(label : str) -> int:
+		if addresses.get(label, len(memory)) >= len(memory): #Past the last dword of storage
+			raise MachineError(f"{label} has no storage")
+		return addresses[label]
+
+	def read(operand : str):
+		if operand in registers:
+			return registers[operand]
+		match = MEMORY.match(operand)
+		if match:
+			return memory[address(match.group(1))]
+		if operand in strings:
+			return operand #An address, only WriteString takes
+		return wrap(int(operand))
+
+	def write(operand : str, value) -> None:
+		if operand in registers:
+			registers[operand] = value
+		elif operand == "al":
+			registers["eax"] = wrap((registers["eax"] & ~0xff) | value)
+		else:
+			match = MEMORY.match(operand)
+			if not match:
+				raise MachineError(f"Cannot write to {operand}")
+			memory[address(match.group(1))] = value
+
+	while pc < len(instructions):
+		op, operands = instructions[pc]
+		pc += 1
+
+		if op == "mov":
+			write(operands[0], read(operands[1]))
+		elif op in ("add", "sub", "imul", "and", "or", "xor"):
+			a, b = read(operands[0]), read(operands[1])
+			value = wrap({"add" : a + b, "sub" : a - b, "imul" : a * b, "and" : a & b, "or" : a | b, "xor" : a ^ b}[op])
+			write(operands[0], value)
+			zf, sf = value == 0, value < 0
+		elif op in ("neg", "not", "dec"):
+			a = read(operands[0])
+			value = wrap(-a if op == "neg" else ~a if op == "not" else a - 1)
+			write(operands[0], value)
+			if op != "not":
+				zf, sf = value == 0, value < 0
+		elif op == "cmp":
+			a, b = read(operands[0]), read(operands[1])
+			zf, sf, lt = a == b, wrap(a - b) < 0, a < b
+		elif op == "test":
+			value = read(operands[0]) & read(operands[1])
+			zf, sf = value == 0, value < 0
+		elif op in SETS:
+			write(operands[0], int(SETS[op](zf, lt)))
+		elif op == "movzx":
+			registers["eax"] = registers["eax"] & 0xff
+		elif op == "cdq":
+			registers["edx"] = -1 if registers["eax"] < 0 else 0
+		elif op == "idiv":
+			divisor = read(operands[0])
+			dividend = registers["eax"] #edx only holds its sign, after cdq
+			if divisor == 0 or (dividend == -(1 << 31) and divisor == -1):
+				raise MachineError("Divide error")
+			quotient = abs(dividend) // abs(divisor) * (1 if (dividend < 0) == (divisor < 0) else -1)
+			registers["eax"], registers["edx"] = quotient, dividend - quotient * divisor
+		elif op in ("jmp", "je", "jns"):
+			if op == "jmp" or (op == "je" and zf) or (op == "jns" and not sf):
+				pc = labels[operands[0]]
+		elif op == "call" and operands[0] == "WriteInt":
+			out.append(f"{registers['eax']:+d}")
+		elif op == "call" and operands[0] == "WriteString":
+			out.append(strings[registers["edx"]])
+		elif op == "call" and operands[0] == "Crlf":
+			out.append("\n")
+		elif op == "call" and operands[0] == "ReadInt":
+			registers["eax"] = wrap(next(inputs, 0))
+		elif op == "Exit":
+			break
+		else:
+			raise MachineError(f"Unknown instruction {op} {','.join(operands)}")
+
+	return "".join(out)
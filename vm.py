@@ -0,0 +1,281 @@
+# --- Imports --- #
+
+import compiler
+import contextlib
+import ir
+import sys
+from array import array
+from diagnostics import MAX_ERRORS
+from instrument import Recorder
+from ir import IR, NONE
+from source import SourceBuffer
+from symtab import SymbolTable
+
+# --- Variables --- #
+
+#Opcodes. Writes are split by the kind of value written, which is known when assembling.
+MOVE : int = 0 #a = b
+READ : int = 1 #a = int read from stdin
+WRITE_INT : int = 2 #write a
+WRITE_BOOL : int = 3
+NEG : int = 4 #a = op b
+NOT : int = 5
+ADD : int = 6 #a = b op c
+SUB : int = 7
+MUL : int = 8
+DIV : int = 9
+MOD : int = 10
+AND : int = 11
+OR : int = 12
+EQ : int = 13
+NE : int = 14
+LT : int = 15
+LE : int = 16
+GT : int = 17
+GE : int = 18
+OPCODES = ("MOVE", "READ", "WRITE_INT", "WRITE_BOOL", "NEG", "NOT", "ADD", "SUB", "MUL", "DIV", "MOD", "AND", "OR", "EQ", "NE", "LT", "LE", "GT", "GE")
+
+FROM_IR = {ir.COPY : MOVE, ir.READ : READ, ir.NEG : NEG, ir.NOT : NOT, ir.ADD : ADD, ir.SUB : SUB, ir.MUL : MUL, ir.DIV : DIV, ir.MOD : MOD,
+	ir.AND : AND, ir.OR : OR, ir.EQ : EQ, ir.NE : NE, ir.LT : LT, ir.LE : LE, ir.GT : GT, ir.GE : GE}
+BOOL_RESULTS = {ir.NOT, ir.AND, ir.OR} | ir.COMPARISONS #The other operators give ints
+
+BIAS : int = 1 << 31 #Values are 32-bit signed, as in eax
+MASK : int = (1 << 32) - 1
+FLUSH_LINES : int = 4096 #Output lines buffered before they are written
+
+
+# --- VMError Class --- #
+
+class VMError(Exception):
+
+	def __init__(self, line : int, message : str):
+		"""Constructor for VMError(), raised when a running program fails"""
+
+		super().__init__(f"Line {line}: {message}")
+		self.line : int = line
+
+
+# --- Bytecode Class --- #
+
+class Bytecode(object):
+
+	def __init__(self, code : IR, symbolTable : SymbolTable):
+		"""Constructor for Bytecode(), a program's IR lowered for the VM
+
+		Instructions are four parallel arrays, an opcode and three operands that index slots,
+		which start out holding the values of the symbols they stand for: ints and bools as
+		numbers (True is -1, as in the .asm), strings, chars and lists as their text, which is
+		only ever copied, since the compiler only lets ints and bools be written. Stream operands
+		are dropped, since << and >> always use stdout and stdin.
+		"""
+
+		self.__ops = array("B")
+		self.__a = array("i")
+		self.__b = array("i")
+		self.__c = array("i")
+		self.__lines = array("I")
+
+		self.__names : list = list(code.names)
+		self.__slots : list = [initialValue(symbolTable[name]) for name in self.__names]
+
+		kinds : list = [symbolTable[name].type for name in self.__names] #What each slot holds at this point of the program, as temps change type
+		for i, (op, dst, src1, src2) in enumerate(code):
+			if op == ir.WRITE:
+				self.add(WRITE_INT if kinds[src1] == "INT" else WRITE_BOOL, src1, NONE, NONE, code.line(i))
+				continue
+
+			if op == ir.COPY:
+				kinds[dst] = kinds[src1]
+			elif op == ir.READ:
+				src1 = NONE
+				kinds[dst] = "INT"
+			else:
+				kinds[dst] = "BOOL" if op in BOOL_RESULTS else "INT"
+			self.add(FROM_IR[op], dst, src1, src2, code.line(i))
+
+	def __len__(self):
+		return len(self.__ops)
+
+	@property
+	def code(self) -> tuple:
+		"""(opcodes, a, b, c) arrays"""
+		return self.__ops, self.__a, self.__b, self.__c
+
+	@property
+	def slots(self) -> list:
+		"""Initial value of each slot"""
+		return self.__slots
+
+	@property
+	def names(self) -> list:
+		"""Symbol of each slot"""
+		return self.__names
+
+	def line(self, i : int) -> int:
+		return self.__lines[i]
+
+	def add(self, op : int, a : int, b : int, c : int, line : int) -> None:
+		self.__ops.append(op)
+		self.__a.append(a)
+		self.__b.append(b)
+		self.__c.append(c)
+		self.__lines.append(line)
+
+	def dump(self) -> str:
+		"""Readable listing of the bytecode, for debugging"""
+
+		names = self.__names
+		text : list = []
+
+		for i, (op, a, b, c) in enumerate(zip(*self.code)):
+			operands = ", ".join(names[operand] for operand in (a, b, c) if operand != NONE)
+			text.append("{:>5}  {:11}{}\n".format(self.__lines[i], OPCODES[op], operands))
+
+		return "".join(text)
+
+
+# --- VM Class --- #
+
+class VM(object):
+
+	def __init__(self, stdin = None, stdout = None):
+		"""Constructor for VM(), which runs Bytecode with >> reading stdin and << writing stdout
+
+		Output matches the Irvine routines the .asm calls: ints are written with their sign,
+		bools as TRUE or FALSE, each on its own line. A line that is not an int reads as 0.
+		"""
+
+		self.__stdin = stdin or sys.stdin
+		self.__stdout = stdout or sys.stdout
+		self.__executed : int = 0
+
+	@property
+	def executed(self) -> int:
+		"""Instructions run so far"""
+		return self.__executed
+
+	def run(self, bytecode : Bytecode) -> list:
+		"""Runs bytecode from its first instruction to its last and returns the final slots
+
+		Raises VMError when the program divides by zero or computes with a value of the
+		wrong kind.
+		"""
+
+		slots : list = list(bytecode.slots)
+		ops, a, b, c = bytecode.code
+		out : list = []
+		write = out.append
+		flush = self.flush
+		readline = self.__stdin.readline
+		pc : int = 0
+
+		try:
+			for pc, (op, x, y, z) in enumerate(zip(ops, a, b, c)):
+				if op == MOVE:
+					slots[x] = slots[y]
+				elif op == ADD:
+					slots[x] = ((slots[y] + slots[z] + BIAS) & MASK) - BIAS
+				elif op == SUB:
+					slots[x] = ((slots[y] - slots[z] + BIAS) & MASK) - BIAS
+				elif op == WRITE_INT:
+					write(f"{slots[x]:+d}\n")
+					if len(out) >= FLUSH_LINES:
+						flush(out)
+				elif op == MUL:
+					slots[x] = ((slots[y] * slots[z] + BIAS) & MASK) - BIAS
+				elif op == DIV:
+					slots[x] = ((slots[y] // slots[z] + BIAS) & MASK) - BIAS
+				elif op == MOD:
+					slots[x] = slots[y] % slots[z]
+				elif op == LT:
+					slots[x] = -(slots[y] < slots[z])
+				elif op == LE:
+					slots[x] = -(slots[y] <= slots[z])
+				elif op == GT:
+					slots[x] = -(slots[y] > slots[z])
+				elif op == GE:
+					slots[x] = -(slots[y] >= slots[z])
+				elif op == EQ:
+					slots[x] = -(slots[y] == slots[z])
+				elif op == NE:
+					slots[x] = -(slots[y] != slots[z])
+				elif op == AND:
+					slots[x] = slots[y] & slots[z]
+				elif op == OR:
+					slots[x] = slots[y] | slots[z]
+				elif op == NOT:
+					slots[x] = ~slots[y]
+				elif op == NEG:
+					slots[x] = ((BIAS - slots[y]) & MASK) - BIAS
+				elif op == WRITE_BOOL:
+					write("TRUE\n" if slots[x] else "FALSE\n")
+					if len(out) >= FLUSH_LINES:
+						flush(out)
+				elif op == READ:
+					flush(out) #Whatever was written before the read shows first
+					slots[x] = readInt(readline())
+			else:
+				pc = len(ops)
+		except ZeroDivisionError:
+			raise VMError(bytecode.line(pc), "ZeroDivisionError: integer division or modulo by zero")
+		except TypeError:
+			raise VMError(bytecode.line(pc), f"TypeError: {bytecode.names[y]} does not hold an int or bool here")
+		finally:
+			self.__executed += pc
+			flush(out)
+
+		return slots
+
+	def flush(self, out : list) -> None:
+		if out:
+			self.__stdout.write("".join(out))
+			out.clear()
+		self.__stdout.flush()
+
+
+# --- Functions --- #
+
+def initialValue(entry):
+	"""A symbol's value as a slot holds it"""
+
+	if entry.type == "INT" or entry.type == "BOOL":
+		return ((int(str(entry.value)) + BIAS) & MASK) - BIAS
+	if entry.type == "LIST":
+		return f"[{entry.value}]"
+	return str(entry.value)[1:-1] #Without the quotes
+
+def readInt(line : str) -> int:
+	"""The int on line, as ReadInt reads it; 0 for anything else, or at the end of the input"""
+
+	try:
+		return ((int(line) + BIAS) & MASK) - BIAS
+	except ValueError:
+		return 0
+
+def runFile(title : str, sourceName : str = "", stdin = None, stdout = None, recorder : Recorder = None, maxErrors : int = MAX_ERRORS) -> VM:
+	"""Compiles sourceName (title.cmn) to bytecode and runs it, without writing any files
+
+	Raises CompileError when the program does not compile and VMError when it fails running.
+	With a Recorder, parsing, assembling and running are timed and the instructions run counted.
+	"""
+
+	span = recorder.span if recorder is not None else lambda name: contextlib.nullcontext()
+	vm = VM(stdin, stdout)
+
+	with span("read"):
+		source = SourceBuffer.fromFile(sourceName or f"{title}.cmn")
+
+	c = compiler.Compiler(source, title, maxErrors=maxErrors)
+	with span("parse"):
+		c.parse()
+	with span("assemble"):
+		bytecode = Bytecode(c.ir, c.symbolTable)
+
+	try:
+		with span("run"):
+			vm.run(bytecode)
+	finally:
+		if recorder is not None:
+			recorder.count("executed", vm.executed)
+
+	return vm